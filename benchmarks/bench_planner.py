@@ -0,0 +1,398 @@
+"""
+Benchmarks for the Year Planner data paths.
+
+Generates deterministic synthetic tasks.json files and times loading,
+parsing (json.load plus validation, and the streaming reader), reading an
+archived year, saving (as JSON and as binary snapshots), calendar
+highlighting, task counts, recurring task expansion and the HTML overview
+on them, recording the peak memory of each step. Results are emitted as
+JSON so runs on different commits can be compared.
+
+    python benchmarks/bench_planner.py --sizes 1000 100000 --output results.json
+
+Calendar highlighting runs against HeadlessCalendar, a stand-in for the
+tkcalendar widget, so no display is needed.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from task_store import JsonStorage, ShardedStorage, TaskStore, dates_in_range, validate_tasks_data  # noqa: E402
+from task_table import TaskTable  # noqa: E402
+from task_counts import TaskCounts  # noqa: E402
+from task_html import TaskOverview, iter_tasks_html, write_html  # noqa: E402
+from task_io import export_file, import_file  # noqa: E402
+from task_json import read_tasks_json  # noqa: E402
+from task_recurrence import FREQUENCIES, RecurrenceRule, RecurrenceSet  # noqa: E402
+
+PLANNER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "year_planner.py")
+DEFAULT_SIZES = [1000, 100000, 1000000]
+DEFAULT_SEED = 2024
+FIRST_DAY = date(2020, 1, 1)
+DAY_SPAN = 10 * 365  # Ten years of dates
+RECURRENCE_RULES = 100  # Recurring tasks expanded by the expand_recurrences step
+LOOKUPS = 10000  # Dates looked up by the lookup_tasks step
+WORDS = [
+    "call", "email", "review", "report", "meeting", "standup", "invoice", "dentist",
+    "gym", "groceries", "deploy", "backup", "budget", "plan", "draft", "send",
+    "team", "client", "project", "weekly", "monthly", "notes", "book", "pay"
+]
+
+def generate_tasks(count, seed=DEFAULT_SEED):
+    """
+    Return a tasks dict with count tasks spread over ten years.
+    Days are drawn from a Zipf-like distribution, so a few days hold many
+    tasks and most hold few, like real planners with log-style days.
+    """
+    rng = random.Random(seed)
+    day_offsets = list(range(DAY_SPAN))
+    rng.shuffle(day_offsets)
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, DAY_SPAN + 1):
+        total += 1.0 / rank ** 1.1
+        cum_weights.append(total)
+
+    data = {}
+    for i, offset in enumerate(rng.choices(day_offsets, cum_weights=cum_weights, k=count)):
+        day = FIRST_DAY + timedelta(days=offset)
+        task = f"{' '.join(rng.choices(WORDS, k=rng.randint(1, 4)))} #{i}"
+        data.setdefault(str(day.year), {}).setdefault(str(day.month), {}).setdefault(str(day.day), []).append(task)
+    return data
+
+def generate_rules(count, seed=DEFAULT_SEED):
+    """Return count never-ending recurrence rules starting in the first year."""
+    rng = random.Random(seed)
+    rules = []
+    for rule_id in range(1, count + 1):
+        freq = rng.choice(FREQUENCIES)
+        weekdays = tuple(sorted(rng.sample(range(7), rng.randint(1, 3)))) if freq == "weekly" else ()
+        start = FIRST_DAY + timedelta(days=rng.randrange(365))
+        rules.append(RecurrenceRule(rule_id, f"{rng.choice(WORDS)} #{rule_id}", freq, start, None, rng.randint(1, 3), weekdays))
+    return rules
+
+def busiest_year(data):
+    """Return the year with the most tasks."""
+    return max(
+        data,
+        key=lambda year: sum(len(tasks) for days in data[year].values() for tasks in days.values())
+    )
+
+class HeadlessCalendar:
+    """Stand-in for tkcalendar.Calendar with the calls highlight_dates makes."""
+
+    def __init__(self):
+        self.events = {}
+        self.next_id = 0
+
+    def tag_config(self, tag, **options):
+        pass
+
+    def calevent_create(self, date_obj, text, tag):
+        self.next_id += 1
+        self.events[self.next_id] = (date_obj, text, tag)
+        return self.next_id
+
+    def calevent_remove(self, *ev_ids, **kw):
+        for ev_id in ev_ids:
+            del self.events[ev_id]
+
+    def update_idletasks(self):
+        pass
+
+class HeadlessGui:
+    """Stand-in for the Tk root; runs idle callbacks immediately."""
+
+    def after_idle(self, callback, *args):
+        callback(*args)
+
+    def after(self, ms, callback=None, *args):
+        if callback is not None:
+            callback(*args)
+
+def measure(func, repeat):
+    """
+    Return (best seconds, peak bytes) for func.
+    Timing runs without tracemalloc; one extra traced run records the peak.
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def bench_size(count, workdir, repeat, seed):
+    """Run every benchmark on a dataset of count tasks and return result rows."""
+    import year_planner  # Imported lazily: it pulls in tkinter and tkcalendar
+
+    data = generate_tasks(count, seed)
+    table = TaskTable.from_nested(data)
+    tasks_file = os.path.join(workdir, f"tasks-{count}.json")
+    JsonStorage(tasks_file).write_snapshot(data)
+    file_size = os.path.getsize(tasks_file)
+    year = int(busiest_year(data))
+
+    def load():
+        store = TaskStore(JsonStorage(tasks_file))
+        store.load()
+        store.close()
+
+    # The same tasks as a binary snapshot (binary-<count>.snap)
+    binary_file = os.path.join(workdir, f"binary-{count}.json")
+    JsonStorage(binary_file, snapshot_format="binary").write_snapshot(data)
+    binary_size = os.path.getsize(JsonStorage(binary_file).binary_file)
+
+    def load_binary():
+        store = TaskStore(JsonStorage(binary_file, snapshot_format="binary"))
+        store.load()
+        store.close()
+
+    # Split the same tasks into one file per year (migrated from tasks_file)
+    shard_dir = os.path.join(workdir, f"shards-{count}")
+    migration = ShardedStorage(shard_dir, tasks_file, archive_keep_years=-1)
+    migration.load([])
+    migration.close()
+
+    def load_one_year():
+        store = TaskStore(ShardedStorage(shard_dir, tasks_file, archive_keep_years=-1))
+        store.load([year])
+        store.close()
+
+    # The same year files with the busiest year and those before it archived (archive-<count>/)
+    archived_dir = os.path.join(workdir, f"archived-shards-{count}")
+    archive_dir = os.path.join(workdir, f"archive-{count}")
+    archiving = ShardedStorage(archived_dir, tasks_file, archive_dir=archive_dir, archive_keep_years=-1)
+    archiving.load([])
+    archiving.archive_years(year + 1)
+    archiving.close()
+
+    def load_archived_year():
+        store = TaskStore(ShardedStorage(archived_dir, tasks_file, archive_dir=archive_dir, archive_keep_years=-1))
+        store.load([])
+        store.load_years([year])
+        store.close()
+
+    def validate():
+        validate_tasks_data(data)
+
+    def parse_two_pass():
+        with open(tasks_file, 'r') as f:
+            validate_tasks_data(json.load(f))
+
+    def parse_streaming():
+        with open(tasks_file, 'r') as f:
+            read_tasks_json(f)
+
+    save_storage = JsonStorage(os.path.join(workdir, f"save-{count}.json"))
+
+    def save():
+        save_storage.save(table)
+
+    save_binary_storage = JsonStorage(os.path.join(workdir, f"save-binary-{count}.json"), snapshot_format="binary")
+
+    def save_binary():
+        save_binary_storage.save(table)
+
+    year_planner.gui = HeadlessGui()
+    year_planner.store.tasks = table
+    lookup_dates = [FIRST_DAY + timedelta(days=offset) for offset in random.Random(seed).choices(range(DAY_SPAN), k=LOOKUPS)]
+
+    def lookup():
+        store = year_planner.store
+        for date_obj in lookup_dates:
+            store.tasks_for(date_obj)
+        for year_offset in range(DAY_SPAN // 365):
+            for month in range(1, 13):
+                store.days_with_tasks(FIRST_DAY.year + year_offset, month)
+
+    def reset_calendars():
+        year_planner.highlight_manager = year_planner.HighlightManager()
+        year_planner.calendar_tabs = {
+            month: {'year': year, 'month': month, 'frame': None, 'widget': HeadlessCalendar()}
+            for month in range(1, 13)
+        }
+
+    def highlight_all():
+        reset_calendars()
+        year_planner.highlight_dates()
+
+    edited_date = date(year, 6, 15)
+
+    def highlight_one():
+        year_planner.highlight_dates([edited_date])
+
+    html_file = os.path.join(workdir, f"tasks-{count}.html")
+
+    def render_html():
+        write_html(html_file, iter_tasks_html(table))
+
+    overview = TaskOverview(year_planner.store)
+    write_html(html_file, overview.iter_page())  # Fill the month cache
+
+    def render_html_after_edit():
+        # What an edit does to the cache: only the edited month is rendered again
+        year_planner.store.changed_dates([edited_date.toordinal()])
+        write_html(html_file, overview.iter_page())
+
+    recurrences = RecurrenceSet(generate_rules(RECURRENCE_RULES, seed))
+
+    def count_tasks_rebuild():
+        TaskCounts().rebuild(table)
+
+    counts = TaskCounts()
+    counts.rebuild(table)
+
+    def count_tasks_between():
+        # The range count of the Year tab, over every start date of the span to a month later
+        for ordinal in range(FIRST_DAY.toordinal(), FIRST_DAY.toordinal() + DAY_SPAN):
+            counts.between(ordinal, ordinal + 30)
+
+    def expand_recurrences():
+        recurrences.month_cache.clear()
+        for month in range(1, 13):
+            recurrences.occurrences(year, month)
+
+    csv_file = os.path.join(workdir, f"tasks-{count}.csv")
+    ics_file = os.path.join(workdir, f"tasks-{count}.ics")
+
+    def import_into_empty_store(path):
+        import_file_path = os.path.join(workdir, f"import-{count}.json")
+        for leftover in (import_file_path, import_file_path + ".journal"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        store = TaskStore(JsonStorage(import_file_path))
+        store.load()
+        import_file(store, path)
+        store.close()
+
+    # Add a task to every date of a year and clear them again, date by date or as one batch;
+    # without a writer thread each write is on the clock
+    batch_store = TaskStore(JsonStorage(os.path.join(workdir, f"batch-{count}.json")))
+    batch_store.load()
+    batch_dates = dates_in_range(date(year, 1, 1), date(year, 12, 31))
+
+    def range_add_clear_single():
+        for date_obj in batch_dates:
+            batch_store.add(date_obj, "range task")
+        for date_obj in batch_dates:
+            batch_store.clear(date_obj)
+
+    def range_add_clear_batch():
+        batch_store.add_to_dates(batch_dates, "range task")
+        batch_store.clear_range(batch_dates[0], batch_dates[-1])
+
+    # Start-to-exit time of a scripted add; HOME points the planner at an empty folder in workdir
+    cli_env = dict(os.environ, HOME=os.path.join(workdir, f"cli-home-{count}"))
+    cli_env["USERPROFILE"] = cli_env["HOME"]
+
+    def cli_add():
+        subprocess.run([sys.executable, PLANNER_SCRIPT, "add", edited_date.isoformat(), "cli task"],
+                       env=cli_env, check=True, stdout=subprocess.DEVNULL)
+
+    reset_calendars()
+    year_planner.highlight_dates()
+    operations = [
+        ("load_tasks", load),
+        ("load_tasks_binary", load_binary),
+        ("load_tasks_one_year", load_one_year),
+        ("load_archived_year", load_archived_year),
+        ("validate_tasks_data", validate),
+        ("parse_json_load_validate", parse_two_pass),
+        ("parse_read_tasks_json", parse_streaming),
+        ("lookup_tasks", lookup),
+        ("save_tasks", save),
+        ("save_tasks_binary", save_binary),
+        ("highlight_dates", highlight_all),
+        ("highlight_dates_one_date", highlight_one),
+        ("show_tasks_html", render_html),
+        ("show_tasks_html_after_edit", render_html_after_edit),
+        ("count_tasks_rebuild", count_tasks_rebuild),
+        ("count_tasks_between", count_tasks_between),
+        ("expand_recurrences", expand_recurrences),
+        ("range_add_clear_single", range_add_clear_single),
+        ("range_add_clear_batch", range_add_clear_batch),
+        ("cli_add", cli_add),
+        ("export_csv", lambda: export_file(table, csv_file)),
+        ("import_csv", lambda: import_into_empty_store(csv_file)),
+        ("export_ics", lambda: export_file(table, ics_file)),
+        ("import_ics", lambda: import_into_empty_store(ics_file)),
+    ]
+    rows = []
+    for name, func in operations:
+        seconds, peak = measure(func, repeat)
+        rows.append({
+            "tasks": count, "operation": name, "seconds": seconds, "peak_bytes": peak,
+            "tasks_per_second": count / seconds if seconds else None
+        })
+        print(f"{count:>9} tasks  {name:<26} {seconds * 1000:10.2f} ms  peak {peak / 1e6:8.2f} MB", file=sys.stderr)
+    batch_store.close()
+    rows.append({"tasks": count, "operation": "tasks_json_bytes", "bytes": file_size})
+    rows.append({"tasks": count, "operation": "tasks_binary_bytes", "bytes": binary_size})
+    return rows
+
+def git_revision():
+    """Return the current commit hash, if the benchmarks run from a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Year Planner on synthetic datasets.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="task counts to generate")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per operation (best is reported)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="random seed of the synthetic data")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--workdir", help="directory for generated files (default: a temporary directory)")
+    args = parser.parse_args(argv)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="year_planner_bench_") as tmp:
+        workdir = args.workdir or tmp
+        os.makedirs(workdir, exist_ok=True)
+        # Keep stdout clean for the JSON results
+        with contextlib.redirect_stdout(sys.stderr):
+            for count in args.sizes:
+                results["results"].extend(bench_size(count, workdir, args.repeat, args.seed))
+
+    output = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Logging setup and lightweight timing/counter metrics for the Year Planner.
+
+Metrics are off unless the YEAR_PLANNER_METRICS environment variable is set
+(or enable_metrics() is called, e.g. by the --metrics flag). While they are
+off, span() and count() return immediately. When on, the collected counters
+and durations are dumped as JSON at exit: to the file named by
+YEAR_PLANNER_METRICS, or to stderr if it is just "1".
+"""
+import atexit
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+LOG_LEVEL = os.environ.get("YEAR_PLANNER_LOG_LEVEL", "INFO")
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+METRICS_ENV = "YEAR_PLANNER_METRICS"
+
+logger = logging.getLogger(__name__)
+
+metrics_enabled = False
+metrics_target = None  # File path for the dump, or None for stderr
+counters = {}  # name -> count (or byte total)
+durations = {}  # name -> [calls, total seconds, max seconds]
+
+def configure_logging(level=LOG_LEVEL):
+    """Send log records of level and above to stderr."""
+    logging.basicConfig(level=getattr(logging, str(level).upper(), logging.INFO), format=LOG_FORMAT)
+
+def enable_metrics(target=None):
+    """Start collecting metrics and dump them at exit (to target, or stderr)."""
+    global metrics_enabled, metrics_target
+    if not metrics_enabled:
+        atexit.register(dump_metrics)
+    metrics_enabled = True
+    metrics_target = target
+
+def count(name, amount=1):
+    """Add amount to the counter name."""
+    if metrics_enabled:
+        counters[name] = counters.get(name, 0) + amount
+
+@contextmanager
+def span(name):
+    """Time the enclosed block under name."""
+    if not metrics_enabled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        entry = durations.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+        logger.debug("%s took %.2f ms", name, elapsed * 1000)
+
+def snapshot_metrics():
+    """Return the collected metrics as a JSON-serializable dict."""
+    return {
+        "counters": dict(counters),
+        "durations": {
+            name: {"calls": calls, "total_ms": total * 1000, "max_ms": longest * 1000}
+            for name, (calls, total, longest) in durations.items()
+        },
+    }
+
+def dump_metrics():
+    """Write the collected metrics as JSON."""
+    output = json.dumps(snapshot_metrics(), indent=4)
+    if metrics_target:
+        try:
+            with open(metrics_target, 'w') as f:
+                f.write(output)
+            return
+        except OSError as e:
+            logger.error("Failed to write metrics to %s: %s", metrics_target, e)
+    print(output, file=sys.stderr)
+
+if os.environ.get(METRICS_ENV):
+    value = os.environ[METRICS_ENV]
+    enable_metrics(None if value.lower() in ("1", "true", "yes", "on") else value)
@@ -0,0 +1,139 @@
+"""
+Compressed archives of past years.
+
+ShardedStorage moves years before a cutoff out of the working set: each
+one becomes a single compressed file in the archive folder (2019.json.xz,
+or 2019.json.gz), holding the year in the tasks.json layout with its
+journal already folded in. Archived years are never read at startup nor
+rewritten on save; they are read, with the same streaming checks as a year
+file, only when they are looked at, searched or exported, and an edit to
+one moves it back into the working set first. The last few decoded years
+are kept, so reading one again costs a stat until its file changes.
+"""
+import gzip
+import json
+import lzma
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from task_json import read_tasks_json
+from instrumentation import count, span
+
+ARCHIVE_OPENERS = {"xz": lzma.open, "gz": gzip.open}  # Archive format -> open() of its stdlib module
+ARCHIVE_FILE_PATTERN = re.compile(r"^(\d+)\.json\.(xz|gz)$")
+ARCHIVE_CACHE_SIZE = 8  # Decoded archived years kept in memory
+
+def copy_nested(data):
+    """Copy nested tasks data down to the task lists, so callers can't change a cached year."""
+    return {
+        year: {month: {day: list(tasks) for day, tasks in days.items()} for month, days in months.items()}
+        for year, months in data.items()
+    }
+
+class YearArchive:
+    """
+    The archive folder: one compressed file per archived year. New archives
+    are written in archive_format ("xz" or "gz"); either is read. Decoded
+    years are cached by the path, mtime and size of their file.
+    """
+
+    def __init__(self, archive_dir, archive_format="xz", cache_size=ARCHIVE_CACHE_SIZE):
+        self.archive_dir = archive_dir
+        self.archive_format = archive_format if archive_format in ARCHIVE_OPENERS else "xz"
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # year -> ((path, mtime, size), data), least recently used first
+        self.cache_lock = threading.Lock()
+
+    def file(self, year, archive_format):
+        return os.path.join(self.archive_dir, f"{year}.json.{archive_format}")
+
+    def path(self, year):
+        """Return the archive file of a year, or None if it isn't archived."""
+        for archive_format in [self.archive_format] + [name for name in ARCHIVE_OPENERS if name != self.archive_format]:
+            path = self.file(year, archive_format)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def years(self):
+        """Return the archived years."""
+        if not os.path.isdir(self.archive_dir):
+            return set()
+        return {
+            int(match.group(1))
+            for match in map(ARCHIVE_FILE_PATTERN.match, os.listdir(self.archive_dir)) if match
+        }
+
+    def read(self, year, quarantined=None):
+        """
+        Read an archived year as nested tasks data (empty if it isn't
+        archived). Malformed entries are left out and added to quarantined if
+        it is given, otherwise they raise TaskFileError. Raises OSError or a
+        decompression error if the file is damaged. An unchanged file is
+        served from the cache; only years read without malformed entries are
+        cached, so those are reported every time.
+        """
+        path = self.path(year)
+        if path is None:
+            return {}
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return {}
+        signature = (path, stat.st_mtime_ns, stat.st_size)
+        with self.cache_lock:
+            cached = self.cache.get(year)
+            if cached is not None and cached[0] == signature:
+                self.cache.move_to_end(year)
+                count("archive.cache_hits")
+                return copy_nested(cached[1])
+        problems = []
+        opener = ARCHIVE_OPENERS[path.rsplit(".", 1)[1]]
+        with span("load.archive"), opener(path, 'rt', encoding='utf-8') as f:
+            data = read_tasks_json(f, problems if quarantined is not None else None)
+        count("archive.years_read")
+        if problems:
+            quarantined.extend(problems)
+        elif self.cache_size > 0:
+            with self.cache_lock:
+                self.cache[year] = (signature, copy_nested(data))
+                self.cache.move_to_end(year)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return data
+
+    def forget(self, year):
+        """Drop a year from the cache, once its archive is rewritten or removed."""
+        with self.cache_lock:
+            self.cache.pop(year, None)
+
+    def write(self, year, data):
+        """
+        Write a year's nested tasks data as its archive atomically, replacing
+        an archive in the other format. Returns the compressed size.
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        self.forget(year)
+        path = self.file(year, self.archive_format)
+        temp_file = path + ".tmp"
+        with span("save.archive"):
+            with ARCHIVE_OPENERS[self.archive_format](temp_file, 'wt', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_file, path)
+        for archive_format in ARCHIVE_OPENERS:
+            other = self.file(year, archive_format)
+            if other != path and os.path.exists(other):
+                os.remove(other)
+        size = os.path.getsize(path)
+        count("bytes_written", size)
+        return size
+
+    def remove(self, year):
+        """Delete the archive of a year, once it is back in the working set."""
+        self.forget(year)
+        for archive_format in ARCHIVE_OPENERS:
+            path = self.file(year, archive_format)
+            if os.path.exists(path):
+                os.remove(path)
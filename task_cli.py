@@ -0,0 +1,248 @@
+"""
+Command-line interface for scripting the Year Planner without a display.
+
+    python year_planner.py add 2026-03-01 "Call the dentist" [--repeat weekly]
+    python year_planner.py list [DATE | --from DATE --to DATE] [--json]
+    python year_planner.py delete 2026-03-01 2      (R1 deletes recurring task 1)
+    python year_planner.py clear 2026-03-01 [--to DATE]
+    python year_planner.py export tasks.csv         (or .ics, or .json in the tasks.json layout)
+    python year_planner.py stats [--json]
+    python year_planner.py archive [--keep-years N]
+
+year_planner.py hands these commands to main() before it imports tkinter,
+so neither tkinter, tkcalendar nor PIL is loaded. Edits go through
+TaskStore without a background writer: each one is validated and
+persisted (journal append or SQLite transaction, under the file lock)
+before the command exits. Only the years a command needs are read.
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+from datetime import date, datetime
+
+from task_store import TaskStore, TaskStoreError, ARCHIVE_KEEP_YEARS
+from task_io import export_file
+from task_recurrence import FREQUENCIES, describe_rule
+from instrumentation import configure_logging, enable_metrics, LOG_LEVEL
+
+COMMANDS = ("add", "list", "delete", "clear", "export", "stats", "archive")
+CLI_LOG_LEVEL = "WARNING"  # Keep stdout/stderr quiet for scripts unless --log-level is given
+# Options allowed before the command that take a value -> whether the value is required
+VALUE_OPTIONS = {"--log-level": True, "--metrics": False}
+# Errors reported as a one-line message with exit status 1 (OSError includes lock timeouts)
+CLI_ERRORS = (TaskStoreError, ValueError, OSError, sqlite3.Error)
+
+logger = logging.getLogger(__name__)
+
+def command_name(argv):
+    """
+    Return the first positional argument of argv (without the program name),
+    skipping the options before it and their values as argparse reads them,
+    or None if there is none.
+    """
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == "--":
+            return argv[i + 1] if i + 1 < len(argv) else None
+        if not arg.startswith("-") or arg == "-":
+            return arg
+        # argparse also accepts unambiguous prefixes such as --log
+        option = next((name for name in VALUE_OPTIONS if name.startswith(arg)), None) if "=" not in arg else None
+        if option is not None and i + 1 < len(argv) and (VALUE_OPTIONS[option] or not argv[i + 1].startswith("-")):
+            i += 1  # The option's value
+        i += 1
+    return None
+
+def is_cli_command(argv):
+    """True if the first positional argument of argv names a CLI command; the GUI takes no positional arguments."""
+    return command_name(argv) in COMMANDS
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r} (use YYYY-MM-DD)")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="year_planner.py", description="Year Planner command-line interface")
+    parser.add_argument("--log-level", default=None,
+                        help=f"DEBUG, INFO, WARNING or ERROR (default: {CLI_LOG_LEVEL}, or YEAR_PLANNER_LOG_LEVEL)")
+    parser.add_argument("--metrics", nargs="?", const="", metavar="PATH",
+                        help="collect timing and counter metrics and dump them as JSON at exit (to PATH or stderr)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add a task to a date")
+    add.add_argument("date", type=parse_date)
+    add.add_argument("task")
+    add.add_argument("--repeat", choices=FREQUENCIES, help="repeat the task from the date on")
+
+    list_ = commands.add_parser("list", help="list the tasks of a date, a range of dates or all dates")
+    list_.add_argument("date", type=parse_date, nargs="?")
+    list_.add_argument("--from", dest="first", type=parse_date, metavar="DATE")
+    list_.add_argument("--to", dest="last", type=parse_date, metavar="DATE")
+    list_.add_argument("--json", action="store_true", help="print JSON instead of text")
+
+    delete = commands.add_parser("delete", help="delete a task by its number (R<n> for a recurring task)")
+    delete.add_argument("date", type=parse_date)
+    delete.add_argument("number")
+
+    clear = commands.add_parser("clear", help="delete all tasks of a date, or of a range of dates")
+    clear.add_argument("date", type=parse_date)
+    clear.add_argument("--to", dest="last", type=parse_date, metavar="DATE")
+
+    export = commands.add_parser("export", help="export all tasks to a .csv, .ics or .json (tasks.json layout) file")
+    export.add_argument("path")
+
+    stats = commands.add_parser("stats", help="show task counts")
+    stats.add_argument("--json", action="store_true", help="print JSON instead of text")
+
+    archive = commands.add_parser("archive", help="move past years into compressed archives (year-file storage)")
+    archive.add_argument("--keep-years", type=int, metavar="N",
+                         help=f"past years to keep in the working set (default: {ARCHIVE_KEEP_YEARS})")
+    return parser
+
+def years_between(first, last):
+    return range(first.year, last.year + 1)
+
+def run_add(store, args):
+    store.load([args.date.year])
+    if args.repeat:
+        rule = store.add_recurring(args.date, args.task, args.repeat)
+        print(f"Added recurring task R{rule.rule_id} ({describe_rule(rule)}) from {args.date}.")
+    else:
+        store.add(args.date, args.task)
+        print(f"Added task {len(store.tasks_for(args.date))} to {args.date}.")
+
+def run_list(store, args):
+    if args.date is not None and (args.first or args.last):
+        raise TaskStoreError("Give either a date or --from/--to, not both.")
+    if args.date is not None:
+        first = last = args.date
+    else:
+        first, last = args.first or date.min, args.last or date.max
+    if first > last:
+        raise TaskStoreError("--from must not be after --to.")
+    # Without both ends of the range every stored year is read
+    store.load(years_between(first, last) if first.year == last.year or args.first and args.last else None)
+    days = [
+        (date.fromordinal(ordinal), list(tasks))
+        for ordinal, tasks in store.tasks.range(first.toordinal(), last.toordinal())
+    ]
+    recurring = [
+        {"id": rule.rule_id, "task": rule.text, "repeat": describe_rule(rule)}
+        for rule in store.occurrences_for(args.date)
+    ] if args.date is not None else []
+    if args.json:
+        result = {date_obj.isoformat(): tasks for date_obj, tasks in days}
+        if args.date is not None:
+            result = {"date": args.date.isoformat(), "tasks": result.get(args.date.isoformat(), []), "recurring": recurring}
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return
+    for date_obj, tasks in days:
+        if args.date is None:
+            print(date_obj.isoformat())
+        for idx, task in enumerate(tasks, start=1):
+            print(f"[ {idx} ] {task}")
+    for rule in recurring:
+        print(f"[ R{rule['id']} ] {rule['task']} ({rule['repeat']})")
+    if not days and not recurring:
+        print("No tasks for this date." if args.date is not None else "No tasks.")
+
+def run_delete(store, args):
+    number = args.number.strip()
+    store.load([args.date.year])
+    if number[:1] in ("R", "r") and number[1:].isdigit():
+        rule = store.remove_recurring(int(number[1:]))
+        print(f"Deleted recurring task '{rule.text}'.")
+        return
+    if not number.isdigit():
+        raise TaskStoreError("Please enter a valid task number.")
+    removed_task = store.delete(args.date, int(number))
+    print(f"Deleted task '{removed_task}' from {args.date}.")
+
+def run_clear(store, args):
+    last = args.last or args.date
+    if args.date > last:
+        raise TaskStoreError("--to must not be before the date.")
+    store.load(years_between(args.date, last))
+    if last == args.date:
+        removed = store.clear(args.date)
+        print(f"Deleted {removed} task(s) from {args.date}.")
+    else:
+        removed, _ = store.clear_range(args.date, last)
+        print(f"Deleted {removed} task(s) from {args.date} to {last}.")
+
+def run_export(store, args):
+    store.load()
+    written = export_file(store.tasks, args.path)
+    print(f"Exported {written} task(s) to {args.path}.")
+
+def run_stats(store, args):
+    store.load()
+    years = {}
+    busiest = None
+    for ordinal, tasks in store.tasks.items():
+        counts = years.setdefault(date.fromordinal(ordinal).year, {"dates": 0, "tasks": 0})
+        counts["dates"] += 1
+        counts["tasks"] += len(tasks)
+        if busiest is None or len(tasks) > len(busiest[1]):
+            busiest = (ordinal, tasks)
+    stats = {
+        "tasks": sum(year["tasks"] for year in years.values()),
+        "dates": sum(year["dates"] for year in years.values()),
+        "recurring": len(store.recurrences.rules),
+        "busiest_date": {"date": date.fromordinal(busiest[0]).isoformat(), "tasks": len(busiest[1])} if busiest else None,
+        "years": {str(year): counts for year, counts in years.items()},
+        "storage": store.storage.name,
+    }
+    if args.json:
+        json.dump(stats, sys.stdout, indent=2)
+        print()
+        return
+    print(f"{stats['tasks']} task(s) on {stats['dates']} date(s), {stats['recurring']} recurring task(s) ({stats['storage']} storage)")
+    if busiest:
+        print(f"Busiest date: {stats['busiest_date']['date']} with {stats['busiest_date']['tasks']} task(s)")
+    for year, counts in years.items():
+        print(f"{year}: {counts['tasks']} task(s) on {counts['dates']} date(s)")
+
+def run_archive(store, args):
+    archived = store.archive_past_years(args.keep_years)
+    if archived:
+        print(f"Archived {', '.join(map(str, archived))}.")
+    else:
+        print("No years to archive.")
+
+RUNNERS = {
+    "add": run_add, "list": run_list, "delete": run_delete,
+    "clear": run_clear, "export": run_export, "stats": run_stats,
+    "archive": run_archive,
+}
+
+def main(argv=None):
+    """Run one command and return the exit status (0 on success, 1 on errors)."""
+    args = build_parser().parse_args(argv)
+    configure_logging(args.log_level or (LOG_LEVEL if "YEAR_PLANNER_LOG_LEVEL" in os.environ else CLI_LOG_LEVEL))
+    if args.metrics is not None:
+        enable_metrics(args.metrics or None)
+    store = TaskStore()
+    status = 0
+    try:
+        RUNNERS[args.command](store, args)
+    except CLI_ERRORS as e:
+        print(f"Error: {e}", file=sys.stderr)
+        status = 1
+    finally:
+        try:
+            store.close()
+        except CLI_ERRORS as e:
+            print(f"Error: could not close the tasks: {e}", file=sys.stderr)
+            status = 1
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
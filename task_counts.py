@@ -0,0 +1,167 @@
+"""
+Task counts kept in step with a TaskTable.
+
+TaskCounts holds the number of tasks of every date, ISO week (keyed by its
+Monday's ordinal), month and year, plus per year a Fenwick tree (binary
+indexed tree) over the days of the year. Its prefix sums give the number
+of tasks between any two dates in a few steps per year, without walking
+the dates. An edit of a date changes one day, week, month and year count
+and at most nine tree nodes, so the store updates the counts on every add,
+delete and clear at a fixed cost; only a load counts all the dates again.
+"""
+from array import array
+from bisect import bisect_right
+from datetime import date
+from itertools import accumulate
+
+from task_table import month_bounds, year_bounds
+
+YEAR_DAYS = 366  # Days of year are 1 to 365 (366 in leap years); index 0 is unused
+HEAT_THRESHOLDS = (1, 2, 4, 8)  # Smallest task count of each heat level 1, 2, 3, 4 (level 0: no tasks)
+
+def heat_level(count):
+    """Return the heat level (0 to len(HEAT_THRESHOLDS)) of a task count."""
+    return bisect_right(HEAT_THRESHOLDS, count)
+
+def week_start(ordinal):
+    """Return the ordinal of the Monday of a date's ISO week."""
+    return ordinal - (ordinal + 6) % 7  # Ordinal 1 (January 1 of year 1) is a Monday
+
+class YearCounts:
+    """Task counts of one year: per day of the year, per month, in total, and the Fenwick tree of the days."""
+    __slots__ = ("offset", "days", "tree", "months", "total")
+
+    def __init__(self, year):
+        self.offset = date(year, 1, 1).toordinal() - 1  # ordinal - offset is the day of the year
+        self.days = array('l', bytes(array('l').itemsize * (YEAR_DAYS + 1)))
+        self.tree = array('l', self.days)
+        self.months = [0] * 13  # Index 1 to 12
+        self.total = 0
+
+    def build(self, year):
+        """Fill in the tree, month and year counts from days, in one pass."""
+        tree = array('l', self.days)
+        for i in range(1, YEAR_DAYS + 1):
+            parent = i + (i & -i)
+            if parent <= YEAR_DAYS:
+                tree[parent] += tree[i]
+        self.tree = tree
+        sums = list(accumulate(self.days))
+        for month in range(1, 13):
+            first, last = month_bounds(year, month)
+            self.months[month] = sums[last - self.offset] - sums[first - self.offset - 1]
+        self.total = sums[-1]
+
+    def add(self, day, delta):
+        """Add delta tasks to a day of the year."""
+        self.days[day] += delta
+        tree = self.tree
+        while day <= YEAR_DAYS:
+            tree[day] += delta
+            day += day & -day
+
+    def prefix(self, day):
+        """Number of tasks from January 1 to a day of the year."""
+        tree = self.tree
+        total = 0
+        while day > 0:
+            total += tree[day]
+            day &= day - 1
+        return total
+
+class TaskCounts:
+    """
+    Task counts of a TaskTable. After rebuild(table), call update() with the
+    dates whose tasks changed; table is the table the counts are for.
+    """
+
+    def __init__(self):
+        self.table = None
+        self.years = {}  # year -> YearCounts
+        self.weeks = {}  # Monday ordinal -> tasks in that week (weeks without tasks left out)
+
+    def rebuild(self, table):
+        """Count the tasks of every date of table."""
+        self.table = table
+        self.years = {}
+        self.weeks = {}
+        weeks = self.weeks
+        for year in table.years():
+            counts = YearCounts(year)
+            days = counts.days
+            offset = counts.offset
+            for ordinal, tasks in table.range(*year_bounds(year)):
+                days[ordinal - offset] = len(tasks)
+                monday = week_start(ordinal)
+                weeks[monday] = weeks.get(monday, 0) + len(tasks)
+            counts.build(year)
+            self.years[year] = counts
+
+    def update(self, ordinals):
+        """Bring the counts of some dates in line with table after their tasks changed."""
+        days = self.table.days
+        for ordinal in ordinals:
+            delta = len(days.get(ordinal, ())) - self.day(ordinal)
+            if delta:
+                self.adjust(ordinal, delta)
+
+    def adjust(self, ordinal, delta):
+        date_obj = date.fromordinal(ordinal)
+        counts = self.years.get(date_obj.year)
+        if counts is None:
+            counts = self.years[date_obj.year] = YearCounts(date_obj.year)
+        counts.add(ordinal - counts.offset, delta)
+        counts.months[date_obj.month] += delta
+        counts.total += delta
+        monday = week_start(ordinal)
+        week = self.weeks.get(monday, 0) + delta
+        if week:
+            self.weeks[monday] = week
+        else:
+            self.weeks.pop(monday, None)
+
+    def day(self, ordinal):
+        """Number of tasks on a date."""
+        counts = self.years.get(date.fromordinal(ordinal).year)
+        return counts.days[ordinal - counts.offset] if counts is not None else 0
+
+    def month_days(self, year, month):
+        """Return {day: number of tasks} for the days of a month that have tasks."""
+        counts = self.years.get(year)
+        if counts is None:
+            return {}
+        first, last = month_bounds(year, month)
+        start = first - counts.offset
+        return {
+            day: count
+            for day, count in enumerate(counts.days[start:last - counts.offset + 1], start=1) if count
+        }
+
+    def week(self, ordinal):
+        """Number of tasks in the ISO week (Monday to Sunday) of a date."""
+        return self.weeks.get(week_start(ordinal), 0)
+
+    def month(self, year, month):
+        """Number of tasks in a month."""
+        counts = self.years.get(year)
+        return counts.months[month] if counts is not None else 0
+
+    def year(self, year):
+        """Number of tasks in a year."""
+        counts = self.years.get(year)
+        return counts.total if counts is not None else 0
+
+    def between(self, first, last):
+        """Number of tasks on the dates from first to last (ordinals, both included)."""
+        total = 0
+        for counts in self.years.values():
+            # Days of this year within the range; the tree has no entries past the year's last day
+            start = max(first - counts.offset, 1)
+            stop = min(last - counts.offset, YEAR_DAYS)
+            if start > stop:
+                continue
+            if start == 1 and stop == YEAR_DAYS:
+                total += counts.total
+            else:
+                total += counts.prefix(stop) - counts.prefix(start - 1)
+        return total
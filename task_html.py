@@ -0,0 +1,329 @@
+"""
+HTML rendering of the tasks overview.
+
+The pages are produced as generators of string chunks, so they can be
+streamed to a file or an HTTP response without building the whole page in
+memory. TaskOverview renders the pages of a TaskStore and keeps each
+month's section in a MonthFragmentCache, so after an edit only the edited
+month is rendered again. Nothing here imports tkinter.
+"""
+import html
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from task_table import month_bounds, year_bounds
+from instrumentation import count
+
+MONTH_CACHE_SIZE = 240  # Rendered month sections kept (twenty years)
+
+MONTH_NAMES = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December"
+]
+
+HTML_HEAD = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>%s</title>
+        <style>
+            body { font-family: Arial, sans-serif; margin: 20px; background-color: #f9f9f9; }
+            h1 { color: #333; text-align: center; }
+            .nav-bar { text-align: center; margin-bottom: 20px; }
+            .nav-bar button {
+                background-color: #4CAF50; /* Green */
+                border: none;
+                color: white;
+                padding: 10px 20px;
+                margin: 5px;
+                text-align: center;
+                text-decoration: none;
+                display: inline-block;
+                font-size: 14px;
+                cursor: pointer;
+                border-radius: 4px;
+                transition: background-color 0.3s;
+            }
+            .nav-bar button:hover {
+                background-color: #45a049;
+            }
+            .date-section { margin-bottom: 20px; display: none; }
+            .date-title { font-size: 1.2em; color: #555; margin-bottom: 10px; }
+            ul { list-style-type: disc; margin-left: 20px; }
+            li { margin-bottom: 5px; }
+            #allTasksBtn { background-color: #008CBA; } /* Blue */
+            #allTasksBtn:hover { background-color: #007bb5; }
+            /* Year Buttons */
+            .year-section { margin-bottom: 30px; }
+            .year-title { font-size: 1.5em; color: #333; margin-top: 20px; }
+            .month-buttons { text-align: center; margin-bottom: 10px; }
+        </style>
+        <script>
+            var selectedYear = null;
+
+            function showAllTasks() {
+                // Hide all date sections
+                var sections = document.getElementsByClassName('date-section');
+                for (var i = 0; i < sections.length; i++) {
+                    sections[i].style.display = 'none';
+                }
+                // Show all tasks
+                var allSections = document.getElementsByClassName('date-section-all');
+                for (var i = 0; i < allSections.length; i++) {
+                    allSections[i].style.display = 'block';
+                }
+                // Reset selectedYear
+                selectedYear = null;
+            }
+
+            function setYear(year) {
+                selectedYear = year;
+                // Hide all date sections
+                var sections = document.getElementsByClassName('date-section');
+                for (var i = 0; i < sections.length; i++) {
+                    sections[i].style.display = 'none';
+                }
+                // Show date sections for the selected year
+                var yearSections = document.getElementsByClassName('year-' + year);
+                for (var i = 0; i < yearSections.length; i++) {
+                    yearSections[i].style.display = 'block';
+                }
+            }
+
+            function toggleMonth(year, month) {
+                // Show or hide tasks for a specific month in a specific year
+                var sectionId = 'section-' + year + '-' + month;
+                var section = document.getElementById(sectionId);
+                if (section.style.display === 'block') {
+                    section.style.display = 'none';
+                } else {
+                    // Hide other sections for the same year
+                    var yearSections = document.getElementsByClassName('month-section-' + year);
+                    for (var i = 0; i < yearSections.length; i++) {
+                        if (yearSections[i].id !== sectionId) {
+                            yearSections[i].style.display = 'none';
+                        }
+                    }
+                    section.style.display = 'block';
+                }
+            }
+        </script>
+    </head>
+    <body>
+"""
+
+HTML_TAIL = """
+    </body>
+    </html>
+    """
+
+class MonthFragmentCache:
+    """
+    LRU cache of rendered month sections, keyed by (year, month). Each entry
+    keeps the version it was rendered for (e.g. TaskStore.month_generation());
+    asking with another version renders the month again. hits and misses
+    count the lookups, for tuning the size.
+    """
+
+    def __init__(self, size=MONTH_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()  # (year, month) -> (version, HTML), least recently used first
+        self.lock = threading.Lock()  # Pages may be rendered on several server threads
+        self.hits = 0
+        self.misses = 0
+
+    def fragment(self, year, month, version, render):
+        """Return the cached section of a month if it is of version, else render() and cache it."""
+        key = (year, month)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                count("html.month_cache_hits")
+                return entry[1]
+            self.misses += 1
+        count("html.month_cache_misses")
+        section = render()
+        with self.lock:
+            self.entries[key] = (version, section)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return section
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+def render_month_html(year, month, table):
+    """Return the HTML section of one month of a TaskTable, or "" if the month has no tasks."""
+    chunks = []
+    for ordinal, tasks in table.range(*month_bounds(year, month)):
+        formatted_date = date.fromordinal(ordinal).strftime("%B %d, %Y")
+        chunks.append(f'                <div class="date-title">{formatted_date}</div>\n')
+        chunks.append('                <ul>\n')
+        chunks.append(''.join(f'                    <li>{html.escape(task)}</li>\n' for task in tasks))
+        chunks.append('                </ul>\n')
+    if not chunks:
+        return ""
+    section_id = f'section-{year}-{month}'
+    return (
+        f'            <div class="date-section month-section-{year}" id="{section_id}">\n'
+        + ''.join(chunks)
+        + '            </div>\n'
+    )
+
+def iter_year_html(year, table, cache=None, version=None):
+    """
+    Yield the HTML of one year section of a TaskTable, one month at a time.
+    With a MonthFragmentCache, month sections are taken from it when
+    version(year, month) still matches.
+    """
+    if cache is None:
+        months = [month for month in range(1, 13) if next(table.range(*month_bounds(year, month)), None)]
+        sections = ((month, render_month_html(year, month, table)) for month in months)
+    else:
+        sections = []
+        for month in range(1, 13):
+            section = cache.fragment(year, month, version(year, month),
+                                     lambda month=month: render_month_html(year, month, table))
+            if section:
+                sections.append((month, section))
+        months = [month for month, _ in sections]
+    yield f'        <div class="year-section year-{year}">\n'
+    yield f'            <div class="year-title">{year}</div>\n'
+    # Create month buttons for the year
+    yield '            <div class="month-buttons">\n'
+    for month in months:
+        month_name = MONTH_NAMES[month - 1]
+        yield f'                <button onclick="toggleMonth({year}, {month})">{month_name}</button>\n'
+    yield '            </div>\n'
+
+    # Add task sections for each month
+    for _, section in sections:
+        yield section
+    yield '        </div>\n'
+
+def iter_tasks_html(table, cache=None, version=None):
+    """
+    Yield the tasks overview page for a TaskTable in chunks, so it can be streamed to a file.
+    cache and version are passed on to iter_year_html.
+    """
+    years = table.years()
+    yield HTML_HEAD % "Tasks Overview"
+    yield """        <h1>All Tasks</h1>
+        <div class="nav-bar">
+            <button id="allTasksBtn" onclick="showAllTasks()">All Tasks</button>
+"""
+    # Add buttons for each unique year
+    for year in years:
+        yield f'            <button onclick="setYear({year})">{year}</button>\n'
+    yield """
+        </div>
+"""
+    for year in years:
+        yield from iter_year_html(year, table, cache, version)
+    yield HTML_TAIL
+
+def iter_year_page_html(year, table, cache=None, version=None):
+    """
+    Yield a standalone page for a single year, linking back to the index page.
+    """
+    yield HTML_HEAD % f"Tasks {year}"
+    yield f"""        <h1>Tasks {year}</h1>
+        <div class="nav-bar">
+            <a href="index.html"><button id="allTasksBtn">All Years</button></a>
+        </div>
+"""
+    yield from iter_year_html(year, table, cache, version)
+    yield HTML_TAIL
+
+def iter_index_html(table):
+    """
+    Yield the index page that links to one page per year.
+    """
+    yield HTML_HEAD % "Tasks Overview"
+    yield """        <h1>All Tasks</h1>
+        <div class="nav-bar">
+"""
+    for year in table.years():
+        task_count = table.task_count(*year_bounds(year))
+        yield f'            <a href="tasks-{year}.html"><button>{year} ({task_count})</button></a>\n'
+    yield """        </div>
+"""
+    yield HTML_TAIL
+
+def write_html(path, chunks):
+    """Stream HTML chunks to a file."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+def write_tasks_html_split(directory, table, cache=None, version=None):
+    """
+    Write one page per year of a TaskTable plus an index page into directory.
+    Returns the path of the index page.
+    """
+    for year in table.years():
+        write_html(os.path.join(directory, f"tasks-{year}.html"), iter_year_page_html(year, table, cache, version))
+    index_path = os.path.join(directory, "index.html")
+    write_html(index_path, iter_index_html(table))
+    return index_path
+
+class TaskOverview:
+    """
+    The overview pages of a TaskStore, with the recurring tasks of the listed
+    years (plus an extra year, e.g. the one viewed) merged in. Month sections
+    come from a MonthFragmentCache checked against the store's month
+    generations, so they are only rendered again after their month changed.
+    Each method reads the store, or source if given: a TaskSnapshot of it
+    (TaskStore.snapshot()) for rendering on another thread.
+    """
+
+    def __init__(self, store, cache_size=MONTH_CACHE_SIZE):
+        self.store = store
+        self.cache = MonthFragmentCache(cache_size)
+
+    def prepare(self, extra_year=None, source=None, year=None):
+        """
+        Return the TaskTable to render and the version function of its months.
+        Archived years are read for this rendering alone; see TaskStore.all_tasks().
+        With year, only that year is rendered, so no other archive is read.
+        """
+        store = self.store if source is None else source
+        if year is None:
+            table = store.all_tasks()
+            years = set(table.years())
+            if extra_year is not None:
+                years.add(extra_year)
+        else:
+            table = store.year_tasks(year)
+            years = {year}
+        table = store.tasks_with_occurrences(years, table)
+
+        def version(year, month):
+            # A month renders differently with and without its recurring tasks expanded
+            return store.month_generation(year, month), year in years
+        return table, version
+
+    def iter_page(self, extra_year=None, source=None):
+        """Yield the overview page of all years."""
+        table, version = self.prepare(extra_year, source)
+        return iter_tasks_html(table, self.cache, version)
+
+    def iter_year_page(self, year, source=None):
+        """Yield the page of one year."""
+        table, version = self.prepare(source=source, year=year)
+        return iter_year_page_html(year, table, self.cache, version)
+
+    def iter_index(self, extra_year=None, source=None):
+        """Yield the index page linking the year pages."""
+        table, _ = self.prepare(extra_year, source)
+        return iter_index_html(table)
+
+    def write_split(self, directory, extra_year=None):
+        """Write the year pages and the index page into directory; returns the index page's path."""
+        table, version = self.prepare(extra_year)
+        return write_tasks_html_split(directory, table, self.cache, version)
@@ -0,0 +1,233 @@
+"""
+Streaming import and export of planner tasks as CSV, iCalendar (.ics) and
+JSON in the nested tasks.json layout (a portable copy of any storage format).
+
+Exports walk a TaskTable and write one record at a time. Imports read one
+record at a time and merge them into a TaskStore in chunks. Every chunk is
+checked with validate_days, and all imported dates are persisted as a
+single batch at the end.
+"""
+import csv
+import json
+import logging
+from datetime import date, datetime, timezone
+
+from task_json import TasksJsonReader
+from instrumentation import count, span
+
+logger = logging.getLogger(__name__)
+
+CSV_HEADER = ["date", "task"]
+IMPORT_CHUNK_SIZE = 10000  # Rows merged into the store per validated chunk
+ICS_LINE_LIMIT = 75  # Octets per iCalendar content line before folding
+
+def iter_tasks(table):
+    """Yield (date string, task) for every task of a TaskTable in date order."""
+    for ordinal, tasks in table.items():
+        date_str = date.fromordinal(ordinal).isoformat()
+        for task in tasks:
+            yield date_str, task
+
+def export_csv(table, f):
+    """Write every task as a "date,task" row. Returns the number of tasks written."""
+    writer = csv.writer(f)
+    writer.writerow(CSV_HEADER)
+    written = 0
+    for row in iter_tasks(table):
+        writer.writerow(row)
+        written += 1
+    return written
+
+def read_csv(f):
+    """Yield (date string, task) rows from a CSV file, skipping the header."""
+    reader = csv.reader(f)
+    for row in reader:
+        if reader.line_num == 1 and [cell.strip().lower() for cell in row] == CSV_HEADER:
+            continue
+        if not row:
+            continue
+        yield row[0], ",".join(row[1:])
+
+def escape_ics_text(text):
+    """Escape a TEXT value for iCalendar."""
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def unescape_ics_text(text):
+    """Undo escape_ics_text."""
+    if "\\" not in text:
+        return text
+    result = []
+    chars = iter(text)
+    for char in chars:
+        if char == "\\":
+            escaped = next(chars, "")
+            result.append("\n" if escaped in ("n", "N") else escaped)
+        else:
+            result.append(char)
+    return "".join(result)
+
+def fold_ics_line(line):
+    """Fold a content line at ICS_LINE_LIMIT octets without splitting characters."""
+    if len(line.encode("utf-8")) <= ICS_LINE_LIMIT:
+        return line + "\r\n"
+    parts = []
+    current = ""
+    current_size = 0
+    limit = ICS_LINE_LIMIT
+    for char in line:
+        size = len(char.encode("utf-8"))
+        if current_size + size > limit:
+            parts.append(current)
+            current, current_size = "", 0
+            limit = ICS_LINE_LIMIT - 1  # Continuation lines start with a space
+        current += char
+        current_size += size
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+def export_json(table, f):
+    """Write the tasks in the nested year -> month -> day layout of tasks.json. Returns the number of tasks written."""
+    json.dump(table.to_nested(), f, indent=4)
+    return table.task_count()
+
+def read_json(f):
+    """
+    Yield (date string, task) rows from a file in the tasks.json layout,
+    one month at a time as it is parsed, so the file is never held whole.
+    """
+    # Raises TaskFileError (a ValueError) at the first malformed entry
+    for year, month, days in TasksJsonReader(f).iter_months():
+        for day, tasks in days.items():
+            try:
+                date_str = date(int(year), int(month), int(day)).isoformat()
+            except ValueError:
+                date_str = f"{year}-{month}-{day}"  # Skipped as an invalid date
+            for task in tasks:
+                yield date_str, task
+
+def export_ics(table, f):
+    """Write every task as an all-day VEVENT. Returns the number of tasks written."""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Year Planner//EN\r\n")
+    written = 0
+    position = 0
+    previous_date = None
+    for date_str, task in iter_tasks(table):
+        position = position + 1 if date_str == previous_date else 1
+        previous_date = date_str
+        compact_date = date_str.replace("-", "")
+        f.write("BEGIN:VEVENT\r\n")
+        f.write(f"UID:{compact_date}-{position}@year-planner\r\n")
+        f.write(f"DTSTAMP:{stamp}\r\n")
+        f.write(f"DTSTART;VALUE=DATE:{compact_date}\r\n")
+        f.write(fold_ics_line(f"SUMMARY:{escape_ics_text(task)}"))
+        f.write("END:VEVENT\r\n")
+        written += 1
+    f.write("END:VCALENDAR\r\n")
+    return written
+
+def unfold_ics_lines(f):
+    """Yield logical iCalendar content lines, joining folded continuations."""
+    current = None
+    for raw_line in f:
+        line = raw_line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+def read_ics(f):
+    """Yield (date string, summary) for every VEVENT of an iCalendar file."""
+    in_event = False
+    start = summary = None
+    for line in unfold_ics_lines(f):
+        name, _, value = line.partition(":")
+        name = name.split(";", 1)[0].upper()
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            in_event = True
+            start = summary = None
+        elif name == "END" and value.upper() == "VEVENT":
+            if in_event and start is not None:
+                yield start, summary or ""
+            in_event = False
+        elif in_event and name == "DTSTART":
+            digits = value[:8]
+            start = f"{digits[:4]}-{digits[4:6]}-{digits[6:8]}"
+        elif in_event and name == "SUMMARY":
+            summary = unescape_ics_text(value)
+
+def parse_row(date_str, task):
+    """
+    Turn an imported (date, task) pair into (date ordinal, task).
+    Raises ValueError for an invalid date or an empty task.
+    """
+    ordinal = date.fromisoformat(date_str.strip()).toordinal()
+    task = task.strip()
+    if not task:
+        raise ValueError("empty task")
+    return ordinal, task
+
+def import_rows(store, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Merge (date string, task) rows into store and persist them as one batch.
+    Rows with an invalid date or an empty task are skipped.
+    Returns (imported, skipped, changed dates).
+    """
+    imported = skipped = pending = 0
+    changed = set()
+    chunk = {}
+    try:
+        for row_no, (date_str, task) in enumerate(rows, start=1):
+            try:
+                ordinal, task = parse_row(date_str, task)
+            except ValueError as e:
+                skipped += 1
+                logger.warning("Skipping import row %d (%r, %r): %s", row_no, date_str, task, e)
+                continue
+            chunk.setdefault(ordinal, []).append(task)
+            pending += 1
+            if pending >= chunk_size:
+                changed |= store.add_many(chunk)
+                imported += pending
+                chunk, pending = {}, 0
+        if pending:
+            changed |= store.add_many(chunk)
+            imported += pending
+    finally:
+        # Whatever was merged is persisted, even if reading the file failed halfway
+        store.commit(changed)
+    count("tasks.imported", imported)
+    logger.info("Imported %d task(s) on %d date(s), skipped %d row(s).", imported, len(changed), skipped)
+    changed_dates = {date.fromordinal(ordinal) for ordinal in changed}
+    return imported, skipped, changed_dates
+
+def file_format(path):
+    """Return "csv", "ics" or "json" from a file name."""
+    lowered = path.lower()
+    if lowered.endswith(".csv"):
+        return "csv"
+    if lowered.endswith((".ics", ".ical", ".ifb")):
+        return "ics"
+    if lowered.endswith(".json"):
+        return "json"
+    raise ValueError(f"Unsupported file type: {path} (use .csv, .ics or .json)")
+
+READERS = {"csv": read_csv, "ics": read_ics, "json": read_json}
+WRITERS = {"csv": export_csv, "ics": export_ics, "json": export_json}
+
+def import_file(store, path):
+    """Import a .csv, .ics or .json file into store. Returns (imported, skipped, changed dates)."""
+    reader = READERS[file_format(path)]
+    with span("import"), open(path, 'r', encoding='utf-8', newline='') as f:
+        return import_rows(store, reader(f))
+
+def export_file(table, path):
+    """Export a TaskTable to a .csv, .ics or .json file. Returns the number of tasks written."""
+    writer = WRITERS[file_format(path)]
+    with span("export"), open(path, 'w', encoding='utf-8', newline='') as f:
+        return writer(table, f)
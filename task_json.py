@@ -0,0 +1,358 @@
+"""
+Streaming reader for the tasks.json layout.
+
+read_tasks_json() reads a tasks.json file a chunk at a time and checks each
+entry as it is parsed, instead of json.load() followed by a second pass of
+validate_tasks_data() over the whole tree. Each month is decoded by the json
+module's C decoder in one call and its days are checked right away, so a
+clean file reads at about json.load speed, and besides the tasks themselves
+only a chunk and one month are held in memory.
+
+A malformed entry (a key that isn't a number, a month that isn't an object,
+a day that isn't a list of task texts, or text that isn't JSON at all) is
+quarantined: it is left out and reported with its location, and the rest of
+the file is still read. Text that isn't JSON is skipped to where its
+brackets close, matched by kind, so recovery never runs past the object it
+is in. A month that isn't valid JSON is read again day by day, from its own
+text only, so just its broken days are quarantined; a month cut off by the
+end of the file is read day by day too, keeping the days before the cut.
+Without a quarantine list the first problem raises TaskFileError instead.
+"""
+import io
+import json
+import re
+from collections import namedtuple
+from json.decoder import scanstring
+
+LOAD_CHUNK_SIZE = 1 << 20  # Characters read from the file at a time
+TRUNCATION_MARGIN = 6  # A token cut off this close to the end may only be incomplete (e.g. a \\uXXXX escape)
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+DIGIT_KEY = re.compile(r'[ \t\n\r]*"(\d+)"[ \t\n\r]*:[ \t\n\r]*')  # The usual key, matched without scanstring
+# Strings and brackets, to find where a value that isn't valid JSON ends
+SKIP_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*(")?|[\[{\]},]')
+DECODER = json.JSONDecoder()
+TEXT_TYPES = {str}
+
+QuarantinedEntry = namedtuple("QuarantinedEntry", "location reason")
+
+class TaskFileError(ValueError):
+    """Raised when a tasks.json file has a malformed entry and nothing may be left out."""
+
+class EndOfTasks(Exception):
+    """Raised inside the reader when the file ends in the middle of an entry."""
+
+    def __init__(self, path):
+        super().__init__("/".join(path))
+        self.path = path
+
+def describe_entry(entry):
+    """Describe a quarantined entry, e.g. "2026/3/14: not a list of task texts"."""
+    return f"{entry.location}: {entry.reason}"
+
+def is_task_list(value):
+    return type(value) is list and set(map(type, value)) <= TEXT_TYPES
+
+def is_day_entry(item):
+    return item[0].isdigit() and is_task_list(item[1])
+
+def truncated(text, error):
+    """True if a decode error may only mean that the value goes on past the end of text."""
+    return error.pos >= len(text) - TRUNCATION_MARGIN or error.msg.startswith("Unterminated string")
+
+class TasksJsonReader:
+    """
+    Parse one tasks.json file into the nested year -> month -> day layout
+    (read()), or month by month as it is read (iter_months()).
+    Malformed entries are appended to quarantine (a list of
+    QuarantinedEntry), or raise TaskFileError if quarantine is None.
+    """
+
+    def __init__(self, f, quarantine=None, chunk_size=LOAD_CHUNK_SIZE):
+        self.f = f
+        self.quarantine = quarantine
+        self.chunk_size = chunk_size
+        self.text = ""  # Unparsed text read so far, from pos on
+        self.pos = 0
+        self.month_size = 0  # Length of the longest month so far, read ahead before decoding a month
+        self.eof = False
+
+    def fill(self, size=0):
+        """
+        Drop the parsed text and read the next chunk, or size characters if
+        that is more. Returns False at the end of the file.
+        """
+        if self.eof:
+            return False
+        chunk = self.f.read(max(self.chunk_size, size))
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+        return not self.eof
+
+    def more(self):
+        """Read more after a value was cut off: as much again as is left, so a long value takes few retries."""
+        return self.fill(len(self.text) - self.pos)
+
+    def problem(self, path, reason):
+        entry = QuarantinedEntry("/".join(path) or "(top level)", reason)
+        if self.quarantine is None:
+            raise TaskFileError(describe_entry(entry))
+        self.quarantine.append(entry)
+
+    def skip_whitespace(self):
+        """Move past whitespace and return the next character ("" at the end of the file)."""
+        while True:
+            self.pos = WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                return ""
+
+    def decode_value(self):
+        """Decode the JSON value at the current position and move past it. Raises JSONDecodeError."""
+        while True:
+            self.skip_whitespace()
+            try:
+                value, end = DECODER.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError as e:
+                if truncated(self.text, e) and self.more():
+                    continue
+                raise
+            if end == len(self.text) and self.more():
+                continue  # A number or literal may go on in the next chunk
+            self.pos = end
+            return value
+
+    def read_key(self):
+        """Read an object key and the ":" after it. Returns None if there is no valid key here."""
+        match = DIGIT_KEY.match(self.text, self.pos)
+        if match and match.end() < len(self.text):
+            self.pos = match.end()
+            return match.group(1)
+        while True:
+            if self.skip_whitespace() != '"':
+                return None
+            try:
+                key, end = scanstring(self.text, self.pos + 1)
+            except json.JSONDecodeError as e:
+                if truncated(self.text, e) and self.more():
+                    continue
+                return None
+            self.pos = end
+            if self.skip_whitespace() != ":":
+                return None
+            self.pos += 1
+            return key
+
+    def member_end(self):
+        """
+        Return where the member of an object that starts at the current
+        position ends: at the "," after it or the "}" closing the object,
+        or None if the file ends first. Brackets are matched by kind: a
+        closing bracket also closes the brackets left open inside its own
+        (the "[" of [1, 2 }), a "}" that closes nothing opened in the member
+        closes the object, and a stray "]" is passed over. More text is read
+        as needed; the position stays at the member.
+        """
+        while True:
+            opened = []
+            for match in SKIP_TOKEN.finditer(self.text, self.pos):
+                token = match.group()
+                if token[0] == '"':
+                    if match.group(1) is None:
+                        break  # A string cut off by the end of the text read so far
+                elif token in "[{":
+                    opened.append(token)
+                elif token == ",":
+                    if not opened:
+                        return match.start()
+                else:
+                    opener = "[" if token == "]" else "{"
+                    if opener in opened:
+                        del opened[len(opened) - 1 - opened[::-1].index(opener):]
+                    elif token == "}":
+                        return match.start()
+            if not self.more():
+                return None
+
+    def skip_member(self):
+        """
+        Move past the rest of a member that isn't valid JSON (see
+        member_end()). Returns False if the file ends first.
+        """
+        end = self.member_end()
+        if end is None:
+            self.pos = len(self.text)
+            return False
+        self.pos = end
+        return True
+
+    def skip_invalid(self, path, reason):
+        """Quarantine the member at the current position, which isn't valid JSON, and move past it."""
+        if not self.skip_member():
+            raise EndOfTasks(path)
+        self.problem(path, reason)
+
+    def skip_value(self, path, reason):
+        """Quarantine the value at the current position and move past it."""
+        try:
+            self.decode_value()
+        except json.JSONDecodeError:
+            if not self.skip_member():
+                raise EndOfTasks(path)
+            reason = "not valid JSON"
+        self.problem(path, reason)
+
+    def members(self, path):
+        """
+        Iterate over the keys of the object at the current position. After
+        each key the position is at its value, which the caller reads before
+        asking for the next key. Members that aren't valid JSON are skipped.
+        """
+        self.pos += 1  # The "{", checked by the caller
+        if self.skip_whitespace() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.read_key()
+            if key is None:
+                self.skip_invalid(path, "an entry is not valid JSON")
+            else:
+                yield key
+            char = self.skip_whitespace()
+            if not char:
+                raise EndOfTasks(path)
+            if char not in ",}":
+                self.skip_invalid(path, "an entry is not valid JSON")
+                char = self.text[self.pos]
+            self.pos += 1
+            if char != ",":
+                return
+
+    def read_month(self, path, days):
+        """
+        Read the days of a month into days, leaving out malformed ones. The
+        position is at its "{". A month that isn't valid JSON, or that the
+        file ends inside, is read day by day instead. Returns False if no day
+        of it could be kept.
+        """
+        if len(self.text) - self.pos < self.month_size:
+            self.fill(self.month_size)  # Decoding a month cut off by the end of the chunk would have to be redone
+        while True:
+            try:
+                month, end = DECODER.raw_decode(self.text, self.pos)
+                break
+            except json.JSONDecodeError as e:
+                if truncated(self.text, e) and self.more():
+                    continue
+                end = self.member_end()
+                if end is None:
+                    # Cut off by the end of the file: nothing follows, so keep the days before the cut
+                    self.read_month_days(path, days)
+                    return True
+                # Read day by day from a reader of the month's own text, so
+                # recovery can't run past its end into the next month
+                month_text = self.text[self.pos:end]
+                self.pos = end
+                reader = TasksJsonReader(io.StringIO(month_text), self.quarantine, len(month_text) + 1)
+                reader.skip_whitespace()
+                try:
+                    reader.read_month_days(path, days)
+                    if reader.skip_whitespace():
+                        self.problem(path, "text after the end of the month")
+                except EndOfTasks as e:
+                    self.problem(e.path, "not valid JSON")
+                return bool(days)
+        self.month_size = max(self.month_size, end - self.pos)
+        self.pos = end
+        if not all(map(is_day_entry, month.items())):
+            for day, tasks in list(month.items()):
+                if not day.isdigit():
+                    self.problem(path + [day], "day is not a number")
+                elif not is_task_list(tasks):
+                    self.problem(path + [day], "not a list of task texts")
+                else:
+                    continue
+                del month[day]
+        days.update(month)
+        return True
+
+    def read_month_days(self, path, days):
+        """Read a month cut off by the end of the file one day at a time."""
+        for day in self.members(path):
+            day_path = path + [day]
+            try:
+                tasks = self.decode_value()
+            except json.JSONDecodeError:
+                self.skip_invalid(day_path, "not valid JSON")
+                continue
+            if not day.isdigit():
+                self.problem(day_path, "day is not a number")
+            elif not is_task_list(tasks):
+                self.problem(day_path, "not a list of task texts")
+            else:
+                days[day] = tasks
+
+    def read_year(self, path):
+        """
+        Yield (month, days) for the months of a year as they are read. A
+        month the file ends inside is yielded with the days before the end.
+        """
+        for month in self.members(path):
+            month_path = path + [month]
+            if not month.isdigit():
+                self.skip_value(month_path, "month is not a number")
+            elif self.skip_whitespace() != "{":
+                self.skip_value(month_path, "not an object of days")
+            else:
+                days = {}
+                try:
+                    kept = self.read_month(month_path, days)
+                except EndOfTasks:
+                    if days:
+                        yield month, days
+                    raise
+                if kept:
+                    yield month, days
+
+    def iter_months(self):
+        """
+        Yield (year, month, days) for each month as soon as it is read, so
+        only one month is held at a time; the file ending early keeps
+        everything before the end.
+        """
+        try:
+            if not self.skip_whitespace():
+                self.problem([], "the file is empty")
+                return
+            if self.skip_whitespace() != "{":
+                self.skip_value([], "not an object of years")
+                return
+            for year in self.members([]):
+                if not year.isdigit():
+                    self.skip_value([year], "year is not a number")
+                elif self.skip_whitespace() != "{":
+                    self.skip_value([year], "not an object of months")
+                else:
+                    for month, days in self.read_year([year]):
+                        yield year, month, days
+            if self.skip_whitespace():
+                self.problem([], "text after the end of the tasks")
+        except EndOfTasks as e:
+            self.problem(e.path, "the file ends in the middle of this entry")
+
+    def read(self):
+        """Return the nested tasks data read from the file."""
+        data = {}
+        for year, month, days in self.iter_months():
+            data.setdefault(year, {})[month] = days
+        return data
+
+def read_tasks_json(f, quarantine=None):
+    """
+    Read nested tasks data from an open tasks.json file in one streaming
+    pass. Malformed entries are left out and appended to quarantine; if it
+    is None they raise TaskFileError.
+    """
+    return TasksJsonReader(f, quarantine).read()
@@ -0,0 +1,161 @@
+"""
+Recurring tasks of the Year Planner.
+
+A RecurrenceRule (e.g. "standup, weekly on Monday and Wednesday") is stored
+once instead of copying its text to every date. Occurrences are computed
+arithmetically for one month at a time, so storing, loading and expanding a
+rule costs the same whether it ends next week or never. RecurrenceSet caches
+the expansion of each month it was asked for and drops the cache whenever a
+rule is added or removed.
+"""
+import calendar
+import threading
+from collections import namedtuple
+from datetime import date
+
+FREQUENCIES = ("daily", "weekly", "monthly", "yearly")
+WEEKDAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MONTH_CACHE_LIMIT = 240  # Expanded months kept before the cache is dropped
+
+# freq is one of FREQUENCIES and interval repeats every n-th day/week/month/year.
+# weekdays (0 = Monday) only applies to weekly rules; until is the last
+# possible date, or None for a rule that never ends.
+RecurrenceRule = namedtuple("RecurrenceRule", "rule_id text freq start until interval weekdays")
+
+def rule_to_dict(rule):
+    """Return a JSON-serializable dict of a rule."""
+    return {
+        "id": rule.rule_id,
+        "text": rule.text,
+        "freq": rule.freq,
+        "start": rule.start.isoformat(),
+        "until": rule.until.isoformat() if rule.until else None,
+        "interval": rule.interval,
+        "weekdays": list(rule.weekdays),
+    }
+
+def rule_from_dict(record):
+    """Build a rule from rule_to_dict() output. Raises ValueError if it is invalid."""
+    if not isinstance(record, dict):
+        raise ValueError("Recurrence rule is not an object.")
+    try:
+        rule_id = record["id"]
+        text = record["text"]
+        freq = record["freq"]
+        start = date.fromisoformat(record["start"])
+        until = date.fromisoformat(record["until"]) if record.get("until") else None
+        interval = record.get("interval", 1)
+        weekdays = tuple(record.get("weekdays") or ())
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid recurrence rule: {e}")
+    if not isinstance(rule_id, int) or not isinstance(text, str) or not text.strip():
+        raise ValueError("Recurrence rule needs an integer id and a text.")
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Unknown recurrence frequency: {freq}")
+    if not isinstance(interval, int) or interval < 1:
+        raise ValueError(f"Invalid recurrence interval: {interval}")
+    if not all(isinstance(weekday, int) and 0 <= weekday <= 6 for weekday in weekdays):
+        raise ValueError(f"Invalid recurrence weekdays: {weekdays}")
+    if freq == "weekly" and not weekdays:
+        weekdays = (start.weekday(),)
+    return RecurrenceRule(rule_id, text, freq, start, until, interval, weekdays)
+
+def describe_rule(rule):
+    """Return a short description such as "every 2 weeks on Monday"."""
+    units = {"daily": "day", "weekly": "week", "monthly": "month", "yearly": "year"}
+    unit = units[rule.freq]
+    description = rule.freq if rule.interval == 1 else f"every {rule.interval} {unit}s"
+    if rule.freq == "weekly":
+        description += " on " + ", ".join(WEEKDAY_NAMES[weekday] for weekday in sorted(rule.weekdays))
+    if rule.until:
+        description += f" until {rule.until.isoformat()}"
+    return description
+
+def occurrence_days(rule, year, month):
+    """Return the days of a month on which rule occurs."""
+    last_day = calendar.monthrange(year, month)[1]
+    first = date(year, month, 1).toordinal()
+    last = first + last_day - 1
+    start = rule.start.toordinal()
+    lo = max(first, start)
+    hi = min(last, rule.until.toordinal()) if rule.until else last
+    if lo > hi:
+        return []
+
+    if rule.freq == "daily":
+        lo += (start - lo) % rule.interval
+        return [ordinal - first + 1 for ordinal in range(lo, hi + 1, rule.interval)]
+    if rule.freq == "weekly":
+        week_start = start - rule.start.weekday()  # Monday of the first week
+        return [
+            ordinal - first + 1 for ordinal in range(lo, hi + 1)
+            if (ordinal - week_start) % 7 in rule.weekdays
+            and (ordinal - week_start) // 7 % rule.interval == 0
+        ]
+    if rule.freq == "monthly":
+        months_since = (year - rule.start.year) * 12 + month - rule.start.month
+        if months_since % rule.interval:
+            return []
+    elif rule.freq == "yearly":
+        if month != rule.start.month or (year - rule.start.year) % rule.interval:
+            return []
+    # Monthly and yearly rules keep the start's day; months without it are skipped
+    day = rule.start.day
+    if day <= last_day and lo <= first + day - 1 <= hi:
+        return [day]
+    return []
+
+class RecurrenceSet:
+    """
+    The recurrence rules of a planner plus a cache of expanded months.
+    Months may be expanded on several threads (the HTML server), so the
+    rules and the cache are only changed or read under lock.
+    """
+
+    def __init__(self, rules=()):
+        self.rules = {}  # rule id -> RecurrenceRule
+        self.month_cache = {}  # (year, month) -> {day: [rules]}
+        self.lock = threading.Lock()
+        self.load(rules)
+
+    def load(self, rules):
+        """Replace all rules."""
+        with self.lock:
+            self.rules = {rule.rule_id: rule for rule in rules}
+            self.month_cache.clear()
+
+    def next_id(self):
+        with self.lock:
+            return max(self.rules, default=0) + 1
+
+    def add(self, rule):
+        with self.lock:
+            self.rules[rule.rule_id] = rule
+            self.month_cache.clear()
+
+    def remove(self, rule_id):
+        """Remove a rule and return it. Raises KeyError for an unknown id."""
+        with self.lock:
+            rule = self.rules.pop(rule_id)
+            self.month_cache.clear()
+        return rule
+
+    def occurrences(self, year, month):
+        """Return {day: [rules]} for one month, expanding it on first use."""
+        key = (year, month)
+        with self.lock:
+            days = self.month_cache.get(key)
+            if days is None:
+                days = {}
+                for rule_id in sorted(self.rules):
+                    rule = self.rules[rule_id]
+                    for day in occurrence_days(rule, year, month):
+                        days.setdefault(day, []).append(rule)
+                if len(self.month_cache) >= MONTH_CACHE_LIMIT:
+                    self.month_cache.clear()
+                self.month_cache[key] = days
+        return days
+
+    def occurrences_on(self, date_obj):
+        """Return the rules that occur on a date."""
+        return self.occurrences(date_obj.year, date_obj.month).get(date_obj.day, [])
@@ -0,0 +1,235 @@
+"""
+In-memory full-text search over the planner's tasks.
+
+TaskIndex keeps an inverted index from lower-cased word tokens to the tasks
+they occur in. TaskStore builds it on load and re-indexes a single date
+after each edit.
+"""
+import math
+import re
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import date
+from heapq import nlargest
+
+TOKEN_PATTERN = re.compile(r"\w+")
+SEARCH_RESULT_LIMIT = 50  # Default number of results returned by search()
+VOCABULARY_REBUILD_THRESHOLD = 1000  # Above this many new/dropped tokens, re-sort instead of patching
+BULK_INDEX_THRESHOLD = 64  # Above this many dates, index_days rebuilds the touched postings once
+POSITION_BITS = 24  # A posting is (date ordinal << POSITION_BITS) | task position
+POSITION_MASK = (1 << POSITION_BITS) - 1
+
+SearchResult = namedtuple("SearchResult", "date task_no task score")
+
+def tokenize(text):
+    """Split text into lower-cased word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+class TaskIndex:
+    """
+    Inverted index: token -> sorted array of postings, each posting packing
+    a date ordinal and a task position into one 64-bit integer. The postings
+    of one date are a contiguous run found with a binary search.
+    The vocabulary is also kept sorted so prefixes resolve with a binary search.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.day_tokens = {}  # Date ordinal -> tuple of tokens indexed for that date
+        self.vocabulary = []  # Sorted tokens that have postings
+        self.day_sizes = {}  # Date ordinal -> number of tasks indexed for that date
+        self.task_count = 0
+
+    def build(self, table):
+        """Index every task in a TaskTable."""
+        self.postings = {}
+        self.day_tokens = {}
+        self.day_sizes = {}
+        self.task_count = 0
+        # Dates come in ascending order, so every postings array is built sorted
+        for ordinal, tasks in table.items():
+            self.collect(ordinal, tasks, self.postings)
+        self.vocabulary = sorted(self.postings)
+
+    def collect(self, ordinal, tasks, hits):
+        """Append the postings of one (unindexed) date to hits, a token -> array dict."""
+        base = ordinal << POSITION_BITS
+        tokens = set()
+        for position, task in enumerate(tasks):
+            posting = base | position
+            for token in tokenize(task):
+                values = hits.get(token)
+                if values is None:
+                    hits[token] = array("q", (posting,))
+                elif values[-1] != posting:
+                    values.append(posting)
+                tokens.add(token)
+        if tokens:
+            self.day_tokens[ordinal] = tuple(tokens)
+        if tasks:
+            self.day_sizes[ordinal] = len(tasks)
+            self.task_count += len(tasks)
+
+    def add_postings(self, ordinal, tasks):
+        """Add the postings of one (unindexed) date; returns tokens new to the index."""
+        hits = {}
+        self.collect(ordinal, tasks, hits)
+        new_tokens = []
+        for token, values in hits.items():
+            current = self.postings.get(token)
+            if current is None:
+                self.postings[token] = values
+                new_tokens.append(token)
+            else:
+                i = bisect_left(current, ordinal << POSITION_BITS)
+                current[i:i] = values
+        return new_tokens
+
+    def drop_postings(self, ordinal):
+        """Remove the postings of one date; returns tokens no longer in the index."""
+        dropped = []
+        first = ordinal << POSITION_BITS
+        for token in self.day_tokens.pop(ordinal, ()):
+            values = self.postings[token]
+            del values[bisect_left(values, first):bisect_left(values, first + POSITION_MASK + 1)]
+            if not values:
+                del self.postings[token]
+                dropped.append(token)
+        self.task_count -= self.day_sizes.pop(ordinal, 0)
+        return dropped
+
+    def reindex_bulk(self, entries):
+        """
+        Replace the indexed tasks of many dates, rewriting each touched
+        postings array once. Returns (dropped tokens, added tokens).
+        """
+        latest = dict(entries)  # The last entry of a date wins, as when indexing one by one
+        ordinals = set(latest)
+        touched = set()
+        for ordinal in ordinals:
+            touched.update(self.day_tokens.pop(ordinal, ()))
+            self.task_count -= self.day_sizes.pop(ordinal, 0)
+        dropped = []
+        for token in touched:
+            kept = array("q", (posting for posting in self.postings[token] if posting >> POSITION_BITS not in ordinals))
+            if kept:
+                self.postings[token] = kept
+            else:
+                del self.postings[token]
+                dropped.append(token)
+
+        hits = {}
+        for ordinal in sorted(latest):
+            self.collect(ordinal, latest[ordinal], hits)
+        added = []
+        for token, values in hits.items():
+            current = self.postings.get(token)
+            if current is None:
+                self.postings[token] = values
+                added.append(token)
+            elif current[-1] < values[0]:
+                current.extend(values)
+            else:
+                self.postings[token] = array("q", sorted(current + values))
+        return dropped, added
+
+    def index_day(self, ordinal, tasks):
+        """Replace whatever is indexed for one date with tasks."""
+        self.index_days([(ordinal, tasks)])
+
+    def index_days(self, entries):
+        """
+        Replace the indexed tasks of several dates, given as (ordinal, tasks) pairs.
+        The sorted vocabulary is patched in place for a few changed tokens and
+        re-sorted once when many changed (e.g. after an import).
+        """
+        entries = list(entries)
+        if len(entries) > BULK_INDEX_THRESHOLD:
+            dropped, added = self.reindex_bulk(entries)
+        else:
+            dropped = []
+            added = []
+            for ordinal, tasks in entries:
+                dropped.extend(self.drop_postings(ordinal))
+                added.extend(self.add_postings(ordinal, tasks))
+        # A token can be dropped by one date and re-added by another
+        dropped = [token for token in dropped if token not in self.postings]
+        added = [token for token in added if token in self.postings]
+        if len(dropped) + len(added) > VOCABULARY_REBUILD_THRESHOLD:
+            self.vocabulary = sorted(self.postings)
+            return
+        for token in dropped:
+            i = bisect_left(self.vocabulary, token)
+            if i < len(self.vocabulary) and self.vocabulary[i] == token:
+                del self.vocabulary[i]
+        for token in added:
+            i = bisect_left(self.vocabulary, token)
+            if i == len(self.vocabulary) or self.vocabulary[i] != token:
+                self.vocabulary.insert(i, token)
+
+    def remove_day(self, ordinal):
+        """Drop one date from the index."""
+        self.index_days([(ordinal, ())])
+
+    def expand(self, term):
+        """Return the indexed tokens that start with term."""
+        i = bisect_left(self.vocabulary, term)
+        matches = []
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+            matches.append(self.vocabulary[i])
+            i += 1
+        return matches
+
+    def token_weight(self, token, term):
+        """Score of a task word matching a query term: rarer words weigh more."""
+        weight = math.log(1 + self.task_count / len(self.postings[token]))
+        if token != term:
+            weight *= 0.5  # Prefix matches rank below exact ones
+        return weight
+
+    def search(self, query, table, limit=SEARCH_RESULT_LIMIT):
+        """
+        Return the best matching tasks for query, best first.
+        Every query word must match a word of the task, either exactly or as
+        a prefix; exact and rarer words score higher.
+        """
+        terms = []
+        for term in set(tokenize(query)):
+            tokens = self.expand(term)
+            if not tokens:
+                return []
+            size = sum(len(self.postings[token]) for token in tokens)
+            terms.append((size, term, tokens))
+        if not terms:
+            return []
+        # Start from the most selective term so later terms only check its hits
+        terms.sort()
+
+        days = table.days
+        scores = None
+        for size, term, tokens in terms:
+            if scores is None:
+                scores = {}
+                for token in tokens:
+                    weight = self.token_weight(token, term)
+                    for posting in self.postings[token]:
+                        if scores.get(posting, 0) < weight:
+                            scores[posting] = weight
+            else:
+                narrowed = {}
+                for posting, score in scores.items():
+                    task = days[posting >> POSITION_BITS][posting & POSITION_MASK]
+                    matches = [token for token in tokenize(task) if token.startswith(term)]
+                    if matches:
+                        narrowed[posting] = score + max(self.token_weight(token, term) for token in matches)
+                scores = narrowed
+            if not scores:
+                return []
+
+        best = nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+        results = []
+        for posting, score in best:
+            ordinal, position = posting >> POSITION_BITS, posting & POSITION_MASK
+            results.append(SearchResult(date.fromordinal(ordinal), position + 1, days[ordinal][position], score))
+        return results
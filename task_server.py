@@ -0,0 +1,245 @@
+"""
+Local HTTP server for the tasks overview.
+
+TaskServer serves the overview pages of a TaskStore from a background
+thread, bound to localhost only, plus a small JSON API:
+
+    /                       the overview page; ?year=Y also lists Y's recurring tasks
+    /index.html             index page linking one page per year (same ?year=)
+    /tasks-<year>.html      the page of one year
+    /api/years              [{"year": 2026, "tasks": 12}, ...]
+    /api/tasks/<year>[/<month>]?page=1&per_page=100
+                            the stored tasks of a year or month, one page at a time
+
+Every response carries an ETag built from TaskStore.generation, which the
+store bumps on each change, so a browser revalidating an unchanged page gets
+a 304 without anything being rendered. Rendered responses are also kept per
+URL until the generation moves on, and a page that did change is assembled
+from the TaskOverview's cached month sections. Pages are rendered from a
+TaskSnapshot, so the store's lock is only held while the snapshot copies
+the tables; archives are read and pages rendered without it.
+"""
+import json
+import logging
+import math
+import re
+import secrets
+import threading
+from collections import OrderedDict
+from datetime import date
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from task_html import TaskOverview
+from task_table import month_bounds, year_bounds
+from instrumentation import count, span
+
+SERVER_HOST = "127.0.0.1"  # Never reachable from other machines
+API_PAGE_SIZE = 100  # Tasks per page of /api/tasks unless per_page is given
+API_MAX_PAGE_SIZE = 1000
+RESPONSE_CACHE_SIZE = 32  # Rendered responses kept, one per URL
+
+YEAR_PAGE_PATTERN = re.compile(r"^/tasks-(\d{1,4})\.html$")
+API_TASKS_PATTERN = re.compile(r"^/api/tasks/(\d{1,4})(?:/(\d{1,2}))?$")
+
+logger = logging.getLogger(__name__)
+
+class RequestError(Exception):
+    """Raised by a route to answer with an HTTP error status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def query_int(query, name, default, low, high):
+    """Return an integer query parameter, checking it is within [low, high]."""
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer.")
+    if not low <= value <= high:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"{name} must be between {low} and {high}.")
+    return value
+
+class TaskRequestHandler(BaseHTTPRequestHandler):
+    """Hands GET requests to the TaskServer that owns the HTTP server."""
+
+    def do_GET(self):
+        self.server.task_server.respond(self)
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+class TaskServer:
+    """
+    Serve the overview of a TaskStore over HTTP on localhost.
+    start() binds the server (on port 0, a free port is picked) and returns
+    its base URL. Responses are rendered on the server's threads while the
+    GUI may be editing the tasks, so they are rendered from a TaskSnapshot
+    taken of the store (TaskStore.snapshot()) rather than the live tables.
+    """
+
+    def __init__(self, store, overview=None, host=SERVER_HOST, port=0):
+        self.store = store
+        self.overview = overview if overview is not None else TaskOverview(store)
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+        self.token = secrets.token_hex(4)  # Keeps ETags of different runs apart
+        self.responses = OrderedDict()  # URL -> (generation, content type, body), least recently used first
+        self.responses_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        """Start serving if not already running and return the base URL. Raises OSError if binding fails."""
+        if self.httpd is None:
+            httpd = ThreadingHTTPServer((self.host, self.port), TaskRequestHandler)
+            httpd.daemon_threads = True
+            httpd.task_server = self
+            self.httpd = httpd
+            self.thread = threading.Thread(target=httpd.serve_forever, name="html-server", daemon=True)
+            self.thread.start()
+            logger.info("Serving the tasks overview at %s", self.url)
+        return self.url
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.thread.join()
+            self.httpd = self.thread = None
+
+    def etag(self, generation):
+        return f'"{self.token}-{generation}"'
+
+    def respond(self, handler):
+        """Answer one GET request."""
+        try:
+            route = self.route(handler.path)
+        except RequestError as e:
+            handler.send_error(e.status, str(e))
+            return
+        etag = self.etag(self.store.generation)
+        if etag in handler.headers.get("If-None-Match", ""):
+            count("server.not_modified")
+            handler.send_response(HTTPStatus.NOT_MODIFIED)
+            handler.send_header("ETag", etag)
+            handler.end_headers()
+            return
+        try:
+            generation, content_type, body = self.response(handler.path, route)
+        except RequestError as e:
+            handler.send_error(e.status, str(e))
+            return
+        except Exception as e:
+            logger.error("Error serving %s: %s", handler.path, e)
+            handler.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+            return
+        handler.send_response(HTTPStatus.OK)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.send_header("ETag", self.etag(generation))
+        handler.send_header("Cache-Control", "no-cache")  # Revalidate every time; unchanged pages get a 304
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def response(self, url, route=None):
+        """
+        Return (generation, content type, body) for a URL, rendering it only
+        if the tasks changed. route is the URL's route(), if already known.
+        """
+        with self.responses_lock:
+            cached = self.responses.get(url)
+            if cached is not None and cached[0] == self.store.generation:
+                self.responses.move_to_end(url)
+                count("server.cache_hits")
+                return cached
+        if route is None:
+            route = self.route(url)
+        count("server.renders")
+        snapshot = self.store.snapshot()
+        generation = snapshot.generation
+        with span("server.render"):
+            content_type, body = route(snapshot)
+        with self.responses_lock:
+            self.responses[url] = (generation, content_type, body)
+            self.responses.move_to_end(url)
+            while len(self.responses) > RESPONSE_CACHE_SIZE:
+                self.responses.popitem(last=False)
+        return generation, content_type, body
+
+    def route(self, url):
+        """Return a function rendering the response to url from a TaskSnapshot as (content type, body)."""
+        parts = urlsplit(url)
+        path = parts.path
+        query = parse_qs(parts.query)
+        if path in ("/", "/index.html"):
+            year = query_int(query, "year", None, date.min.year, date.max.year)
+            pages = self.overview.iter_page if path == "/" else self.overview.iter_index
+            return lambda snapshot: self.html(pages(year, snapshot))
+        match = YEAR_PAGE_PATTERN.match(path)
+        if match:
+            year = int(match.group(1))
+            if not date.min.year <= year <= date.max.year:
+                raise RequestError(HTTPStatus.NOT_FOUND, f"No such year: {year}")
+            return lambda snapshot: self.html(self.overview.iter_year_page(year, snapshot))
+        if path == "/api/years":
+            return self.api_years
+        match = API_TASKS_PATTERN.match(path)
+        if match:
+            year = int(match.group(1))
+            month = int(match.group(2)) if match.group(2) else None
+            if not date.min.year <= year <= date.max.year or month is not None and not 1 <= month <= 12:
+                raise RequestError(HTTPStatus.NOT_FOUND, f"No such date: {path}")
+            page = query_int(query, "page", 1, 1, 10 ** 9)
+            per_page = query_int(query, "per_page", API_PAGE_SIZE, 1, API_MAX_PAGE_SIZE)
+            return lambda snapshot: self.api_tasks(snapshot, year, month, page, per_page)
+        raise RequestError(HTTPStatus.NOT_FOUND, f"Not found: {path}")
+
+    @staticmethod
+    def html(chunks):
+        return "text/html; charset=utf-8", "".join(chunks).encode("utf-8")
+
+    @staticmethod
+    def json(data):
+        return "application/json", json.dumps(data).encode("utf-8")
+
+    def api_years(self, snapshot):
+        tasks = snapshot.all_tasks()
+        return self.json([
+            {"year": year, "tasks": tasks.task_count(*year_bounds(year))} for year in tasks.years()
+        ])
+
+    def api_tasks(self, snapshot, year, month, page, per_page):
+        """One page of the stored tasks of a year or month, in date order."""
+        first, last = month_bounds(year, month) if month is not None else year_bounds(year)
+        tasks = snapshot.year_tasks(year)
+        total = tasks.task_count(first, last)
+        skip = (page - 1) * per_page
+        items = []
+        for ordinal, day_tasks in tasks.range(first, last):
+            if skip >= len(day_tasks):
+                skip -= len(day_tasks)
+                continue
+            day = date.fromordinal(ordinal).isoformat()
+            for task_no in range(skip, len(day_tasks)):
+                items.append({"date": day, "task_no": task_no + 1, "task": day_tasks[task_no]})
+                if len(items) == per_page:
+                    break
+            skip = 0
+            if len(items) == per_page:
+                break
+        return self.json({
+            "year": year, "month": month, "page": page, "per_page": per_page,
+            "pages": math.ceil(total / per_page), "total": total, "tasks": items,
+        })
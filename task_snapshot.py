@@ -0,0 +1,188 @@
+"""
+Binary snapshot format for the planner's tasks.
+
+A compact alternative to the indented tasks.json snapshot, selected with
+YEAR_PLANNER_SNAPSHOT=binary. The file is a fixed header followed by a
+payload:
+
+    header   magic b"YPSNAP", format version (u16), string count, date count,
+             task count (u32 each), payload length (u64), CRC-32 of the payload
+    payload  string lengths    one u32 per distinct task text (in characters)
+             date ordinals     one u32 per date, ascending
+             task counts       one u32 per date: the length of its record
+             task records      one u32 string number per task, date by date;
+                               texts are numbered in order of first use
+             strings           all distinct task texts, UTF-8, each followed by a NUL
+
+All integers are little-endian. Every distinct task text is stored once
+and tasks refer to it by number, so repeated tasks cost four bytes each.
+The file is memory-mapped and decoded a column at a time: the checksum,
+lengths and numbers replace the node-by-node validation tasks.json needs.
+Readers and writers work on the nested year -> month -> day layout the
+JSON snapshot uses, so journals replay onto either.
+"""
+import logging
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from datetime import date
+from itertools import accumulate, chain
+
+from task_table import ORDINAL_MAX
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"YPSNAP"
+SNAPSHOT_VERSION = 1
+HEADER = struct.Struct("<6sHIIIQI")
+U32 = "I" if array("I").itemsize == 4 else "L"
+TEXT_ENCODING = "utf-8"
+TEXT_ERRORS = "surrogatepass"  # Keep lone surrogates a JSON file may have held
+TEXT_TERMINATOR = "\0"
+
+class SnapshotError(ValueError):
+    """Raised when a binary snapshot is truncated, corrupted or of an unknown version."""
+
+def u32_array(values=()):
+    return array(U32, values)
+
+def u32_bytes(values):
+    if sys.byteorder != "little":
+        values = array(U32, values)
+        values.byteswap()
+    return values.tobytes()
+
+def snapshot_sections(data):
+    """
+    Encode nested tasks data as the counts for the header and the payload
+    sections (bytes). Dates that don't exist (e.g. February 30) are left out
+    with a warning.
+    """
+    days = []
+    skipped = 0
+    for year, months in data.items():
+        for month, month_days in months.items():
+            for day, tasks in month_days.items():
+                if not tasks:
+                    continue
+                try:
+                    days.append((date(int(year), int(month), int(day)).toordinal(), tasks))
+                except ValueError:
+                    skipped += len(tasks)
+    if skipped:
+        logger.warning("Left out %d task(s) on dates that don't exist.", skipped)
+    days.sort()
+    # Distinct texts numbered in order of first use, without a Python-level loop per task
+    task_count = sum(len(tasks) for _, tasks in days)
+    numbers = dict.fromkeys(chain.from_iterable(tasks for _, tasks in days))
+    if len(numbers) == task_count:
+        records = u32_array(range(task_count))  # No text repeats
+    else:
+        numbers.update(zip(numbers, range(len(numbers))))
+        records = u32_array(list(map(numbers.__getitem__, chain.from_iterable(tasks for _, tasks in days))))
+    sections = [
+        u32_bytes(u32_array(list(map(len, numbers)))),
+        u32_bytes(u32_array([ordinal for ordinal, _ in days])),
+        u32_bytes(u32_array([len(tasks) for _, tasks in days])),
+        u32_bytes(records),
+        # Each text is also NUL-terminated, so readers can split the strings instead of slicing each one
+        (TEXT_TERMINATOR.join(numbers) + TEXT_TERMINATOR if numbers else "").encode(TEXT_ENCODING, TEXT_ERRORS),
+    ]
+    return (len(numbers), len(days), task_count), sections
+
+def snapshot_header(counts, sections):
+    payload_size = 0
+    checksum = 0
+    for section in sections:
+        payload_size += len(section)
+        checksum = zlib.crc32(section, checksum)
+    return HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, *counts, payload_size, checksum)
+
+def encode_snapshot(data):
+    """Encode nested tasks data as a binary snapshot and return its bytes."""
+    counts, sections = snapshot_sections(data)
+    return b"".join([snapshot_header(counts, sections)] + sections)
+
+def decode_snapshot(buffer):
+    """Decode a binary snapshot (any bytes-like object) into nested tasks data. Raises SnapshotError."""
+    with memoryview(buffer) as view:
+        if len(view) < HEADER.size:
+            raise SnapshotError("snapshot is truncated.")
+        magic, version, string_count, date_count, task_count, payload_size, checksum = HEADER.unpack_from(view)
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotError("not a Year Planner snapshot.")
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"unsupported snapshot version {version}.")
+        # Views are released before returning, so a memory-mapped buffer can be closed even after an error
+        with view[HEADER.size:] as payload:
+            if len(payload) != payload_size:
+                raise SnapshotError("snapshot is truncated.")
+            if zlib.crc32(payload) != checksum:
+                raise SnapshotError("snapshot checksum does not match.")
+            columns = []
+            offset = 0
+            for size in (string_count, date_count, date_count, task_count):
+                column = u32_array()
+                with payload[offset:offset + 4 * size] as section:
+                    column.frombytes(section)
+                if len(column) != size:
+                    raise SnapshotError("snapshot is truncated.")
+                if sys.byteorder != "little":
+                    column.byteswap()
+                columns.append(column)
+                offset += 4 * size
+            lengths, ordinals, counts, records = columns
+            try:
+                with payload[offset:] as strings:
+                    text = str(strings, TEXT_ENCODING, TEXT_ERRORS)
+            except UnicodeDecodeError as e:
+                raise SnapshotError(f"snapshot strings are not valid UTF-8: {e}")
+    if sum(lengths) + string_count != len(text):
+        raise SnapshotError("snapshot string lengths do not match the strings.")
+    texts = text.split(TEXT_TERMINATOR)
+    texts.pop()  # After the last terminator
+    if len(texts) != string_count:
+        # Some text contains a NUL itself: cut the strings by their lengths instead
+        ends = list(accumulate(length + 1 for length in lengths))
+        texts = list(map(text.__getitem__, map(slice, [0] + ends, [end - 1 for end in ends])))
+    if sum(counts) != task_count or string_count > task_count:
+        raise SnapshotError("snapshot task records do not match the dates.")
+    if date_count and ordinals[-1] > ORDINAL_MAX:
+        raise SnapshotError("snapshot holds a date out of range.")
+    # With no repeated text the records are 0, 1, 2, ... (numbers follow first use): slice the texts directly
+    tasks = texts if string_count == task_count else texts.__getitem__
+    data = {}
+    start = 0
+    previous = 0
+    try:
+        for ordinal, size in zip(ordinals, counts):
+            if ordinal <= previous or not size:
+                raise SnapshotError("snapshot dates are not in order.")
+            previous = ordinal
+            date_obj = date.fromordinal(ordinal)
+            data.setdefault(str(date_obj.year), {}).setdefault(str(date_obj.month), {})[str(date_obj.day)] = \
+                tasks[start:start + size] if tasks is texts else list(map(tasks, records[start:start + size]))
+            start += size
+    except IndexError:
+        raise SnapshotError("snapshot task records refer to missing strings.")
+    return data
+
+def read_snapshot_file(path):
+    """Read a binary snapshot file (memory-mapped) into nested tasks data. Raises OSError or SnapshotError."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise SnapshotError("snapshot is empty.")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return decode_snapshot(mapped)
+
+def write_snapshot_file(f, data):
+    """Write nested tasks data as a binary snapshot to an open binary file; returns the bytes written."""
+    counts, sections = snapshot_sections(data)
+    header = snapshot_header(counts, sections)
+    f.write(header)
+    for section in sections:
+        f.write(section)
+    return len(header) + sum(map(len, sections))
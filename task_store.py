@@ -0,0 +1,2233 @@
+"""
+GUI-free data layer of the Year Planner.
+
+Tasks are kept in a TaskTable (date ordinal -> list of task strings) and
+persisted by a storage backend. The JSON files keep the nested layout (year
+-> month -> day -> list of task strings, all keys as digit strings); it is
+converted to and from the table when JSON is read and written. The default
+backend keeps one such file per year, so only the years that are looked at
+are read and only edited years are rewritten. With
+YEAR_PLANNER_SNAPSHOT=binary the snapshots are written in the binary format
+of task_snapshot instead (tasks.snap, 2026.snap, ...); journals stay JSON.
+Nothing in this module imports tkinter, so scripts can use TaskStore
+without a display.
+"""
+import functools
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import shutil
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from task_table import TaskTable, date_string, validate_days, year_bounds
+from task_search import TaskIndex, SEARCH_RESULT_LIMIT
+from task_sync import FileLock, merge_task_lists
+from task_recurrence import RecurrenceRule, RecurrenceSet, FREQUENCIES, rule_from_dict, rule_to_dict
+from task_snapshot import read_snapshot_file, write_snapshot_file
+from task_json import read_tasks_json, describe_entry
+from task_archive import YearArchive
+from task_counts import TaskCounts
+from instrumentation import count, span
+
+# Constants
+APP_NAME = "Year_Planner"  # Name of your application
+APP_DATA_DIR = os.path.join(os.path.expanduser("~"), "Documents", APP_NAME)
+TASKS_FILE = os.path.join(APP_DATA_DIR, "tasks.json")
+TASKS_DB_FILE = os.path.join(APP_DATA_DIR, "tasks.db")
+TASKS_SHARD_DIR = os.path.join(APP_DATA_DIR, "tasks")  # One JSON file per year plus manifest.json
+STORAGE_BACKEND = os.environ.get("YEAR_PLANNER_STORAGE", "sharded")  # "sharded", "json" or "sqlite"
+SNAPSHOT_FORMAT = os.environ.get("YEAR_PLANNER_SNAPSHOT", "json")  # "json" (readable) or "binary" (compact, faster)
+SNAPSHOT_FORMATS = ("json", "binary")
+BINARY_SNAPSHOT_SUFFIX = ".snap"  # Replaces .json in the name of a binary snapshot
+MANIFEST_VERSION = 1
+SHARD_FILE_PATTERN = re.compile(r"^(\d+)\.(?:json|snap)$")
+TASKS_ARCHIVE_DIR = os.path.join(APP_DATA_DIR, "archive")  # One compressed file per archived year
+# Past years kept in the working set when archiving; earlier ones are archived (a negative number turns this off)
+ARCHIVE_KEEP_YEARS = int(os.environ.get("YEAR_PLANNER_ARCHIVE_KEEP_YEARS", "1"))
+ARCHIVE_FORMAT = os.environ.get("YEAR_PLANNER_ARCHIVE_FORMAT", "xz")  # "xz" (lzma, smaller) or "gz" (gzip, faster)
+JOURNAL_COMPACT_THRESHOLD = 500  # Number of journal records that triggers a compaction
+SAVE_QUIET_PERIOD = 0.5  # Seconds without edits before queued edits are written
+SAVE_MAX_DELAY = 5.0  # Longest time an edit stays queued while edits keep coming
+
+logger = logging.getLogger(__name__)
+
+# One edit to a single date (given as date ordinal): op is "add", "delete",
+# "clear" or "set" (the whole list replaced), arg is the added task or the
+# 0-based index of the deleted one, tasks is the date's task list after the
+# edit and base the stored list it was made on (to merge with other instances).
+TaskChange = namedtuple("TaskChange", "op ordinal arg tasks base")
+
+# What TaskStore.read() got from storage, for install() to put in place:
+# the TaskTable, its synced copy, the years left unread, the backup and
+# quarantined entries of damaged files, and the recurrence rule records.
+LoadedTasks = namedtuple("LoadedTasks", "tasks synced unloaded_years backup_path quarantined rules")
+
+# What TaskStore.read_external() got from storage, for merge_external(): the
+# TaskTable as stored now, a copy of synced taken just before it was read,
+# and the years left unread.
+ExternalTasks = namedtuple("ExternalTasks", "tasks synced unloaded_years")
+
+class TaskStoreError(Exception):
+    """Raised when a task operation can't be carried out."""
+
+class NoTasksError(TaskStoreError):
+    """Raised when the date has no tasks to delete or clear."""
+
+class TaskNumberError(TaskStoreError):
+    """Raised when a task number is out of range for the date."""
+
+def validate_tasks_data(data):
+    """Validate the structure of tasks_data."""
+    if not isinstance(data, dict):
+        return False
+    for year, months in data.items():
+        if not isinstance(year, str) or not year.isdigit():
+            return False
+        if not isinstance(months, dict):
+            return False
+        for month, days in months.items():
+            if not isinstance(month, str) or not month.isdigit():
+                return False
+            if not isinstance(days, dict):
+                return False
+            for day, tasks in days.items():
+                if not isinstance(day, str) or not day.isdigit():
+                    return False
+                if not isinstance(tasks, list):
+                    return False
+                for task in tasks:
+                    if not isinstance(task, str):
+                        return False
+    return True
+
+def apply_journal_record(data, record):
+    """
+    Apply one journal record to data.
+    A record holds the complete task list of a single date, so replaying
+    a record more than once is harmless.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Journal record is not an object.")
+    year, month, day = record["date"].split("-")
+    tasks = record["tasks"]
+    if not (year.isdigit() and month.isdigit() and day.isdigit()):
+        raise ValueError(f"Invalid journal date: {record['date']}")
+    if not isinstance(tasks, list) or not all(isinstance(task, str) for task in tasks):
+        raise ValueError(f"Invalid journal tasks for {record['date']}")
+    if tasks:
+        data.setdefault(year, {}).setdefault(month, {})[day] = tasks
+    elif year in data and month in data[year] and day in data[year][month]:
+        del data[year][month][day]
+
+def replay_journal(data, path):
+    """
+    Replay the records of a journal file onto data.
+    Records that cannot be decoded (e.g. a torn last write) are skipped.
+    Returns the number of records applied.
+    """
+    if not os.path.exists(path):
+        return 0
+    applied = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                apply_journal_record(data, json.loads(line))
+                applied += 1
+            except (ValueError, KeyError, AttributeError) as e:
+                logger.warning("Skipping unreadable journal record %s:%d: %s", path, line_no, e)
+    return applied
+
+def locked(method):
+    """
+    Run a TaskStore method holding the store's lock, so a snapshot() taken
+    on another thread (TaskServer) never sees half an edit.
+    """
+    @functools.wraps(method)
+    def run_locked(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return run_locked
+
+def dates_in_range(first, last, weekdays=None):
+    """Return the dates from first to last (inclusive), only those on weekdays (0 = Monday) if given."""
+    dates = []
+    date_obj = first
+    while date_obj <= last:
+        if weekdays is None or date_obj.weekday() in weekdays:
+            dates.append(date_obj)
+        date_obj += timedelta(days=1)
+    return dates
+
+def rebase_change(change, current):
+    """
+    Turn a change into a "set" of its date onto current[ordinal], the date's
+    stored tasks, three-way merging if they moved on from change.base.
+    current is updated with the result.
+    """
+    stored = current[change.ordinal]
+    tasks = change.tasks if stored == change.base else merge_task_lists(change.base, change.tasks, stored)
+    current[change.ordinal] = tasks
+    return change._replace(op="set", arg=None, tasks=tasks)
+
+def read_rules_file(path):
+    """Return the recurrence rules (a list of dicts) stored in path; a corrupted file is backed up."""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            rules = json.load(f)
+        if not isinstance(rules, list):
+            raise ValueError("recurrence rules are not a list.")
+        return rules
+    except (OSError, ValueError) as e:
+        logger.error("Error loading %s: %s", path, e)
+        try:
+            os.replace(path, path + ".backup")
+            logger.warning("Corrupted recurrence rules backed up as %s.backup", path)
+        except OSError as rename_error:
+            logger.error("Failed to backup corrupted recurrence rules: %s", rename_error)
+        return []
+
+def write_rules_file(path, rules):
+    """Replace the recurrence rules stored in path atomically."""
+    ensure_app_data_dir()
+    temp_file = path + ".tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(rules, f, indent=4)
+    os.replace(temp_file, path)
+
+def file_signature(path):
+    """Return (mtime, size) of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def ensure_app_data_dir():
+    """Create the application data directory if it doesn't exist."""
+    if not os.path.exists(APP_DATA_DIR):
+        os.makedirs(APP_DATA_DIR)
+        logger.info("Created application data directory at %s", APP_DATA_DIR)
+
+class JsonStorage:
+    """
+    Store tasks in tasks.json plus an append-only journal of edits.
+    Each edit appends one record to the journal; the journal is folded back
+    into the snapshot by compact().
+    With snapshot_format "binary" the snapshot is written as tasks.snap
+    instead. Either snapshot file is read, so switching formats converts
+    the snapshot on its next write.
+    Several instances can share the files: every write happens under an
+    advisory lock, and changed_on_disk() tells whether another instance
+    wrote since this one last read or wrote the files.
+    """
+    name = "json"
+
+    def __init__(self, tasks_file=TASKS_FILE, snapshot_format=SNAPSHOT_FORMAT):
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            logger.warning("Unknown snapshot format %r, falling back to json.", snapshot_format)
+            snapshot_format = "json"
+        self.tasks_file = tasks_file
+        self.binary_file = os.path.splitext(tasks_file)[0] + BINARY_SNAPSHOT_SUFFIX
+        self.snapshot_format = snapshot_format
+        # The snapshot written, and the one in the other format (read if it is the newer one)
+        if snapshot_format == "binary":
+            self.snapshot_file, self.other_snapshot_file = self.binary_file, self.tasks_file
+        else:
+            self.snapshot_file, self.other_snapshot_file = self.tasks_file, self.binary_file
+        self.journal_file = tasks_file + ".journal"  # Append-only log of edits since the last snapshot
+        self.compacting_file = self.journal_file + ".compacting"  # Journal being folded into a new snapshot
+        self.rules_file = os.path.splitext(tasks_file)[0] + "-recurring.json"  # Recurrence rules
+        self.lock = FileLock(tasks_file + ".lock")  # Held by one thread of one instance at a time
+        self.journal_records = 0
+        self.compaction_thread = None
+        self.backup_path = None  # Set when load() had to back up a corrupted snapshot
+        self.quarantined = []  # Malformed entries load() left out of the snapshot (QuarantinedEntry)
+        self.signature = None  # disk_signature() as of our last read or write, None if unknown
+
+    def disk_signature(self):
+        """Return the (mtime, size) of the snapshot and journal files (None for missing ones)."""
+        return tuple(
+            file_signature(path)
+            for path in (self.tasks_file, self.binary_file, self.journal_file, self.compacting_file)
+        )
+
+    def has_files(self):
+        """True if a snapshot or journal exists."""
+        return any(
+            os.path.exists(path)
+            for path in (self.tasks_file, self.binary_file, self.journal_file, self.compacting_file)
+        )
+
+    def snapshot_path(self):
+        """
+        Return the snapshot file to read, or None if there is none. If both
+        formats exist (a switch was interrupted), the newer one is read.
+        """
+        signatures = [(file_signature(path), path) for path in (self.snapshot_file, self.other_snapshot_file)]
+        existing = [(signature[0], path) for signature, path in signatures if signature is not None]
+        return max(existing)[1] if existing else None
+
+    def changed_on_disk(self):
+        """True if another instance changed the files since our last read or write."""
+        return self.disk_signature() != self.signature
+
+    @contextmanager
+    def locked_write(self):
+        """
+        Hold the lock around a write; yields whether the files are unchanged
+        since our last read or write. If they were, the new signature is
+        remembered; otherwise the other instance's change stays visible to
+        changed_on_disk().
+        """
+        with self.lock:
+            in_sync = self.signature is not None and self.disk_signature() == self.signature
+            try:
+                yield in_sync
+            finally:
+                self.signature = self.disk_signature() if in_sync else None
+
+    def load(self, years=None):
+        """
+        Load the snapshot, replay the journal on top of it and return a TaskTable.
+        years is ignored: the single file is always read whole.
+        """
+        self.backup_path = None
+        self.quarantined = []
+        with self.lock:
+            data, replayed = self.read_files()
+            self.signature = self.disk_signature()
+        self.journal_records = 0
+        if replayed:
+            logger.info("Replayed %d journal record(s).", replayed)
+            # Fold the replayed records into a fresh snapshot so the journal starts clean
+            self.compact()
+        with span("load.table"):
+            return TaskTable.from_nested(data)
+
+    def read_files(self):
+        """
+        Read the snapshot and replay the journal onto it, backing up a
+        corrupted snapshot. Malformed entries of a JSON snapshot are left out
+        (see quarantine()). Returns (nested data, journal records replayed).
+        """
+        data = {}
+        path = self.snapshot_path()
+        if path is not None:
+            quarantined = []
+            try:
+                data = self.read_snapshot(path, quarantined)
+                if quarantined:
+                    self.quarantine(path, data, quarantined)
+                else:
+                    logger.info("%s loaded successfully.", path)
+            except Exception as e:
+                logger.error("Error loading %s: %s", path, e)
+                # Backup the corrupted file
+                self.backup_path = path + ".backup"
+                try:
+                    os.rename(path, self.backup_path)
+                    logger.warning("Corrupted snapshot backed up as %s", self.backup_path)
+                except Exception as rename_error:
+                    logger.error("Failed to backup corrupted snapshot: %s", rename_error)
+        else:
+            logger.info("%s does not exist. Starting with no tasks.", self.snapshot_file)
+
+        # Replay edits made since the last snapshot (an interrupted compaction first)
+        replayed = 0
+        for path in (self.compacting_file, self.journal_file):
+            try:
+                replayed += replay_journal(data, path)
+            except OSError as e:
+                logger.error("Failed to read journal %s: %s", path, e)
+        return data, replayed
+
+    def quarantine(self, path, data, quarantined):
+        """
+        Back up a snapshot that had malformed entries and replace it with the
+        entries that could be read, so the next load is clean again.
+        """
+        for entry in quarantined:
+            logger.warning("Left out a malformed entry of %s: %s", path, describe_entry(entry))
+        self.quarantined = quarantined
+        self.backup_path = path + ".backup"
+        try:
+            os.replace(path, self.backup_path)
+            logger.warning("Snapshot with malformed entries backed up as %s", self.backup_path)
+            self.write_snapshot(data)
+        except OSError as e:
+            logger.error("Failed to replace the snapshot with malformed entries: %s", e)
+
+    def rebase_changes(self, changes):
+        """Return changes as "set" changes merged onto the dates as they are on disk."""
+        data = self.read_snapshot()
+        for path in (self.compacting_file, self.journal_file):
+            replay_journal(data, path)
+        current = {}
+        rebased = []
+        for change in changes:
+            if change.ordinal not in current:
+                date_obj = date.fromordinal(change.ordinal)
+                current[change.ordinal] = tuple(
+                    data.get(str(date_obj.year), {}).get(str(date_obj.month), {}).get(str(date_obj.day), ())
+                )
+            rebased.append(rebase_change(change, current))
+        return rebased
+
+    def read_current(self):
+        """
+        Return the tasks as they are on disk now, including the edits other
+        instances made. Raises if the snapshot can't be read.
+        """
+        with self.lock:
+            data = self.read_snapshot()
+            for path in (self.compacting_file, self.journal_file):
+                replay_journal(data, path)
+            self.signature = self.disk_signature()
+        return TaskTable.from_nested(data)
+
+    def write_snapshot(self, data):
+        """Write nested tasks data to the snapshot file atomically. Raises on failure."""
+        ensure_app_data_dir()
+        temp_file = self.snapshot_file + ".tmp"
+        with span("save.snapshot"):
+            if self.snapshot_format == "binary":
+                with open(temp_file, 'wb') as f:
+                    count("bytes_written", write_snapshot_file(f, data))
+            else:
+                with open(temp_file, 'w') as f:
+                    json.dump(data, f, indent=4)
+                    count("bytes_written", f.tell())
+            os.replace(temp_file, self.snapshot_file)  # Atomic operation
+            # Everything a snapshot in the other format held is in this one now
+            if os.path.exists(self.other_snapshot_file):
+                os.remove(self.other_snapshot_file)
+
+    def save(self, tasks):
+        """Write a full snapshot of a TaskTable and reset the journal."""
+        # Let a running compaction finish so it cannot overwrite this snapshot
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+        with self.locked_write():
+            self.write_snapshot(tasks.to_nested())
+            # The snapshot now contains every journaled edit
+            for path in (self.compacting_file, self.journal_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.journal_records = 0
+
+    def write_changes(self, changes):
+        """
+        Append one journal record per change, with a single fsync for the batch.
+        If another instance wrote in the meantime, the changes are merged onto
+        its version of the dates first.
+        """
+        with self.locked_write() as in_sync, span("save.journal"):
+            if not in_sync:
+                changes = self.rebase_changes(changes)
+            records = "".join(
+                json.dumps({"date": date_string(change.ordinal), "tasks": list(change.tasks)}) + "\n"
+                for change in changes
+            )
+            ensure_app_data_dir()
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.write(records)
+                f.flush()
+                os.fsync(f.fileno())
+                count("bytes_written", len(records.encode('utf-8')))
+            self.journal_records += len(changes)
+        if self.journal_records >= JOURNAL_COMPACT_THRESHOLD:
+            self.compact()
+
+    def unloaded_years(self):
+        """Years with stored tasks that load() left out (none: the file is read whole)."""
+        return set()
+
+    def load_rules(self):
+        """Return the stored recurrence rules as a list of dicts."""
+        return read_rules_file(self.rules_file)
+
+    def save_rules(self, rules):
+        """Replace the stored recurrence rules (a list of dicts) atomically."""
+        with self.lock:
+            write_rules_file(self.rules_file, rules)
+
+    def read_snapshot(self, path=None, quarantined=None):
+        """
+        Read the snapshot file (path, or snapshot_path()) as it is on disk
+        (empty if there is none). Raises if it can't be decoded. Malformed
+        entries of a JSON snapshot are left out and added to quarantined if
+        it is given, otherwise they raise too.
+        """
+        path = path or self.snapshot_path()
+        if path is None:
+            return {}
+        if path == self.binary_file:
+            # Checksummed and typed, so there is no separate validation pass
+            with span("load.parse"):
+                return read_snapshot_file(path)
+        # Checked entry by entry while it is parsed
+        with span("load.parse"), open(path, 'r') as f:
+            return read_tasks_json(f, quarantined)
+
+    def compact(self):
+        """
+        Fold the journal into a fresh snapshot on a background thread.
+        The journal is moved aside first, so new edits keep appending to a new
+        journal while the snapshot on disk is replayed and rewritten.
+        """
+        if self.compaction_thread is not None and self.compaction_thread.is_alive():
+            return
+        if not self.rotate_journal():
+            return
+        self.compaction_thread = threading.Thread(target=self.fold_journal, name="journal-compaction", daemon=True)
+        self.compaction_thread.start()
+
+    def rotate_journal(self):
+        """Move the journal aside for folding. Returns True if there is something to fold."""
+        with self.locked_write():
+            try:
+                if os.path.exists(self.journal_file):
+                    if os.path.exists(self.compacting_file):
+                        # A previous compaction failed; keep its records as well
+                        with open(self.journal_file, 'rb') as src, open(self.compacting_file, 'ab') as dst:
+                            dst.write(b"\n")
+                            shutil.copyfileobj(src, dst)
+                        os.remove(self.journal_file)
+                    else:
+                        os.replace(self.journal_file, self.compacting_file)
+            except OSError as e:
+                logger.error("Error rotating journal: %s", e)
+                return False
+            self.journal_records = 0
+            return os.path.exists(self.compacting_file)
+
+    def fold_journal(self):
+        """
+        Replay the rotated journal onto the snapshot on disk and rewrite it.
+        Works from the files, not from memory, so edits other instances
+        journaled are kept.
+        """
+        try:
+            with self.locked_write():
+                snapshot = self.read_snapshot()
+                replay_journal(snapshot, self.compacting_file)
+                self.write_snapshot(snapshot)
+                if os.path.exists(self.compacting_file):
+                    os.remove(self.compacting_file)
+            logger.info("Journal compacted into %s.", self.snapshot_file)
+        except Exception as e:
+            # The journal is kept and replayed on the next load
+            logger.error("Error compacting journal: %s", e)
+
+    def retire(self, keep):
+        """
+        Pass everything stored (the snapshot with the journal replayed, as
+        nested data) to keep() and delete the files, holding the lock
+        throughout so no edit lands in between. Raises if reading or keep()
+        fails; the files are then left alone.
+        """
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+        with self.lock:
+            data = self.read_snapshot()
+            for path in (self.compacting_file, self.journal_file):
+                replay_journal(data, path)
+            keep(data)
+            for path in (self.tasks_file, self.binary_file, self.compacting_file, self.journal_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.signature = None
+            self.journal_records = 0
+
+    def archived_years(self):
+        """Nothing is archived: the single file is always read whole."""
+        return set()
+
+    def archive_past_years(self, keep_years=None):
+        """Nothing is archived: the single file is always read whole."""
+        return []
+
+    def close(self):
+        """Wait for a running compaction and fold the rest of the journal into the snapshot."""
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+        if self.rotate_journal():
+            self.fold_journal()
+        self.lock.close()
+
+class ShardedStorage:
+    """
+    Store tasks as one JsonStorage per year (tasks/2026.json plus its
+    journal) and a manifest listing the years that have a file.
+    load() can read just some years and load_years() adds others later;
+    an edit only appends to, and compaction only rewrites, the file of its
+    year. The first load migrates a single-file tasks.json.
+    Years more than archive_keep_years before the current one are moved
+    into compressed archives (task_archive) by archive_past_years() and
+    dropped from the manifest; they count as unloaded years and are read
+    from the archive when needed.
+    The background writer changes the year sets too, so they are only read
+    or changed under state_lock. It is taken after lock (the manifest file
+    lock) when both are needed, and never held while waiting for lock.
+    """
+    name = "sharded"
+
+    def __init__(self, shard_dir=TASKS_SHARD_DIR, legacy_file=TASKS_FILE, snapshot_format=SNAPSHOT_FORMAT,
+                 archive_dir=TASKS_ARCHIVE_DIR, archive_keep_years=ARCHIVE_KEEP_YEARS, archive_format=ARCHIVE_FORMAT):
+        self.shard_dir = shard_dir
+        self.legacy_file = legacy_file  # Single-file tasks.json migrated on first load
+        self.snapshot_format = snapshot_format  # Of the year files
+        self.manifest_file = os.path.join(shard_dir, "manifest.json")
+        self.rules_file = os.path.join(shard_dir, "recurring.json")
+        self.lock = FileLock(self.manifest_file + ".lock")  # Guards the manifest and the rules file
+        self.state_lock = threading.RLock()  # Guards shards, years, archived, loaded and loaded_all in memory
+        self.shards = {}  # year -> JsonStorage, created on first use
+        self.years = set()  # Years listed in the manifest
+        self.archive = YearArchive(archive_dir, archive_format)
+        self.archive_keep_years = archive_keep_years
+        self.archived = set()  # Years in the archive and not in the manifest
+        self.loaded = set()  # Years read into memory (or created by our own writes)
+        self.loaded_all = False  # load() read every year, so years added later count as loaded too
+        self.backup_path = None
+        self.quarantined = []
+        self.manifest_signature = None  # file_signature() of the manifest as of our last read or write
+
+    def shard(self, year):
+        with self.state_lock:
+            storage = self.shards.get(year)
+            if storage is None:
+                storage = self.shards[year] = JsonStorage(
+                    os.path.join(self.shard_dir, f"{year}.json"), self.snapshot_format
+                )
+            return storage
+
+    def ensure_shard_dir(self):
+        os.makedirs(self.shard_dir, exist_ok=True)
+
+    def read_manifest(self):
+        """
+        Read the years from the manifest. A missing or unreadable manifest is
+        rebuilt from the year files in the directory. Call with the lock held.
+        """
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            years = manifest["years"]
+            if not isinstance(years, list) or not all(isinstance(year, int) for year in years):
+                raise ValueError("manifest years are not a list of integers.")
+            years = set(years)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if os.path.exists(self.manifest_file):
+                logger.error("Error reading %s (%s); rebuilding it from the year files.", self.manifest_file, e)
+            years = set()
+            if os.path.isdir(self.shard_dir):
+                for name in os.listdir(self.shard_dir):
+                    match = SHARD_FILE_PATTERN.match(name)
+                    if match:
+                        years.add(int(match.group(1)))
+            with self.state_lock:
+                self.years = years
+            self.write_manifest()
+        self.manifest_signature = file_signature(self.manifest_file)
+        # A year left in both places by an interrupted archive run is read from its year file
+        archived = self.archive.years() - years
+        with self.state_lock:
+            self.years = years
+            self.archived = archived
+
+    def write_manifest(self):
+        """Write the manifest atomically. Call with the lock held."""
+        self.ensure_shard_dir()
+        with self.state_lock:
+            years = sorted(self.years)
+        temp_file = self.manifest_file + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "years": years}, f, indent=4)
+        os.replace(temp_file, self.manifest_file)
+
+    def add_years(self, years):
+        """List new years in the manifest before their files are written."""
+        with self.lock:
+            self.change_manifest(add=years)
+
+    def change_manifest(self, add=(), remove=()):
+        """Add years to, or drop them from, the manifest. Call with the lock held."""
+        in_sync = file_signature(self.manifest_file) == self.manifest_signature
+        if not in_sync:
+            self.read_manifest()
+        with self.state_lock:
+            if set(add) <= self.years and self.years.isdisjoint(remove):
+                return
+            self.years = (self.years | set(add)) - set(remove)
+        self.write_manifest()
+        # Changes another instance made stay visible to changed_on_disk()
+        self.manifest_signature = file_signature(self.manifest_file) if in_sync else None
+
+    def migrate_single_file(self):
+        """Split a single-file tasks.json (and its journal) into year files once."""
+        if os.path.exists(self.manifest_file):
+            return
+        with self.lock:
+            if os.path.exists(self.manifest_file):
+                return  # Another instance migrated first
+            legacy = JsonStorage(self.legacy_file, self.snapshot_format)
+            if legacy.has_files():
+                tasks = legacy.load()
+                legacy.close()
+                self.backup_path = legacy.backup_path
+                self.quarantined = legacy.quarantined
+                self.ensure_shard_dir()
+                years = tasks.years()
+                for year in years:
+                    self.shard(year).save(TaskTable(dict(tasks.range(*year_bounds(year)))))
+                rules = legacy.load_rules()
+                if rules:
+                    write_rules_file(self.rules_file, rules)
+                with self.state_lock:
+                    self.years = set(years)
+                self.write_manifest()
+                logger.info("Migrated %s into %d year file(s) in %s", self.legacy_file, len(years), self.shard_dir)
+            else:
+                self.read_manifest()
+
+    def load(self, years=None):
+        """
+        Load the given years (all stored years, archived ones included, if
+        None) into a TaskTable. Other years stay on disk until load_years()
+        is called for them.
+        """
+        self.backup_path = None
+        self.quarantined = []
+        self.migrate_single_file()
+        with self.lock:
+            self.read_manifest()
+        with self.state_lock:
+            self.loaded = set()
+            self.loaded_all = years is None
+            if years is None:
+                years = self.years | self.archived
+        return self.load_years(years)
+
+    def load_years(self, years):
+        """Read more years, from their year files or archives, and return their tasks as a TaskTable."""
+        with self.state_lock:
+            wanted = sorted(set(years) - self.loaded)
+            stored, archived = set(self.years), set(self.archived)
+        days = {}
+        for year in wanted:
+            if year in stored:
+                with span("load.shard"):
+                    shard = self.shard(year)
+                    days.update(shard.load().days)
+                    if shard.backup_path:
+                        self.backup_path = shard.backup_path
+                        self.quarantined.extend(shard.quarantined)
+            elif year in archived:
+                days.update(self.read_archive(year).days)
+            with self.state_lock:
+                self.loaded.add(year)
+        return TaskTable(days)
+
+    def read_archive(self, year):
+        """
+        Read an archived year into a TaskTable. Like a year file, an archive
+        with malformed entries is backed up and rewritten without them, and
+        one that can't be read at all is backed up and read as empty.
+        """
+        path = self.archive.path(year)
+        quarantined = []
+        try:
+            data = self.archive.read(year, quarantined)
+        except Exception as e:
+            logger.error("Error loading %s: %s", path, e)
+            self.backup_path = path + ".backup"
+            try:
+                os.replace(path, self.backup_path)
+                logger.warning("Corrupted archive backed up as %s", self.backup_path)
+            except OSError as rename_error:
+                logger.error("Failed to backup corrupted archive: %s", rename_error)
+            return TaskTable()
+        if quarantined:
+            for entry in quarantined:
+                logger.warning("Left out a malformed entry of %s: %s", path, describe_entry(entry))
+            self.quarantined.extend(quarantined)
+            self.backup_path = path + ".backup"
+            try:
+                shutil.copyfile(path, self.backup_path)
+                self.archive.write(year, data)
+                logger.warning("Archive with malformed entries backed up as %s", self.backup_path)
+            except OSError as e:
+                logger.error("Failed to replace the archive with malformed entries: %s", e)
+        else:
+            logger.info("%s loaded successfully.", path)
+        return TaskTable.from_nested(data)
+
+    def archived_years(self):
+        """Years in the archive; see read_archived()."""
+        with self.state_lock:
+            return set(self.archived)
+
+    def read_archived(self, years):
+        """
+        Read archived years into a TaskTable without loading them: they aren't
+        noted as loaded, and an archive that is damaged or has malformed
+        entries is only logged (read_archive() repairs it once the year is
+        loaded). Safe on a worker thread.
+        """
+        days = {}
+        for year in sorted(years):
+            quarantined = []
+            try:
+                data = self.archive.read(year, quarantined)
+            except Exception as e:
+                logger.error("Error reading the archive of %d: %s", year, e)
+                continue
+            for entry in quarantined:
+                logger.warning("Left out a malformed entry of the archive of %d: %s", year, describe_entry(entry))
+            days.update(TaskTable.from_nested(data).days)
+        return TaskTable(days)
+
+    def archive_matches(self, year, tasks):
+        """True if the tasks of a year in a TaskTable are those in its archive."""
+        try:
+            data = self.archive.read(year)
+        except Exception:
+            return False
+        return TaskTable.from_nested(data).days == dict(tasks.range(*year_bounds(year)))
+
+    def archive_years(self, before):
+        """
+        Move the years before `before` out of the working set into
+        compressed archives. Returns the years archived.
+        """
+        archived = []
+        with self.lock:
+            self.read_manifest()
+            with self.state_lock:
+                past = sorted(year for year in self.years if year < before)
+            for year in past:
+                shard = self.shard(year)
+                try:
+                    # Archive written, then the year dropped from the manifest, then its files deleted
+                    shard.retire(lambda data, year=year: self.keep_archived(year, data))
+                except Exception as e:
+                    logger.error("Error archiving %d: %s", year, e)
+                    continue
+                shard.lock.close()
+                try:
+                    os.remove(shard.lock.path)
+                except OSError:
+                    pass  # Gone already, or still open in another instance (Windows)
+                with self.state_lock:
+                    del self.shards[year]
+                archived.append(year)
+        if archived:
+            logger.info("Archived %s into %s.", ", ".join(map(str, archived)), self.archive.archive_dir)
+        return archived
+
+    def archive_past_years(self, keep_years=None):
+        """
+        Archive the years more than keep_years (archive_keep_years if None)
+        before the current one; a negative number archives nothing. Returns
+        the years archived.
+        """
+        keep_years = self.archive_keep_years if keep_years is None else keep_years
+        if keep_years < 0 or not os.path.exists(self.manifest_file):
+            return []
+        return self.archive_years(date.today().year - keep_years)
+
+    def keep_archived(self, year, data):
+        """Write a year's data as its archive and move it from the manifest to the archived years."""
+        self.archive.write(year, data)
+        self.change_manifest(remove=[year])
+        with self.state_lock:
+            self.archived.add(year)
+
+    def thaw(self, year):
+        """
+        Move an archived year back into the working set, before it is edited
+        or saved. An archive left next to a year that is still in the
+        manifest (an archive run was interrupted) is only deleted.
+        """
+        with self.lock:
+            self.read_manifest()  # Another instance may have archived the year since
+            with self.state_lock:
+                archived = year in self.archived
+            if archived:
+                self.shard(year).save(self.read_archive(year))
+                self.change_manifest(add=[year])
+                logger.info("Moved %d back from the archive.", year)
+            self.archive.remove(year)
+            with self.state_lock:
+                self.archived.discard(year)
+
+    def unloaded_years(self):
+        """Years with stored tasks, archived or not, that haven't been loaded."""
+        with self.state_lock:
+            return set() if self.loaded_all else (self.years | self.archived) - self.loaded
+
+    def is_loaded(self, year):
+        with self.state_lock:
+            return self.loaded_all or year in self.loaded
+
+    def changed_on_disk(self):
+        """True if another instance changed the manifest or a loaded year since our last read or write."""
+        if file_signature(self.manifest_file) != self.manifest_signature:
+            return True
+        # Archives only change together with the manifest
+        with self.state_lock:
+            shards = [shard for year, shard in self.shards.items() if self.is_loaded(year)]
+        return any(shard.changed_on_disk() for shard in shards)
+
+    def read_current(self):
+        """Return the loaded years as they are on disk now, including other instances' edits."""
+        with self.lock:
+            self.read_manifest()
+        with self.state_lock:
+            stored = set(self.years)
+            loaded = sorted(year for year in stored | self.archived if self.is_loaded(year))
+        days = {}
+        for year in loaded:
+            if year in stored:
+                days.update(self.shard(year).read_current().days)
+            else:
+                days.update(TaskTable.from_nested(self.archive.read(year)).days)
+        return TaskTable(days)
+
+    def split_by_year(self, changes):
+        """
+        Group changes by year, keeping their order, move archived years back
+        into the working set and list new years in the manifest.
+        """
+        by_year = {}
+        for change in changes:
+            by_year.setdefault(date.fromordinal(change.ordinal).year, []).append(change)
+        with self.state_lock:
+            archived = set(self.archived)
+        for year in sorted(by_year):
+            if year in archived or self.archive.path(year) is not None:
+                self.thaw(year)
+        with self.state_lock:
+            missing = not self.years.issuperset(by_year)
+        if missing:
+            self.add_years(by_year)
+        return by_year
+
+    def write_changes(self, changes):
+        """Append each change to the journal of its year."""
+        for year, year_changes in self.split_by_year(changes).items():
+            self.shard(year).write_changes(year_changes)
+            with self.state_lock:
+                self.loaded.add(year)
+
+    def save(self, tasks):
+        """
+        Rewrite the year files of the loaded years from a TaskTable; other
+        years are left alone. A loaded archived year stays in the archive
+        unless its tasks were edited.
+        """
+        years = set(tasks.years())
+        with self.state_lock:
+            archived = sorted(self.archived & (years | self.loaded))
+        for year in archived:
+            if self.archive_matches(year, tasks):
+                years.discard(year)
+            else:
+                self.thaw(year)
+        with self.state_lock:
+            missing = not self.years.issuperset(years)
+        if missing:
+            self.add_years(years)
+        with self.state_lock:
+            to_save = sorted({year for year in self.years if self.is_loaded(year)} | years)
+        for year in to_save:
+            self.shard(year).save(TaskTable(dict(tasks.range(*year_bounds(year)))))
+        with self.state_lock:
+            self.loaded.update(years)
+
+    def load_rules(self):
+        """Return the stored recurrence rules as a list of dicts."""
+        return read_rules_file(self.rules_file)
+
+    def save_rules(self, rules):
+        """Replace the stored recurrence rules (a list of dicts) atomically."""
+        with self.lock:
+            self.ensure_shard_dir()
+            write_rules_file(self.rules_file, rules)
+
+    def close(self):
+        """Fold the journal of every year file that was used into its snapshot."""
+        with self.state_lock:
+            shards = list(self.shards.values())
+        for shard in shards:
+            shard.close()
+        self.lock.close()
+
+class SqliteStorage:
+    """
+    Store tasks in an SQLite database with one row per task.
+    Edits become single-row inserts and deletes, and rows are indexed by date.
+    Like ShardedStorage, load() can read just some years and load_years()
+    adds others later; each year is one range scan of the date index.
+    """
+    name = "sqlite"
+
+    def __init__(self, db_file=TASKS_DB_FILE, json_file=TASKS_FILE, shard_dir=TASKS_SHARD_DIR):
+        self.db_file = db_file
+        self.json_file = json_file
+        self.shard_dir = shard_dir
+        self.conn = None
+        self.lock = threading.RLock()
+        self.backup_path = None
+        self.quarantined = []
+        self.data_version = None  # PRAGMA data_version as of our last read (counted per connection)
+        self.loaded = set()  # Years read into memory (or written by us)
+        self.loaded_all = False  # load() read every row, so years added later count as loaded too
+
+    def connect(self):
+        if self.conn is None:
+            import sqlite3  # Only needed when this backend is selected
+            ensure_app_data_dir()
+            # The connection is shared with the background writer thread, guarded by self.lock
+            self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            with self.conn:
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS tasks ("
+                    " year INTEGER NOT NULL, month INTEGER NOT NULL, day INTEGER NOT NULL,"
+                    " position INTEGER NOT NULL, task TEXT NOT NULL)"
+                )
+                self.conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_tasks_date ON tasks (year, month, day, position)"
+                )
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+                )
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS recurrences (id INTEGER PRIMARY KEY, rule TEXT NOT NULL)"
+                )
+        return self.conn
+
+    def migrate_from_json(self):
+        """Import the year files (or else tasks.json) into the database once."""
+        conn = self.connect()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return
+        if os.path.isdir(self.shard_dir):
+            json_storage = ShardedStorage(self.shard_dir, self.json_file)
+        elif JsonStorage(self.json_file).has_files():
+            json_storage = JsonStorage(self.json_file)
+        else:
+            json_storage = None
+        if json_storage is not None:
+            tasks = json_storage.load()
+            json_storage.close()
+            self.backup_path = json_storage.backup_path
+            self.quarantined = json_storage.quarantined
+            self.save(tasks)
+            self.save_rules(json_storage.load_rules())
+            logger.info("Migrated %s into %s", json_storage.name, self.db_file)
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)",
+                         (datetime.now().isoformat(),))
+
+    def load(self, years=None):
+        """Load the given years (all rows if None) into a TaskTable."""
+        self.backup_path = None
+        self.quarantined = []
+        self.migrate_from_json()
+        with self.lock:
+            self.loaded = set()
+            self.loaded_all = years is None
+            tasks = self.read_years(years)
+        logger.info("%s loaded successfully.", self.db_file)
+        return tasks
+
+    def load_years(self, years):
+        """Read more years and return their tasks as a TaskTable."""
+        with self.lock:
+            years = set(years) - self.loaded
+            return self.read_years(years) if years else TaskTable()
+
+    def read_years(self, years):
+        """
+        Return the tasks of the given years (every row if None) as they are in
+        the database now, and count the years as loaded. Called with lock held.
+        """
+        conn = self.connect()
+        self.data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if years is None:
+            rows = conn.execute("SELECT year, month, day, task FROM tasks ORDER BY year, month, day, position")
+        else:
+            rows = (
+                row for year in sorted(years) for row in conn.execute(
+                    "SELECT year, month, day, task FROM tasks WHERE year = ? ORDER BY month, day, position", (year,)
+                )
+            )
+        days = {}
+        key = tasks = None
+        for year, month, day, task in rows:
+            if (year, month, day) != key:
+                key = (year, month, day)
+                try:
+                    tasks = days.setdefault(date(year, month, day).toordinal(), [])
+                except ValueError:
+                    logger.warning("Skipping task on invalid date %s-%s-%s.", year, month, day)
+                    tasks = []
+            tasks.append(task)
+        if years is not None:
+            self.loaded.update(years)
+        return TaskTable(days)
+
+    def read_current(self):
+        """Return the loaded years as they are in the database now, including other instances' edits."""
+        with self.lock:
+            return self.read_years(None if self.loaded_all else set(self.loaded))
+
+    def stored_years(self):
+        """Years that have rows: one index seek per year rather than a scan of every row."""
+        years = set()
+        with self.lock:
+            conn = self.connect()
+            year = None
+            while True:
+                if year is None:
+                    (year,) = conn.execute("SELECT MIN(year) FROM tasks").fetchone()
+                else:
+                    (year,) = conn.execute("SELECT MIN(year) FROM tasks WHERE year > ?", (year,)).fetchone()
+                if year is None:
+                    return years
+                years.add(year)
+
+    def unloaded_years(self):
+        """Years with stored tasks that haven't been loaded."""
+        with self.lock:
+            if self.loaded_all:
+                return set()
+            return self.stored_years() - self.loaded
+
+    def changed_on_disk(self):
+        """True if another connection committed changes since our last read."""
+        with self.lock:
+            return self.connect().execute("PRAGMA data_version").fetchone()[0] != self.data_version
+
+    def save(self, tasks):
+        """
+        Replace the contents of the database with a TaskTable. Years that
+        weren't loaded (and aren't in tasks) keep their rows.
+        """
+        def rows():
+            for ordinal, day_tasks in tasks.items():
+                date_obj = date.fromordinal(ordinal)
+                for position, task in enumerate(day_tasks):
+                    yield date_obj.year, date_obj.month, date_obj.day, position, task
+
+        with self.lock, span("save.sqlite"), self.connect() as conn:
+            if self.loaded_all:
+                conn.execute("DELETE FROM tasks")
+            else:
+                self.loaded.update(tasks.years())
+                conn.executemany("DELETE FROM tasks WHERE year = ?", ((year,) for year in sorted(self.loaded)))
+            conn.executemany("INSERT INTO tasks (year, month, day, position, task) VALUES (?, ?, ?, ?, ?)", rows())
+
+    def write_changes(self, changes):
+        """
+        Apply a batch of changes as row inserts and deletes in one transaction.
+        If another connection committed since our last read, the changes are
+        merged onto its version of the dates first.
+        """
+        with self.lock, span("save.sqlite_changes"):
+            if self.write_rows(changes):
+                # Our own commits leave data_version as it was; reading it again
+                # keeps the cached value right if the connection was reopened
+                self.data_version = self.connect().execute("PRAGMA data_version").fetchone()[0]
+            self.loaded.update(date.fromordinal(change.ordinal).year for change in changes)
+
+    def write_rows(self, changes):
+        """
+        Apply changes in one transaction (see write_changes()). Returns True
+        if nobody else had committed since our last read; if someone had,
+        the caller keeps data_version as it was, so changed_on_disk() still
+        reports their commit and it gets merged. Called with lock held.
+        """
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")  # Take the write lock before checking for other writers
+            in_sync = conn.execute("PRAGMA data_version").fetchone()[0] == self.data_version
+            if not in_sync:
+                current = {}
+                for change in changes:
+                    if change.ordinal not in current:
+                        date_obj = date.fromordinal(change.ordinal)
+                        current[change.ordinal] = tuple(self.tasks_for_day(date_obj.year, date_obj.month, date_obj.day))
+                changes = [rebase_change(change, current) for change in changes]
+            for change in changes:
+                date_obj = date.fromordinal(change.ordinal)
+                key = (date_obj.year, date_obj.month, date_obj.day)
+                if change.op == "add":
+                    conn.execute(
+                        "INSERT INTO tasks (year, month, day, position, task) VALUES (?, ?, ?, ?, ?)",
+                        key + (len(change.tasks) - 1, change.arg)
+                    )
+                elif change.op == "delete":
+                    conn.execute(
+                        "DELETE FROM tasks WHERE year = ? AND month = ? AND day = ? AND position = ?",
+                        key + (change.arg,)
+                    )
+                    conn.execute(
+                        "UPDATE tasks SET position = position - 1"
+                        " WHERE year = ? AND month = ? AND day = ? AND position > ?",
+                        key + (change.arg,)
+                    )
+                elif change.op in ("clear", "set"):
+                    conn.execute(
+                        "DELETE FROM tasks WHERE year = ? AND month = ? AND day = ?",
+                        key
+                    )
+                    conn.executemany(
+                        "INSERT INTO tasks (year, month, day, position, task) VALUES (?, ?, ?, ?, ?)",
+                        (key + (position, task) for position, task in enumerate(change.tasks))
+                    )
+                else:
+                    raise ValueError(f"Unknown change: {change.op}")
+        return in_sync
+
+    def load_rules(self):
+        """Return the stored recurrence rules as a list of dicts."""
+        with self.lock:
+            rows = self.connect().execute("SELECT rule FROM recurrences ORDER BY id")
+            rules = []
+            for (rule,) in rows:
+                try:
+                    rules.append(json.loads(rule))
+                except ValueError as e:
+                    logger.warning("Skipping unreadable recurrence rule: %s", e)
+            return rules
+
+    def save_rules(self, rules):
+        """Replace the stored recurrence rules (a list of dicts)."""
+        with self.lock, self.connect() as conn:
+            conn.execute("DELETE FROM recurrences")
+            conn.executemany(
+                "INSERT INTO recurrences (id, rule) VALUES (?, ?)",
+                ((rule["id"], json.dumps(rule)) for rule in rules)
+            )
+
+    def tasks_for_day(self, year, month, day):
+        """Return the tasks of a single date in order (indexed query)."""
+        with self.lock:
+            rows = self.connect().execute(
+                "SELECT task FROM tasks WHERE year = ? AND month = ? AND day = ? ORDER BY position",
+                (year, month, day)
+            )
+            return [task for (task,) in rows]
+
+    def archived_years(self):
+        """Nothing is archived: rows are indexed by date, so old years cost nothing to keep."""
+        return set()
+
+    def archive_past_years(self, keep_years=None):
+        """Nothing is archived: rows are indexed by date, so old years cost nothing to keep."""
+        return []
+
+    def close(self):
+        """Close the database; every edit is already committed."""
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+                self.data_version = None  # Counted per connection, so it means nothing for the next one
+
+def create_storage(backend=STORAGE_BACKEND):
+    """Return the storage backend selected by name ("sharded", "json" or "sqlite")."""
+    if backend == "sqlite":
+        return SqliteStorage()
+    if backend == "json":
+        return JsonStorage()
+    if backend != "sharded":
+        logger.warning("Unknown storage backend %r, falling back to sharded.", backend)
+    return ShardedStorage()
+
+class BackgroundWriter:
+    """
+    Write queued changes to a storage backend on a worker thread.
+    A burst of edits is written as one batch once no edit arrived for
+    quiet_period seconds, or max_delay seconds after the first queued edit.
+    Each queued change bumps generation; written_generation trails it until
+    the batch holding that change has been written. If the worker thread
+    stops on an unexpected error, queued changes are written on the thread
+    that submits or flushes them instead.
+    """
+
+    def __init__(self, storage, on_error=None, quiet_period=SAVE_QUIET_PERIOD, max_delay=SAVE_MAX_DELAY):
+        self.storage = storage
+        self.on_error = on_error  # Called on the worker thread with the exception
+        self.quiet_period = quiet_period
+        self.max_delay = max_delay
+        self.condition = threading.Condition()
+        self.pending = []
+        self.generation = 0
+        self.written_generation = 0
+        self.first_queued_at = None
+        self.last_queued_at = None
+        self.flush_requested = False
+        self.closing = False
+        self.failed = False
+        self.last_error = None
+        self.stopped = False  # The worker thread has returned (closed, or stopped by an error)
+        self.thread = threading.Thread(target=self.run, name="task-writer", daemon=True)
+        self.thread.start()
+
+    @property
+    def dirty(self):
+        """True while some queued change hasn't been written yet."""
+        return self.written_generation != self.generation
+
+    def submit(self, change):
+        """Queue a change for writing."""
+        with self.condition:
+            now = time.monotonic()
+            self.pending.append(change)
+            self.generation += 1
+            if self.first_queued_at is None:
+                self.first_queued_at = now
+            self.last_queued_at = now
+            self.failed = False
+            self.condition.notify_all()
+            if self.stopped and not self.closing:
+                self.write_orphaned()
+
+    def submit_many(self, changes):
+        """Queue several changes so they are written in the same batch."""
+        with self.condition:
+            self.pending.extend(changes)
+            self.generation += len(changes)
+            self.flush_requested = True
+            self.failed = False
+            self.condition.notify_all()
+            if self.stopped and not self.closing:
+                self.write_orphaned()
+
+    def seconds_until_due(self, now):
+        """Seconds until the pending batch should be written, or None if nothing is due."""
+        if not self.pending or self.failed and not (self.flush_requested or self.closing):
+            return None
+        if self.flush_requested or self.closing:
+            return 0
+        return min(self.last_queued_at + self.quiet_period, self.first_queued_at + self.max_delay) - now
+
+    def run(self):
+        try:
+            self.write_batches()
+        except Exception as e:
+            # Not a write error (those are kept and retried): the worker can't go on
+            with self.condition:
+                self.last_error = e
+            logger.error("The background writer stopped: %s", e)
+            if self.on_error is not None:
+                self.on_error(e)
+        finally:
+            with self.condition:
+                self.stopped = True
+                self.condition.notify_all()
+
+    def write_batches(self):
+        while True:
+            with self.condition:
+                while True:
+                    wait = self.seconds_until_due(time.monotonic())
+                    if wait is not None and wait <= 0:
+                        break
+                    if self.closing and not self.pending:
+                        return
+                    self.condition.wait(wait)
+                batch = self.pending
+                batch_generation = self.generation
+                self.pending = []
+                self.first_queued_at = self.last_queued_at = None
+
+            try:
+                self.storage.write_changes(batch)
+                count("writer.batches")
+                error = None
+            except Exception as e:
+                error = e
+
+            with self.condition:
+                if error is None:
+                    self.written_generation = batch_generation
+                    self.failed = False
+                    self.last_error = None
+                else:
+                    # Keep the batch in front of newer edits; it is retried on the next edit or flush
+                    self.pending = batch + self.pending
+                    now = time.monotonic()
+                    self.first_queued_at = self.last_queued_at = now
+                    self.failed = True
+                    self.last_error = error
+                self.flush_requested = False
+                self.condition.notify_all()
+            if error is not None:
+                logger.error("Error writing tasks: %s", error)
+                if self.on_error is not None:
+                    self.on_error(error)
+                if self.closing:
+                    return
+
+    def flush(self):
+        """
+        Write every queued change now. Raises the write error if it fails.
+        Once the worker thread has stopped, the changes are written here.
+        """
+        with self.condition:
+            target = self.generation
+            self.failed = False  # Retry a batch that failed earlier
+            while self.written_generation < target and not self.stopped:
+                self.flush_requested = True
+                self.condition.notify_all()
+                self.condition.wait()
+                if self.failed:
+                    raise self.last_error
+            if self.written_generation < target:
+                self.write_pending()
+
+    def write_pending(self):
+        """
+        Write the queued changes on the calling thread, for when the worker
+        thread has stopped. Called with condition held; a failed batch is
+        kept, as on the worker, and its error raised.
+        """
+        batch = self.pending
+        batch_generation = self.generation
+        self.pending = []
+        self.first_queued_at = self.last_queued_at = None
+        try:
+            self.storage.write_changes(batch)
+        except Exception as e:
+            self.pending = batch + self.pending
+            self.failed = True
+            self.last_error = e
+            raise
+        count("writer.batches")
+        self.written_generation = batch_generation
+        self.failed = False
+        self.last_error = None
+
+    def write_orphaned(self):
+        """Write a change submitted after the worker thread stopped; errors go to on_error like the worker's."""
+        try:
+            self.write_pending()
+        except Exception as e:
+            logger.error("Error writing tasks: %s", e)
+            if self.on_error is not None:
+                self.on_error(e)
+
+    def close(self):
+        """Flush queued changes and stop the worker thread."""
+        with self.condition:
+            self.closing = True
+            self.condition.notify_all()
+        self.thread.join()
+        if self.last_error is not None and self.dirty:
+            raise self.last_error
+
+def build_index(table):
+    """Return a TaskIndex of a TaskTable. Safe on a worker thread while nothing changes table."""
+    index = TaskIndex()
+    with span("search.index_build"):
+        index.build(table)
+    return index
+
+def merge_occurrences(table, recurrences, years):
+    """
+    Return table with the recurring tasks of the given years merged in. Only
+    the lists of dates with occurrences are copied; table itself is left
+    unchanged (and returned as is without rules).
+    """
+    if not recurrences.rules:
+        return table
+    merged = table.copy()
+    for year in years:
+        for month in range(1, 13):
+            first = date(year, month, 1).toordinal()
+            for day, rules in recurrences.occurrences(year, month).items():
+                ordinal = first + day - 1
+                merged.set_day(ordinal, list(merged.get(ordinal)) + [rule.text for rule in rules])
+    return merged
+
+class BackgroundLoader:
+    """
+    Load a TaskStore's tasks on a worker thread.
+    The results are put on the results queue as (kind, value) pairs for the
+    thread that owns the store: ("tasks", LoadedTasks) to install(), then
+    ("index", TaskIndex) to install_index(), or ("error", exception) if
+    either failed. The storage must not be used by anyone else until the
+    tasks have arrived.
+    """
+
+    def __init__(self, store, years=None):
+        self.store = store
+        self.years = years
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="task-loader", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            loaded = self.store.read(self.years)
+            # The owner edits the loaded table as soon as it has it; the index is built from the stored copy
+            synced = TaskTable(dict(loaded.synced))
+            self.results.put(("tasks", loaded))
+            self.results.put(("index", build_index(synced)))
+        except Exception as e:
+            logger.error("Error loading tasks: %s", e)
+            self.results.put(("error", e))
+
+    def join(self, timeout=None):
+        """Wait for the worker thread to finish."""
+        self.thread.join(timeout)
+
+class ArchiveSearch:
+    """
+    Search the archived years of a TaskStore (search_archived()) on a worker
+    thread. The outcome is put on the results queue as ("results",
+    [SearchResult]) or ("error", exception).
+    """
+
+    def __init__(self, store, query, limit=SEARCH_RESULT_LIMIT):
+        self.store = store
+        self.query = query
+        self.limit = limit
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="archive-search", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            self.results.put(("results", self.store.search_archived(self.query, self.limit)))
+        except Exception as e:
+            logger.error("Error searching the archived years: %s", e)
+            self.results.put(("error", e))
+
+class ExternalChangeReader:
+    """
+    Check a TaskStore's storage for edits another instance saved, and read
+    them, on a worker thread (read_external()). The outcome is put on the
+    results queue as ("tasks", ExternalTasks or None) for the thread that
+    owns the store to merge_external(), or ("error", exception).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="external-changes", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            self.results.put(("tasks", self.store.read_external()))
+        except Exception as e:
+            logger.warning("Could not read tasks changed by another instance: %s", e)
+            self.results.put(("error", e))
+
+    def join(self, timeout=None):
+        """Wait for the worker thread to finish."""
+        self.thread.join(timeout)
+
+class TaskSnapshot:
+    """
+    The tasks and rules of a TaskStore as of one generation, for rendering on
+    another thread (TaskServer) without holding the store's lock. It is taken
+    by TaskStore.snapshot() and has the reading methods TaskOverview uses.
+    Archived years are read from storage only when a method asks for them.
+    """
+
+    def __init__(self, store):
+        # Runs under store.lock: only copies, no storage access
+        self.storage = store.storage
+        self.generation = store.generation
+        self.tasks = TaskTable({ordinal: tuple(tasks) for ordinal, tasks in store.tasks.items()})
+        self.archived = store.unloaded_years & store.storage.archived_years()
+        self.month_changes = dict(store.month_changes)
+        self.all_changed = store.all_changed
+        self.recurrences = RecurrenceSet(store.recurrences.rules.values())
+
+    def read_archived(self, years=None):
+        """Return a TaskTable of the archived years that weren't loaded (only those among years, if given)."""
+        archived = self.archived if years is None else self.archived & set(years)
+        if not archived:
+            return TaskTable()
+        with span("load.archived"):
+            return self.storage.read_archived(archived)
+
+    def all_tasks(self):
+        """Return every task, archived years included."""
+        archived = self.read_archived()
+        if not archived:
+            return self.tasks
+        return TaskTable({**archived.days, **self.tasks.days})
+
+    def year_tasks(self, year):
+        """Return a TaskTable holding the tasks of a year, reading only its own archive if it is archived."""
+        return self.read_archived([year]) or self.tasks
+
+    def month_generation(self, year, month):
+        return max(self.month_changes.get((year, month), 0), self.all_changed)
+
+    def tasks_with_occurrences(self, years, table=None):
+        return merge_occurrences(self.tasks if table is None else table, self.recurrences, years)
+
+class TaskStore:
+    """
+    Tasks of the planner plus the storage backend that persists them.
+    tasks holds the TaskTable; change it through add(), delete() and clear()
+    so every edit reaches the backend. Recurring tasks are kept as
+    rules in recurrences and only expanded for the months that are looked at.
+    With a backend that stores years separately, tasks may hold only some
+    years; unloaded_years lists the others, which are read in when first
+    needed. Archived years are only read in for their own dates; search,
+    overviews and exports read them into a table of their own
+    (read_archived()) that isn't kept.
+    Everything that changes tasks, the rules or generation holds lock.
+    Another thread reads them through snapshot(), which holds lock only
+    while it copies them.
+    """
+
+    def __init__(self, storage=None):
+        self.storage = storage if storage is not None else create_storage()
+        self.lock = threading.RLock()  # Held by edits, and by other threads while they read tasks or rules
+        self.tasks = TaskTable()
+        self.backup_path = None  # Set when load() had to back up a corrupted file
+        self.quarantined = []  # Malformed entries left out of the loaded files (QuarantinedEntry)
+        self.writer = None  # BackgroundWriter once start_writer() was called
+        self.index = TaskIndex()  # Full-text index, kept in step with tasks
+        self.index_pending = None  # Dates edited while an index is built elsewhere (see install_index)
+        self.recurrences = RecurrenceSet()  # Recurring tasks, expanded per month on demand
+        self.task_counts = TaskCounts()  # Per date, week, month and year; see counts()
+        self.synced = {}  # Date ordinal -> tasks as last read from or written to storage (merge base)
+        self.unloaded_years = set()  # Stored years not read into tasks yet
+        self.generation = 0  # Bumped on every change to tasks or rules, for caches of rendered output
+        self.month_changes = {}  # (year, month) -> generation of the last change to that month
+        self.all_changed = 0  # Generation of the last change that can affect every month (load, rules)
+        self.last_snapshot = None  # TaskSnapshot of the latest snapshot() call
+
+    def load(self, years=None):
+        """
+        Load tasks from the storage backend: all of them, or only the given
+        years if the backend can read years separately.
+        """
+        self.install(self.read(years))
+        self.install_index(build_index(self.tasks))
+        return self.tasks
+
+    def read(self, years=None):
+        """
+        Read tasks and rules from the storage backend without touching the
+        store's own state, so it can run on a worker thread (BackgroundLoader).
+        Returns LoadedTasks for install().
+        """
+        with span("load"):
+            tasks = self.storage.load(years)
+        return LoadedTasks(
+            tasks,
+            {ordinal: tuple(day_tasks) for ordinal, day_tasks in tasks.items()},
+            self.storage.unloaded_years(),
+            self.storage.backup_path,
+            list(self.storage.quarantined),
+            self.storage.load_rules(),
+        )
+
+    @locked
+    def install(self, loaded):
+        """
+        Put tasks read by read() in place. Until install_index() is given an
+        index of them, search finds nothing and edits are only noted for it.
+        """
+        self.tasks = loaded.tasks
+        self.synced = loaded.synced
+        self.unloaded_years = loaded.unloaded_years
+        self.month_changes = {}
+        self.changed_all()
+        self.backup_path = loaded.backup_path
+        self.quarantined = loaded.quarantined
+        self.index = TaskIndex()
+        self.index_pending = set()
+        self.load_rules(loaded.rules)
+
+    def install_index(self, index):
+        """Use an index built from the installed tasks, bringing the dates edited since up to date."""
+        if self.index_pending:
+            index.index_days((ordinal, tuple(self.tasks.get(ordinal))) for ordinal in sorted(self.index_pending))
+        self.index = index
+        self.index_pending = None
+
+    @property
+    def index_ready(self):
+        """False between install() and install_index(), while search can't find the loaded tasks yet."""
+        return self.index_pending is None
+
+    def reindex(self, entries):
+        """Bring the index up to date for (ordinal, tasks) pairs, or note the dates while it is being built."""
+        if self.index_pending is None:
+            self.index.index_days(entries)
+        else:
+            self.index_pending.update(ordinal for ordinal, _ in entries)
+
+    @locked
+    def load_rules(self, records=None):
+        """Load the recurrence rules (records read by read(), or from storage), skipping invalid ones."""
+        rules = []
+        for record in self.storage.load_rules() if records is None else records:
+            try:
+                rules.append(rule_from_dict(record))
+            except ValueError as e:
+                logger.warning("Skipping invalid recurrence rule %r: %s", record, e)
+        self.recurrences.load(rules)
+        self.changed_all()
+
+    def load_years(self, years):
+        """
+        Read stored years that aren't loaded yet into tasks. Returns the years
+        read. The files are read without holding lock, so another thread
+        may have read some of the years meanwhile; those are left as they are.
+        """
+        with self.lock:
+            years = self.unloaded_years.intersection(years)
+        if not years:
+            return set()
+        with span("load.years"):
+            table = self.storage.load_years(years)
+        with self.lock:
+            unloaded = years & self.unloaded_years
+            if unloaded != years:
+                # Another thread put some of the years in place meanwhile
+                table = TaskTable({
+                    ordinal: tasks for ordinal, tasks in table.items() if date.fromordinal(ordinal).year in unloaded
+                })
+            return self.install_years(unloaded, table)
+
+    def install_years(self, years, table):
+        """Put the tasks of years read by load_years() in place; runs under lock."""
+        if not years:
+            return set()
+        # A date that is already in memory is newer than the file
+        days = {ordinal: tasks for ordinal, tasks in table.items() if ordinal not in self.tasks.days}
+        self.tasks.extend_days(days)
+        self.generation += 1
+        for year in years:
+            for month in range(1, 13):
+                self.month_changes[(year, month)] = self.generation
+        for ordinal, tasks in days.items():
+            self.synced[ordinal] = tuple(tasks)
+        if self.task_counts.table is self.tasks:
+            self.task_counts.update(days)
+        self.reindex([(ordinal, tuple(tasks)) for ordinal, tasks in days.items()])
+        self.unloaded_years -= years
+        if self.storage.backup_path:
+            self.backup_path = self.storage.backup_path
+            self.quarantined = list(self.storage.quarantined)
+        logger.info("Loaded tasks of %s.", ", ".join(str(year) for year in sorted(years)))
+        return years
+
+    def load_dates(self, ordinals):
+        """Read the years of the given dates (ordinals) if they aren't loaded yet."""
+        if self.unloaded_years:
+            self.load_years({date.fromordinal(ordinal).year for ordinal in ordinals})
+
+    def load_all(self):
+        """
+        Read every stored year that isn't loaded yet (before listing, searching
+        or exporting all tasks), except archived ones; see read_archived().
+        """
+        return self.load_years(self.unloaded_years - self.storage.archived_years())
+
+    def archived_years(self):
+        """Archived years that aren't loaded, which load_all() leaves on disk."""
+        with self.lock:
+            unloaded = set(self.unloaded_years)
+        return unloaded & self.storage.archived_years()
+
+    def read_archived(self, years=None):
+        """
+        Return a TaskTable of the archived years that aren't loaded (only those
+        among years, if given). It is read for the caller alone: tasks, the
+        index and synced are left as they are, so the archives are out of
+        memory again once the caller drops the table. Safe on a worker thread.
+        """
+        archived = self.archived_years()
+        if years is not None:
+            archived.intersection_update(years)
+        if not archived:
+            return TaskTable()
+        with span("load.archived"):
+            return self.storage.read_archived(archived)
+
+    def all_tasks(self):
+        """
+        Return every stored task, for an overview or an export: tasks after
+        load_all(), plus the archived years in a table of their own.
+        """
+        self.load_all()
+        archived = self.read_archived()
+        if not archived:
+            return self.tasks
+        return TaskTable({**archived.days, **self.tasks.days})
+
+    def year_tasks(self, year):
+        """
+        Return a TaskTable holding the tasks of a year, for a page of that
+        year: tasks, with the year read in if needed, or the year's archive
+        read for the caller alone (no other archive is read).
+        """
+        archived = self.read_archived([year])
+        if archived:
+            return archived
+        self.load_years((year,))
+        return self.tasks
+
+    @locked
+    def changed_dates(self, ordinals):
+        """Bump generation and update the counts for a change to the tasks of the given dates."""
+        self.generation += 1
+        for ordinal in ordinals:
+            date_obj = date.fromordinal(ordinal)
+            self.month_changes[(date_obj.year, date_obj.month)] = self.generation
+        if self.task_counts.table is self.tasks:
+            self.task_counts.update(ordinals)
+
+    def counts(self):
+        """
+        Return the TaskCounts of tasks. They are counted the first time after
+        tasks was replaced (by a load) and kept up to date by every edit.
+        """
+        if self.task_counts.table is not self.tasks:
+            with span("counts.build"):
+                self.task_counts.rebuild(self.tasks)
+        return self.task_counts
+
+    @locked
+    def changed_all(self):
+        """Bump generation for a change that can affect every month."""
+        self.generation += 1
+        self.all_changed = self.generation
+
+    def month_generation(self, year, month):
+        """Generation of the last change that affected a month, e.g. to check a cached rendering of it."""
+        return max(self.month_changes.get((year, month), 0), self.all_changed)
+
+    def start_writer(self, on_error=None):
+        """
+        Write edits on a background thread from now on.
+        on_error is called from that thread with any write error.
+        """
+        if self.writer is None:
+            self.writer = BackgroundWriter(self.storage, on_error)
+
+    @property
+    def dirty(self):
+        """True while an edit is queued but not yet written."""
+        return self.writer is not None and self.writer.dirty
+
+    def record(self, op, ordinal, arg=None):
+        """Index and persist an edit that has already been applied to tasks."""
+        count(f"tasks.{op}")
+        self.changed_dates((ordinal,))
+        tasks = tuple(self.tasks.get(ordinal))
+        self.reindex([(ordinal, tasks)])
+        change = TaskChange(op, ordinal, arg, tasks, self.synced.get(ordinal, ()))
+        self.mark_synced(ordinal, tasks)
+        if self.writer is not None:
+            self.writer.submit(change)
+        else:
+            self.storage.write_changes([change])
+
+    def flush(self):
+        """Write every queued edit now."""
+        if self.writer is not None:
+            self.writer.flush()
+
+    @locked
+    def add_many(self, days):
+        """
+        Merge a {date ordinal: [tasks]} dict into tasks without persisting it yet.
+        The dict must pass validate_days. Returns the ordinals that changed;
+        pass them to commit() once all parts are merged.
+        """
+        if not validate_days(days):
+            raise TaskStoreError("Imported tasks have an invalid structure.")
+        # Whole dates are written back, so their stored tasks must be in memory first
+        self.load_dates(days)
+        self.tasks.extend_days(days)
+        self.changed_dates(days)
+        return {ordinal for ordinal, day_tasks in days.items() if day_tasks}
+
+    def commit(self, ordinals):
+        """Index and persist whole dates as a single batch of changes."""
+        changes = [
+            TaskChange("set", ordinal, None, tuple(self.tasks.get(ordinal)), self.synced.get(ordinal, ()))
+            for ordinal in sorted(ordinals)
+        ]
+        self.reindex([(change.ordinal, change.tasks) for change in changes])
+        count("tasks.commit_days", len(changes))
+        self.write_batch(changes)
+
+    def write_batch(self, changes):
+        """Persist "set" changes of whole dates as one batch."""
+        if not changes:
+            return
+        for change in changes:
+            self.mark_synced(change.ordinal, change.tasks)
+        if self.writer is not None:
+            self.writer.submit_many(changes)
+        else:
+            self.storage.write_changes(changes)
+
+    def mark_synced(self, ordinal, tasks):
+        """Remember tasks as the stored state of a date."""
+        if tasks:
+            self.synced[ordinal] = tasks
+        else:
+            self.synced.pop(ordinal, None)
+
+    def sync_external(self):
+        """
+        Merge edits another instance saved since we last read or wrote the
+        storage; read_external() followed by merge_external(). Returns the
+        dates whose tasks changed here.
+        """
+        external = self.read_external()
+        if external is None:
+            return set()
+        return self.merge_external(external)
+
+    def read_external(self):
+        """
+        Read the storage if another instance saved edits since we last read
+        or wrote it, and return ExternalTasks for merge_external(), or None
+        if nothing changed. Safe on a worker thread (ExternalChangeReader):
+        lock is only held to copy synced, and tasks are left as they are.
+        """
+        if not self.storage.changed_on_disk():
+            return None
+        with self.lock:
+            synced = dict(self.synced)
+        with span("sync.read"):
+            # Our queued edits must be on disk first, or they'd look like the other side's
+            self.flush()
+            return ExternalTasks(self.storage.read_current(), synced, self.storage.unloaded_years())
+
+    @locked
+    def merge_external(self, external):
+        """
+        Merge ExternalTasks read by read_external() into tasks. Dates changed
+        on both sides get a three-way merge of their task lists, based on
+        synced as it was when they were read, and the result is written back
+        unless the storage already holds it. Returns the dates whose tasks
+        changed here.
+        """
+        with span("sync.merge"):
+            theirs = external.tasks
+            # Years read in here since are no longer unloaded
+            self.unloaded_years = external.unloaded_years - set(self.tasks.years())
+            changed = []
+            write_back = []
+            for ordinal in set(theirs.days).union(external.synced):
+                their_tasks = tuple(theirs.get(ordinal))
+                base = external.synced.get(ordinal, ())
+                if their_tasks == base:
+                    continue
+                ours = tuple(self.tasks.get(ordinal))
+                merged = merge_task_lists(base, ours, their_tasks)
+                if merged != ours:
+                    self.tasks.set_day(ordinal, list(merged))
+                    changed.append(ordinal)
+                # An edit made here after the read was written over their version
+                synced = self.synced.get(ordinal, ())
+                stored = synced if synced != base else their_tasks
+                if merged != stored:
+                    write_back.append(TaskChange("set", ordinal, None, merged, stored))
+                else:
+                    self.mark_synced(ordinal, merged)
+            self.reindex([(ordinal, tuple(self.tasks.get(ordinal))) for ordinal in changed])
+            if changed:
+                self.changed_dates(changed)
+            self.write_batch(write_back)
+        count("sync.merged_days", len(changed))
+        if changed or write_back:
+            logger.info("Merged changes from another instance on %d date(s), %d needed a three-way merge.",
+                        len(changed), len(write_back))
+        return {date.fromordinal(ordinal) for ordinal in changed}
+
+    def save(self):
+        """Write all tasks through the storage backend."""
+        self.flush()
+        self.storage.save(self.tasks)
+        self.synced = {ordinal: tuple(tasks) for ordinal, tasks in self.tasks.items()}
+
+    def archive_past_years(self, keep_years=None):
+        """
+        Move the years more than keep_years (the backend's setting if None)
+        before the current one into compressed archives, if the backend
+        archives years. Queued edits are written first. Returns the years
+        archived.
+        """
+        self.flush()
+        return self.storage.archive_past_years(keep_years)
+
+    def close(self):
+        """Flush pending work, merge last external edits and release the storage backend."""
+        if self.writer is not None:
+            writer, self.writer = self.writer, None
+            try:
+                writer.close()
+            except Exception as e:
+                logger.warning("Queued edits could not be written (%s); saving all tasks instead.", e)
+                self.save()
+        try:
+            self.sync_external()
+        except Exception as e:
+            logger.warning("Could not merge changes from another instance: %s", e)
+        self.storage.close()
+
+    def tasks_for(self, date_obj):
+        """Return the tasks of a date (empty if there are none)."""
+        if self.unloaded_years and date_obj.year in self.unloaded_years:
+            self.load_years((date_obj.year,))
+        return self.tasks.get(date_obj.toordinal())
+
+    def days_with_tasks(self, year, month):
+        """Return the days of a month that have at least one task or recurring task."""
+        if self.unloaded_years and year in self.unloaded_years:
+            self.load_years((year,))
+        days = self.tasks.days_in_month(year, month)
+        occurrences = self.recurrences.occurrences(year, month)
+        if occurrences:
+            return sorted(set(days).union(occurrences))
+        return days
+
+    def day_counts(self, year, month):
+        """Return {day: number of tasks, recurring ones included} for the days of a month that have any."""
+        if self.unloaded_years and year in self.unloaded_years:
+            self.load_years((year,))
+        counts = self.counts().month_days(year, month)
+        for day, rules in self.recurrences.occurrences(year, month).items():
+            counts[day] = counts.get(day, 0) + len(rules)
+        return counts
+
+    def month_count(self, year, month):
+        """Number of tasks in a month, recurring ones included."""
+        if self.unloaded_years and year in self.unloaded_years:
+            self.load_years((year,))
+        occurrences = self.recurrences.occurrences(year, month)
+        return self.counts().month(year, month) + sum(len(rules) for rules in occurrences.values())
+
+    def week_count(self, date_obj):
+        """Number of tasks in the week (Monday to Sunday) of a date, recurring ones included."""
+        monday = date_obj - timedelta(days=date_obj.weekday())
+        week = [monday + timedelta(days=offset) for offset in range(7)]
+        self.load_dates(day.toordinal() for day in week)
+        recurring = sum(len(self.recurrences.occurrences_on(day)) for day in week)
+        return self.counts().week(date_obj.toordinal()) + recurring
+
+    def count_between(self, first, last):
+        """Number of stored tasks from date first to date last (recurring tasks are not counted)."""
+        if self.unloaded_years:
+            self.load_years(range(first.year, last.year + 1))
+        return self.counts().between(first.toordinal(), last.toordinal())
+
+    def occurrences_for(self, date_obj):
+        """Return the RecurrenceRules that occur on a date."""
+        return self.recurrences.occurrences_on(date_obj)
+
+    def has_tasks(self, date_obj):
+        """True if a date has a task or a recurring task."""
+        return bool(self.tasks_for(date_obj) or self.occurrences_for(date_obj))
+
+    def tasks_with_occurrences(self, years, table=None):
+        """
+        Return a TaskTable (tasks, or the given table) with the recurring
+        tasks of the given years merged in; see merge_occurrences().
+        """
+        return merge_occurrences(self.tasks if table is None else table, self.recurrences, years)
+
+    def snapshot(self):
+        """
+        Return a TaskSnapshot of the tasks and rules, for rendering on another
+        thread. Unloaded years (except archived ones) are read first, without
+        holding lock; lock is only held to copy the tables, and a snapshot
+        is reused until the generation moves on.
+        """
+        self.load_all()
+        with self.lock:
+            if self.last_snapshot is None or self.last_snapshot.generation != self.generation:
+                with span("snapshot"):
+                    self.last_snapshot = TaskSnapshot(self)
+            return self.last_snapshot
+
+    def search(self, query, limit=SEARCH_RESULT_LIMIT):
+        """Return SearchResults for query, best match first. Archived years are left to search_archived()."""
+        self.load_all()
+        with span("search.query"):
+            return self.index.search(query, self.tasks, limit)
+
+    def search_archived(self, query, limit=SEARCH_RESULT_LIMIT):
+        """
+        Return SearchResults for query in the archived years that aren't
+        loaded, from an index built for this search alone. Every archive is
+        decompressed, so the planner runs it on a worker thread (ArchiveSearch).
+        """
+        table = self.read_archived()
+        if not table:
+            return []
+        index = build_index(table)
+        with span("search.archived"):
+            return index.search(query, table, limit)
+
+    @locked
+    def add(self, date_obj, task):
+        """Add a task to a date and return the stored text."""
+        task = task.strip()
+        if not task:
+            raise TaskStoreError("Please enter a task.")
+        if self.unloaded_years:
+            self.load_years((date_obj.year,))
+        ordinal = date_obj.toordinal()
+        self.tasks.append(ordinal, task)
+        self.record("add", ordinal, task)
+        return task
+
+    @locked
+    def delete(self, date_obj, task_no):
+        """Delete task number task_no (1-based) from a date and return it."""
+        ordinal = date_obj.toordinal()
+        tasks = self.tasks_for(date_obj)
+        if not tasks:
+            raise NoTasksError("There are no tasks to delete for the selected date.")
+        if not 1 <= task_no <= len(tasks):
+            raise TaskNumberError("Please enter a valid task number.")
+        removed_task = tasks.pop(task_no - 1)
+        if not tasks:
+            self.tasks.remove_day(ordinal)
+        self.record("delete", ordinal, task_no - 1)
+        return removed_task
+
+    @locked
+    def add_recurring(self, start, text, freq, interval=1, weekdays=None, until=None):
+        """
+        Add a recurring task starting on start and return its RecurrenceRule.
+        Weekly rules repeat on start's weekday unless weekdays is given.
+        """
+        text = text.strip()
+        if not text:
+            raise TaskStoreError("Please enter a task.")
+        if freq not in FREQUENCIES:
+            raise TaskStoreError(f"Unknown repeat frequency: {freq}")
+        if interval < 1:
+            raise TaskStoreError("The repeat interval must be at least 1.")
+        if until is not None and until < start:
+            raise TaskStoreError("A recurring task can't end before it starts.")
+        if freq == "weekly" and not weekdays:
+            weekdays = (start.weekday(),)
+        rule = RecurrenceRule(
+            self.recurrences.next_id(), text, freq, start, until, interval,
+            tuple(sorted(set(weekdays))) if freq == "weekly" else ()
+        )
+        self.recurrences.add(rule)
+        self.changed_all()
+        self.save_rules()
+        count("tasks.add_recurring")
+        return rule
+
+    @locked
+    def remove_recurring(self, rule_id):
+        """Delete a recurring task (every occurrence) and return its rule."""
+        try:
+            rule = self.recurrences.remove(rule_id)
+        except KeyError:
+            raise TaskNumberError("There is no recurring task with that number.")
+        self.changed_all()
+        self.save_rules()
+        count("tasks.remove_recurring")
+        return rule
+
+    def save_rules(self):
+        """Write all recurrence rules through the storage backend."""
+        rules = [rule_to_dict(self.recurrences.rules[rule_id]) for rule_id in sorted(self.recurrences.rules)]
+        with span("save.rules"):
+            self.storage.save_rules(rules)
+
+    @locked
+    def clear(self, date_obj):
+        """Delete all tasks of a date and return how many were removed."""
+        ordinal = date_obj.toordinal()
+        tasks = self.tasks_for(date_obj)
+        if not tasks:
+            raise NoTasksError("There are no tasks to clear for the selected date.")
+        self.tasks.remove_day(ordinal)
+        self.record("clear", ordinal)
+        return len(tasks)
+
+    @locked
+    def set_days(self, days):
+        """
+        Replace the tasks of several dates ({date ordinal: [tasks]}, an empty
+        list clears the date) as one batch, persisted in a single write.
+        The years of the dates must be loaded. Returns the dates, in order.
+        """
+        self.tasks.set_days(days)
+        self.changed_dates(days)
+        count("tasks.batch_days", len(days))
+        self.commit(days)
+        return [date.fromordinal(ordinal) for ordinal in sorted(days)]
+
+    def add_to_dates(self, dates, task):
+        """Add a task to each of dates in one batch and return the dates."""
+        task = task.strip()
+        if not task:
+            raise TaskStoreError("Please enter a task.")
+        ordinals = {date_obj.toordinal() for date_obj in dates}
+        if not ordinals:
+            raise TaskStoreError("There are no dates to add the task to.")
+        self.load_dates(ordinals)
+        return self.set_days({ordinal: list(self.tasks.get(ordinal)) + [task] for ordinal in ordinals})
+
+    def clear_range(self, first, last):
+        """
+        Delete every task from first to last (inclusive) in one batch.
+        Returns (number of tasks removed, dates cleared).
+        """
+        if self.unloaded_years:
+            self.load_years(range(first.year, last.year + 1))
+        first_ordinal, last_ordinal = first.toordinal(), last.toordinal()
+        removed = self.tasks.task_count(first_ordinal, last_ordinal)
+        if not removed:
+            raise NoTasksError("There are no tasks to clear in that range.")
+        return removed, self.set_days({ordinal: [] for ordinal, _ in self.tasks.range(first_ordinal, last_ordinal)})
+
+    def copy_tasks(self, source, target, move=False):
+        """
+        Append all tasks of the source date to the target date, removing them
+        from source if move, in one batch. Returns the dates changed.
+        """
+        if source == target:
+            raise TaskStoreError("Choose a different date to move or copy the tasks to.")
+        source_ordinal, target_ordinal = source.toordinal(), target.toordinal()
+        self.load_dates((source_ordinal, target_ordinal))
+        tasks = self.tasks.get(source_ordinal)
+        if not tasks:
+            raise NoTasksError("There are no tasks to move or copy for the selected date.")
+        days = {target_ordinal: list(self.tasks.get(target_ordinal)) + list(tasks)}
+        if move:
+            days[source_ordinal] = []
+        return self.set_days(days)
+
+    def move_tasks(self, source, target):
+        """Move all tasks of the source date to the target date; returns the dates changed."""
+        return self.copy_tasks(source, target, move=True)
@@ -0,0 +1,116 @@
+"""
+Helpers for running several Year Planner instances on the same files.
+
+FileLock is an advisory lock on a lock file next to tasks.json. Every
+instance takes it around its writes, so two instances never append to the
+journal or rewrite the snapshot at the same time. merge_task_lists() is the
+three-way merge applied to a date when its tasks changed both here and in
+another instance.
+"""
+import os
+import threading
+import time
+from collections import Counter
+
+LOCK_TIMEOUT = 10.0  # Seconds to wait for another instance before giving up
+LOCK_RETRY_INTERVAL = 0.05
+
+if os.name == "nt":
+    import msvcrt
+
+    def try_lock_file(f):
+        try:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def try_lock_file(f):
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def unlock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+class FileLock:
+    """
+    Exclusive advisory lock on path, held by one thread of one process at a
+    time. Use it as a context manager. Raises TimeoutError if the lock
+    can't be taken within timeout seconds.
+    """
+
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self.thread_lock = threading.Lock()  # OS file locks don't exclude threads of the same process
+        self.file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def acquire(self):
+        if not self.thread_lock.acquire(timeout=self.timeout):
+            raise TimeoutError(f"Timed out waiting for {self.path}")
+        try:
+            if self.file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self.file = open(self.path, 'a+')
+            deadline = time.monotonic() + self.timeout
+            while not try_lock_file(self.file):
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Timed out waiting for {self.path}; another Year Planner is still writing.")
+                time.sleep(LOCK_RETRY_INTERVAL)
+        except BaseException:
+            self.thread_lock.release()
+            raise
+
+    def release(self):
+        try:
+            unlock_file(self.file)
+        finally:
+            self.thread_lock.release()
+
+    def close(self):
+        """Close the lock file."""
+        with self.thread_lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+def merge_task_lists(base, ours, theirs):
+    """
+    Three-way merge of one date's tasks. base is the list both sides started
+    from, ours and theirs are the two edited lists (all tuples).
+    A task removed on either side is removed, a task added on either side is
+    added (once if both sides added it). Remaining tasks keep their order,
+    followed by our additions and then theirs.
+    """
+    if ours == theirs or theirs == base:
+        return ours
+    if ours == base:
+        return theirs
+    base_counts = Counter(base)
+    kept = base_counts & Counter(ours) & Counter(theirs)
+    ours_added = Counter(ours) - base_counts
+    theirs_added = Counter(theirs) - base_counts - ours_added
+    merged = []
+    for counts, tasks in ((kept, base), (ours_added, ours), (theirs_added, theirs)):
+        for task in tasks:
+            if counts[task] > 0:
+                merged.append(task)
+                counts[task] -= 1
+    return tuple(merged)
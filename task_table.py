@@ -0,0 +1,185 @@
+"""
+In-memory table of the planner's tasks, keyed by date ordinal.
+
+TaskTable maps date.toordinal() to the list of task strings of that date
+and keeps the ordinals that have tasks in a sorted list, so a month or a
+year is a binary search plus a slice. The nested year -> month -> day
+string layout of tasks.json is only used when reading and writing JSON
+(from_nested() and to_nested()).
+"""
+import calendar
+import logging
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+ORDINAL_MIN = date.min.toordinal()
+ORDINAL_MAX = date.max.toordinal()
+RESORT_THRESHOLD = 64  # Above this many new dates, re-sort the ordinals instead of inserting each
+
+def month_bounds(year, month):
+    """Return the first and last ordinal of a month."""
+    first = date(year, month, 1).toordinal()
+    return first, first + calendar.monthrange(year, month)[1] - 1
+
+def year_bounds(year):
+    """Return the first and last ordinal of a year."""
+    return date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal()
+
+def date_string(ordinal):
+    """Return the "Y-M-D" date string (no zero padding) used by the journal."""
+    date_obj = date.fromordinal(ordinal)
+    return f"{date_obj.year}-{date_obj.month}-{date_obj.day}"
+
+def validate_days(days):
+    """Validate a {date ordinal: [task strings]} dict."""
+    if not isinstance(days, dict):
+        return False
+    for ordinal, tasks in days.items():
+        if not isinstance(ordinal, int) or not ORDINAL_MIN <= ordinal <= ORDINAL_MAX:
+            return False
+        if not isinstance(tasks, list) or not all(isinstance(task, str) for task in tasks):
+            return False
+    return True
+
+class TaskTable:
+    """
+    Tasks by date ordinal. days maps an ordinal to its non-empty task list;
+    ordinals holds the same ordinals in ascending order.
+    """
+    __slots__ = ("days", "ordinals")
+
+    def __init__(self, days=None):
+        self.days = days if days is not None else {}
+        self.ordinals = sorted(self.days)
+
+    @classmethod
+    def from_nested(cls, data):
+        """
+        Build a table from the nested tasks.json layout.
+        Dates that don't exist (e.g. February 30) are skipped with a warning.
+        """
+        days = {}
+        skipped = 0
+        for year, months in data.items():
+            for month, month_days in months.items():
+                for day, tasks in month_days.items():
+                    if not tasks:
+                        continue
+                    try:
+                        ordinal = date(int(year), int(month), int(day)).toordinal()
+                    except ValueError:
+                        skipped += len(tasks)
+                        continue
+                    days[ordinal] = tasks
+        if skipped:
+            logger.warning("Skipped %d task(s) on dates that don't exist.", skipped)
+        return cls(days)
+
+    def to_nested(self):
+        """Return the nested tasks.json layout; task lists are shared, not copied."""
+        data = {}
+        for ordinal in self.ordinals:
+            date_obj = date.fromordinal(ordinal)
+            data.setdefault(str(date_obj.year), {}).setdefault(str(date_obj.month), {})[str(date_obj.day)] = self.days[ordinal]
+        return data
+
+    def copy(self):
+        """Return a table with its own dict and ordinals but the same task lists."""
+        table = TaskTable.__new__(TaskTable)
+        table.days = dict(self.days)
+        table.ordinals = list(self.ordinals)
+        return table
+
+    def __len__(self):
+        """Number of dates with tasks."""
+        return len(self.ordinals)
+
+    def get(self, ordinal):
+        """Return the task list of a date, or an empty tuple."""
+        return self.days.get(ordinal, ())
+
+    def append(self, ordinal, task):
+        tasks = self.days.get(ordinal)
+        if tasks is None:
+            self.days[ordinal] = [task]
+            insort(self.ordinals, ordinal)
+        else:
+            tasks.append(task)
+
+    def set_day(self, ordinal, tasks):
+        """Replace the tasks of a date; an empty list removes the date."""
+        if not tasks:
+            self.remove_day(ordinal)
+        elif ordinal in self.days:
+            self.days[ordinal] = tasks
+        else:
+            self.days[ordinal] = tasks
+            insort(self.ordinals, ordinal)
+
+    def set_days(self, days):
+        """Replace the tasks of several dates ({ordinal: tasks}); empty lists remove dates."""
+        if len(days) <= RESORT_THRESHOLD:
+            for ordinal, tasks in days.items():
+                self.set_day(ordinal, tasks)
+            return
+        for ordinal, tasks in days.items():
+            if tasks:
+                self.days[ordinal] = tasks
+            else:
+                self.days.pop(ordinal, None)
+        self.ordinals = sorted(self.days)
+
+    def remove_day(self, ordinal):
+        if self.days.pop(ordinal, None) is not None:
+            del self.ordinals[bisect_left(self.ordinals, ordinal)]
+
+    def extend_days(self, days):
+        """Append the tasks of a {ordinal: [tasks]} dict, date by date."""
+        new = [ordinal for ordinal in days if ordinal not in self.days]
+        for ordinal, tasks in days.items():
+            if tasks:
+                self.days.setdefault(ordinal, []).extend(tasks)
+        if len(new) > RESORT_THRESHOLD:
+            self.ordinals = sorted(self.days)
+        else:
+            for ordinal in new:
+                if ordinal in self.days:
+                    insort(self.ordinals, ordinal)
+
+    def range(self, first, last):
+        """Yield (ordinal, tasks) for the dates from first to last, in order."""
+        ordinals = self.ordinals
+        days = self.days
+        for i in range(bisect_left(ordinals, first), bisect_right(ordinals, last)):
+            yield ordinals[i], days[ordinals[i]]
+
+    def items(self):
+        """Yield (ordinal, tasks) for every date, in order."""
+        days = self.days
+        for ordinal in self.ordinals:
+            yield ordinal, days[ordinal]
+
+    def days_in_month(self, year, month):
+        """Return the day numbers of a month that have tasks."""
+        first, last = month_bounds(year, month)
+        ordinals = self.ordinals
+        return [ordinal - first + 1 for ordinal in ordinals[bisect_left(ordinals, first):bisect_right(ordinals, last)]]
+
+    def years(self):
+        """Return the years that have tasks, ascending."""
+        years = []
+        ordinals = self.ordinals
+        i = 0
+        while i < len(ordinals):
+            year = date.fromordinal(ordinals[i]).year
+            years.append(year)
+            if year == date.max.year:
+                break
+            i = bisect_left(ordinals, date(year + 1, 1, 1).toordinal(), i)
+        return years
+
+    def task_count(self, first=ORDINAL_MIN, last=ORDINAL_MAX):
+        """Number of tasks on the dates from first to last."""
+        return sum(len(tasks) for _, tasks in self.range(first, last))
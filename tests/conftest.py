@@ -0,0 +1,25 @@
+"""Setup shared by the tests. Run them with python -m pytest from the repository root."""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# The planner keeps its files under the home folder and creates its icon there
+# when imported, so point the home folder at a scratch one before anything
+# is imported
+HOME = tempfile.mkdtemp(prefix="year_planner_tests_")
+os.environ["HOME"] = os.environ["USERPROFILE"] = HOME
+atexit.register(shutil.rmtree, HOME, True)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import task_store
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """A temporary folder standing in for the application data directory."""
+    monkeypatch.setattr(task_store, "APP_DATA_DIR", str(tmp_path))
+    return tmp_path
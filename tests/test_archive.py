@@ -0,0 +1,181 @@
+"""Archiving past years of ShardedStorage into compressed files and reading them back."""
+import os
+from datetime import date
+
+import pytest
+
+import task_archive
+from task_html import TaskOverview
+from task_store import ShardedStorage, TaskStore
+
+THIS_YEAR = date.today().year
+OLD_YEARS = (THIS_YEAR - 4, THIS_YEAR - 3)
+
+@pytest.fixture
+def make_store(data_dir):
+    def make(archive_keep_years=1, archive_format="xz"):
+        storage = ShardedStorage(str(data_dir / "tasks"), str(data_dir / "tasks.json"),
+                                 archive_dir=str(data_dir / "archive"), archive_keep_years=archive_keep_years,
+                                 archive_format=archive_format)
+        return TaskStore(storage)
+    return make
+
+def fill(store):
+    store.load([])
+    for year in OLD_YEARS + (THIS_YEAR,):
+        store.add(date(year, 3, 1), f"meeting {year}")
+
+@pytest.fixture
+def archived(make_store, data_dir):
+    """A planner with a meeting in each of two archived years and in the current year."""
+    store = make_store()
+    fill(store)
+    store.archive_past_years()
+    store.close()
+    return data_dir
+
+def listing(path):
+    return sorted(os.listdir(path)) if os.path.isdir(path) else []
+
+def test_close_does_not_archive(make_store, data_dir):
+    store = make_store()
+    fill(store)
+    store.close()
+    assert listing(data_dir / "archive") == []
+    store = make_store()
+    store.load([])
+    assert store.archive_past_years(3) == [OLD_YEARS[0]]
+    store.close()
+    assert listing(data_dir / "archive") == [f"{OLD_YEARS[0]}.json.xz"]
+
+@pytest.mark.parametrize("archive_format", ["xz", "gz"])
+def test_archiving_moves_past_years_out_of_the_year_files(make_store, data_dir, archive_format):
+    store = make_store(archive_format=archive_format)
+    fill(store)
+    store.archive_past_years()
+    store.close()
+    assert listing(data_dir / "archive") == [f"{year}.json.{archive_format}" for year in OLD_YEARS]
+    # Lock files included
+    assert not any(name.startswith(tuple(map(str, OLD_YEARS))) for name in listing(data_dir / "tasks"))
+    store = make_store(archive_format=archive_format)
+    store.load([THIS_YEAR])
+    assert store.tasks.years() == [THIS_YEAR]
+    assert store.unloaded_years == set(OLD_YEARS)
+    assert store.tasks_for(date(OLD_YEARS[0], 3, 1)) == [f"meeting {OLD_YEARS[0]}"]
+    assert store.tasks.years() == [OLD_YEARS[0], THIS_YEAR]
+    store.close()
+
+def test_a_negative_keep_turns_archiving_off(make_store, data_dir):
+    store = make_store(archive_keep_years=-1)
+    fill(store)
+    store.archive_past_years()
+    store.close()
+    assert listing(data_dir / "archive") == []
+
+def test_an_edited_archived_year_moves_back(make_store, data_dir):
+    store = make_store()
+    fill(store)
+    store.archive_past_years()
+    store.close()
+    store = make_store(archive_keep_years=-1)
+    store.load([THIS_YEAR])
+    store.add(date(OLD_YEARS[1], 3, 2), "edit")
+    store.save()
+    assert listing(data_dir / "archive") == [f"{OLD_YEARS[0]}.json.xz"]
+    store.close()
+    store = make_store(archive_keep_years=-1)
+    store.load([OLD_YEARS[1]])
+    assert store.tasks_for(date(OLD_YEARS[1], 3, 1)) == [f"meeting {OLD_YEARS[1]}"]
+    assert store.tasks_for(date(OLD_YEARS[1], 3, 2)) == ["edit"]
+    store.close()
+
+def test_search_reads_archives_only_when_asked(make_store, archived):
+    store = make_store()
+    store.load([THIS_YEAR])
+    assert store.archived_years() == set(OLD_YEARS)
+    assert [result.date.year for result in store.search("meeting")] == [THIS_YEAR]
+    assert sorted(result.date.year for result in store.search_archived("meeting")) == list(OLD_YEARS)
+    assert store.tasks.years() == [THIS_YEAR]
+    assert store.unloaded_years == set(OLD_YEARS)
+    store.close()
+
+def test_overview_and_export_include_archived_years_without_loading_them(make_store, archived):
+    store = make_store()
+    store.load([THIS_YEAR])
+    assert store.all_tasks().years() == list(OLD_YEARS) + [THIS_YEAR]
+    page = "".join(TaskOverview(store).iter_page(THIS_YEAR))
+    assert all(f"meeting {year}" in page for year in OLD_YEARS)
+    assert store.tasks.years() == [THIS_YEAR]
+    assert store.read_archived([OLD_YEARS[1]]).years() == [OLD_YEARS[1]]
+    store.close()
+
+def test_only_an_edited_archived_year_moves_back(make_store, archived):
+    store = make_store()
+    store.load([THIS_YEAR])
+    store.tasks_for(date(OLD_YEARS[0], 3, 1))  # Shown, so loaded
+    store.tasks_for(date(OLD_YEARS[1], 3, 1))
+    store.save()
+    assert listing(archived / "archive") == [f"{year}.json.xz" for year in OLD_YEARS]
+    store.add(date(OLD_YEARS[1], 3, 2), "edit")
+    store.save()
+    assert listing(archived / "archive") == [f"{OLD_YEARS[0]}.json.xz"]
+    store.close()
+    store = make_store()
+    store.load([OLD_YEARS[1]])
+    assert store.tasks_for(date(OLD_YEARS[1], 3, 2)) == ["edit"]
+    store.close()
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Years decoded from their archive files, in order."""
+    decoded = []
+    read_tasks_json = task_archive.read_tasks_json
+
+    def counting(f, quarantine=None):
+        data = read_tasks_json(f, quarantine)
+        decoded.extend(int(year) for year in data)
+        return data
+    monkeypatch.setattr(task_archive, "read_tasks_json", counting)
+    return decoded
+
+def test_an_archive_is_decoded_again_only_after_its_file_changed(make_store, archived, decodes):
+    store = make_store()
+    store.load([THIS_YEAR])
+    assert store.all_tasks().years() == list(OLD_YEARS) + [THIS_YEAR]
+    assert sorted(decodes) == list(OLD_YEARS)
+    store.add(date(THIS_YEAR, 3, 2), "new")
+    page = "".join(TaskOverview(store).iter_page())
+    assert all(f"meeting {year}" in page for year in OLD_YEARS)
+    assert sorted(decodes) == list(OLD_YEARS)
+    # Copies are handed out, so a caller can't change the cached year
+    store.read_archived([OLD_YEARS[0]]).get(date(OLD_YEARS[0], 3, 1).toordinal()).append("changed")
+    assert store.read_archived([OLD_YEARS[0]]).get(date(OLD_YEARS[0], 3, 1).toordinal()) == [f"meeting {OLD_YEARS[0]}"]
+    store.storage.archive.write(OLD_YEARS[0], {str(OLD_YEARS[0]): {"3": {"1": ["rewritten"]}}})
+    assert store.read_archived([OLD_YEARS[0]]).get(date(OLD_YEARS[0], 3, 1).toordinal()) == ["rewritten"]
+    assert sorted(decodes) == [OLD_YEARS[0], OLD_YEARS[0], OLD_YEARS[1]]
+    store.close()
+
+def test_a_year_page_reads_only_its_own_archive(make_store, archived, decodes):
+    store = make_store()
+    store.load([THIS_YEAR])
+    page = "".join(TaskOverview(store).iter_year_page(OLD_YEARS[1]))
+    assert f"meeting {OLD_YEARS[1]}" in page
+    assert decodes == [OLD_YEARS[1]]
+    page = "".join(TaskOverview(store).iter_year_page(THIS_YEAR, store.snapshot()))
+    assert f"meeting {THIS_YEAR}" in page
+    assert decodes == [OLD_YEARS[1]]
+    assert store.unloaded_years == set(OLD_YEARS)
+    store.close()
+
+def test_the_archive_button_archives(make_store, data_dir, monkeypatch):
+    import year_planner
+    store = make_store()
+    fill(store)
+    shown = []
+    monkeypatch.setattr(year_planner, "store", store)
+    monkeypatch.setattr(year_planner.messagebox, "showinfo", lambda title, message: shown.append(message))
+    year_planner.archive_past_years()
+    year_planner.archive_past_years()
+    assert shown == [f"Archived {OLD_YEARS[0]}, {OLD_YEARS[1]}.", "No years to archive."]
+    assert listing(data_dir / "archive") == [f"{year}.json.xz" for year in OLD_YEARS]
+    store.close()
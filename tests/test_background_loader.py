@@ -0,0 +1,85 @@
+"""Loading tasks on a worker thread: BackgroundLoader, install()/install_index() and queued widget actions."""
+from datetime import date
+
+import pytest
+
+import year_planner
+from task_store import BackgroundLoader, JsonStorage, TaskStore
+
+DAY = date(2026, 3, 1)
+
+@pytest.fixture
+def tasks_file(data_dir):
+    store = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    store.load()
+    store.add(DAY, "dentist appointment")
+    store.add(date(2026, 3, 2), "buy milk")
+    store.add_recurring(DAY, "gym", "weekly")
+    store.close()
+    return str(data_dir / "tasks.json")
+
+def results(loader):
+    loader.join(10)
+    items = []
+    while not loader.results.empty():
+        items.append(loader.results.get_nowait())
+    return items
+
+def test_tasks_arrive_before_the_index(tasks_file):
+    store = TaskStore(JsonStorage(tasks_file))
+    (kind, loaded), (index_kind, index) = results(BackgroundLoader(store))
+    assert (kind, index_kind) == ("tasks", "index")
+    # Reading leaves the store alone until the owner installs the result
+    assert len(store.tasks) == 0
+    store.install(loaded)
+    assert store.tasks_for(DAY) == ["dentist appointment"]
+    assert [rule.text for rule in store.occurrences_for(date(2026, 3, 8))] == ["gym"]
+    assert not store.index_ready
+    assert store.search("dentist") == []
+    store.install_index(index)
+    assert store.index_ready
+    assert [result.task for result in store.search("dentist")] == ["dentist appointment"]
+    store.close()
+
+def test_edits_made_before_the_index_arrives_are_indexed(tasks_file):
+    store = TaskStore(JsonStorage(tasks_file))
+    (_, loaded), (_, index) = results(BackgroundLoader(store))
+    store.install(loaded)
+    store.add(DAY, "dentist follow-up")
+    store.delete(date(2026, 3, 2), 1)
+    store.install_index(index)
+    assert sorted(result.task for result in store.search("dentist")) == ["dentist appointment", "dentist follow-up"]
+    assert store.search("milk") == []
+    store.close()
+
+def test_a_failed_read_is_reported(tasks_file):
+    class FailingStorage(JsonStorage):
+        def load(self, years=None):
+            raise OSError("disk gone")
+
+    store = TaskStore(FailingStorage(tasks_file))
+    [(kind, error)] = results(BackgroundLoader(store))
+    assert kind == "error" and str(error) == "disk gone"
+
+class FakeVar:
+    def __init__(self):
+        self.value = ""
+
+    def set(self, value):
+        self.value = value
+
+def test_actions_wait_for_the_tasks(monkeypatch):
+    calls = []
+    action = year_planner.when_loaded(lambda *args: calls.append(args))
+    monkeypatch.setattr(year_planner, "loading_var", FakeVar(), raising=False)
+    monkeypatch.setattr(year_planner, "pending_actions", [])
+    monkeypatch.setattr(year_planner, "startup_loader", object())
+    action(1)
+    action(2)
+    assert calls == []
+    assert year_planner.loading_var.value == "Loading tasks... (2 action(s) waiting)"
+    monkeypatch.setattr(year_planner, "startup_loader", None)
+    year_planner.run_pending_actions()
+    assert calls == [(1,), (2,)]
+    action(3)
+    assert calls == [(1,), (2,), (3,)]
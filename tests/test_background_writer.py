@@ -0,0 +1,161 @@
+"""BackgroundWriter batches queued edits and writes them on a worker thread."""
+import threading
+import time
+from datetime import date
+
+import pytest
+
+import year_planner
+from task_store import BackgroundWriter, JsonStorage, TaskChange, TaskStore
+
+class RecordingStorage:
+    """Keeps every written batch; fails while fail is set."""
+
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+        self.written = threading.Event()
+
+    def write_changes(self, changes):
+        if self.fail:
+            raise OSError("disk full")
+        self.batches.append(list(changes))
+        self.written.set()
+
+def change(day):
+    return TaskChange("add", date(2026, 1, day).toordinal(), "t", ("t",), ())
+
+@pytest.fixture
+def storage():
+    return RecordingStorage()
+
+def test_a_burst_is_written_as_one_batch(storage):
+    writer = BackgroundWriter(storage, quiet_period=0.05, max_delay=5)
+    for day in range(1, 6):
+        writer.submit(change(day))
+    assert writer.dirty
+    assert storage.written.wait(2)
+    writer.close()
+    assert [len(batch) for batch in storage.batches] == [5]
+    assert not writer.dirty
+
+def test_max_delay_caps_a_steady_stream(storage):
+    writer = BackgroundWriter(storage, quiet_period=0.2, max_delay=0.1)
+    deadline = time.monotonic() + 2
+    day = 0
+    while not storage.batches and time.monotonic() < deadline:
+        day += 1
+        writer.submit(change(day))
+        time.sleep(0.02)
+    # Edits never paused for the quiet period, yet a batch went out
+    assert storage.batches
+    writer.close()
+    assert sum(len(batch) for batch in storage.batches) == day
+
+def test_flush_writes_right_away(storage):
+    writer = BackgroundWriter(storage, quiet_period=60, max_delay=60)
+    writer.submit(change(1))
+    writer.flush()
+    assert storage.batches == [[change(1)]]
+    assert not writer.dirty
+    writer.close()
+
+def test_a_failed_batch_is_kept_and_retried(storage):
+    errors = []
+    writer = BackgroundWriter(storage, on_error=errors.append, quiet_period=60, max_delay=60)
+    storage.fail = True
+    writer.submit(change(1))
+    with pytest.raises(OSError):
+        writer.flush()
+    assert writer.dirty
+    # on_error runs on the worker after flush() was woken up
+    deadline = time.monotonic() + 5
+    while not errors and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [str(e) for e in errors] == ["disk full"]
+    storage.fail = False
+    writer.submit(change(2))
+    writer.flush()
+    # The failed change goes out first, in front of the newer one
+    assert storage.batches == [[change(1), change(2)]]
+    writer.close()
+
+def test_changes_are_written_in_place_once_the_worker_stopped(storage):
+    errors = []
+    writer = BackgroundWriter(storage, on_error=errors.append, quiet_period=60, max_delay=60)
+
+    def broken(now):
+        raise RuntimeError("worker bug")
+    writer.seconds_until_due = broken
+    writer.submit(change(1))
+    writer.thread.join(5)
+    assert writer.stopped and [str(e) for e in errors] == ["worker bug"]
+    assert writer.dirty
+    writer.flush()
+    assert storage.batches == [[change(1)]]
+    writer.submit(change(2))
+    assert storage.batches == [[change(1)], [change(2)]]
+    storage.fail = True
+    writer.submit(change(3))
+    assert [str(e) for e in errors] == ["worker bug", "disk full"]
+    with pytest.raises(OSError):
+        writer.flush()
+    assert writer.dirty
+    storage.fail = False
+    writer.flush()
+    assert storage.batches[-1] == [change(3)] and not writer.dirty
+
+class FakeVar:
+    def __init__(self):
+        self.value = ""
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+def test_a_save_error_stays_on_the_status_line_until_the_edits_are_written(monkeypatch, storage):
+    writer = BackgroundWriter(storage, quiet_period=60, max_delay=60)
+    store = TaskStore(storage)
+    store.writer = writer
+    shown = []
+    monkeypatch.setattr(year_planner, "store", store)
+    monkeypatch.setattr(year_planner, "save_error_shown", False)
+    monkeypatch.setattr(year_planner, "loading_var", FakeVar(), raising=False)
+    monkeypatch.setattr(year_planner, "gui", type("FakeGui", (), {"after": lambda self, ms, f: None})(), raising=False)
+    monkeypatch.setattr(year_planner.messagebox, "showerror", lambda title, message: shown.append(message))
+    storage.fail = True
+    writer.submit(change(1))
+    with pytest.raises(OSError) as raised:
+        writer.flush()
+    year_planner.save_errors.put(raised.value)
+    year_planner.poll_save_errors()
+    assert year_planner.loading_var.value == "Edits not saved: disk full" and len(shown) == 1
+    year_planner.poll_save_errors()
+    assert year_planner.loading_var.value == "Edits not saved: disk full"
+    storage.fail = False
+    writer.flush()
+    year_planner.poll_save_errors()
+    assert year_planner.loading_var.value == "" and not year_planner.save_error_shown
+    writer.close()
+
+def test_close_flushes_queued_changes(storage):
+    writer = BackgroundWriter(storage, quiet_period=60, max_delay=60)
+    writer.submit(change(1))
+    writer.close()
+    assert storage.batches == [[change(1)]]
+    assert not writer.thread.is_alive()
+
+def test_store_edits_go_through_the_writer(data_dir):
+    store = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    store.load()
+    store.start_writer()
+    store.add(date(2026, 1, 1), "queued")
+    store.add(date(2026, 1, 1), "too")
+    store.flush()
+    assert not store.dirty
+    store.close()
+    reloaded = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    assert reloaded.load().to_nested() == {"2026": {"1": {"1": ["queued", "too"]}}}
+    reloaded.close()
@@ -0,0 +1,81 @@
+"""Batch edits: adding to many dates, clearing a range, and moving or copying a date's tasks."""
+from datetime import date, timedelta
+
+import pytest
+
+from task_store import JsonStorage, NoTasksError, ShardedStorage, TaskStore, TaskStoreError
+from task_table import TaskTable
+
+class CountingStorage(JsonStorage):
+    """A JsonStorage that counts its write_changes calls."""
+
+    def __init__(self, tasks_file):
+        super().__init__(tasks_file)
+        self.batches = []
+
+    def write_changes(self, changes):
+        self.batches.append(len(changes))
+        super().write_changes(changes)
+
+@pytest.fixture
+def store(data_dir):
+    store = TaskStore(CountingStorage(str(data_dir / "tasks.json")))
+    store.load()
+    yield store
+    store.close()
+
+def test_add_to_dates_is_one_batch(store):
+    store.add(date(2026, 1, 2), "existing")
+    dates = [date(2026, 1, 1) + timedelta(days=offset) for offset in range(100)]
+    assert store.add_to_dates(dates, " standup ") == dates
+    assert store.storage.batches == [1, 100]
+    assert store.tasks_for(date(2026, 1, 2)) == ["existing", "standup"]
+    assert store.tasks.task_count() == 101
+    assert len(store.search("standup", limit=200)) == 100
+    reloaded = JsonStorage(store.storage.tasks_file).load()
+    assert reloaded.days == store.tasks.days
+
+def test_clear_range(store):
+    for day in (1, 15, 31):
+        store.add(date(2026, 3, day), f"march {day}")
+    store.add(date(2026, 4, 1), "april")
+    removed, cleared = store.clear_range(date(2026, 3, 1), date(2026, 3, 31))
+    assert (removed, cleared) == (3, [date(2026, 3, 1), date(2026, 3, 15), date(2026, 3, 31)])
+    assert store.days_with_tasks(2026, 3) == []
+    assert store.tasks_for(date(2026, 4, 1)) == ["april"]
+    with pytest.raises(NoTasksError):
+        store.clear_range(date(2026, 3, 1), date(2026, 3, 31))
+
+def test_copy_and_move(store):
+    store.add(date(2026, 5, 1), "a")
+    store.add(date(2026, 5, 1), "b")
+    store.add(date(2026, 5, 2), "c")
+    store.copy_tasks(date(2026, 5, 1), date(2026, 5, 2))
+    assert store.tasks_for(date(2026, 5, 2)) == ["c", "a", "b"]
+    assert store.move_tasks(date(2026, 5, 1), date(2026, 5, 3)) == [date(2026, 5, 1), date(2026, 5, 3)]
+    assert store.tasks_for(date(2026, 5, 1)) == ()
+    assert store.tasks_for(date(2026, 5, 3)) == ["a", "b"]
+
+@pytest.mark.parametrize("edit, error", [
+    (lambda store: store.add_to_dates([date(2026, 1, 1)], "  "), TaskStoreError),
+    (lambda store: store.add_to_dates([], "task"), TaskStoreError),
+    (lambda store: store.copy_tasks(date(2026, 1, 1), date(2026, 1, 1)), TaskStoreError),
+    (lambda store: store.move_tasks(date(2026, 1, 1), date(2026, 1, 2)), NoTasksError),
+])
+def test_invalid_batches_raise(store, edit, error):
+    with pytest.raises(error):
+        edit(store)
+    assert store.storage.batches == []
+
+def test_batches_read_unloaded_years_first(data_dir):
+    storage = ShardedStorage(str(data_dir / "tasks"), str(data_dir / "tasks.json"))
+    storage.load()
+    storage.save(TaskTable.from_nested({"2025": {"1": {"1": ["stored"]}}, "2026": {"1": {"1": ["now"]}}}))
+    storage.close()
+    store = TaskStore(ShardedStorage(str(data_dir / "tasks"), str(data_dir / "tasks.json")))
+    store.load([2026])
+    store.add_to_dates([date(2025, 1, 1), date(2026, 1, 1)], "added")
+    store.close()
+    reloaded = TaskStore(ShardedStorage(str(data_dir / "tasks"), str(data_dir / "tasks.json")))
+    assert reloaded.load().to_nested() == {"2025": {"1": {"1": ["stored", "added"]}}, "2026": {"1": {"1": ["now", "added"]}}}
+    reloaded.close()
@@ -0,0 +1,48 @@
+"""The benchmark suite: reproducible datasets and a tiny end-to-end run."""
+import json
+import os
+import subprocess
+import sys
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+sys.path.insert(0, BENCH_DIR)
+
+import bench_planner  # noqa: E402
+from task_store import validate_tasks_data  # noqa: E402
+
+def task_count(data):
+    return sum(len(tasks) for months in data.values() for days in months.values() for tasks in days.values())
+
+def test_datasets_are_reproducible():
+    first = bench_planner.generate_tasks(500, seed=7)
+    assert first == bench_planner.generate_tasks(500, seed=7)
+    assert first != bench_planner.generate_tasks(500, seed=8)
+    assert task_count(first) == 500
+    assert validate_tasks_data(first)
+    assert set(first) <= {str(year) for year in range(2020, 2030)}
+
+def test_busiest_year():
+    data = {"2020": {"1": {"1": ["a"]}}, "2021": {"1": {"1": ["b"], "2": ["c"]}}}
+    assert bench_planner.busiest_year(data) == "2021"
+
+def test_tiny_run_reports_every_operation(tmp_path):
+    output = tmp_path / "results.json"
+    subprocess.run(
+        [sys.executable, os.path.join(BENCH_DIR, "bench_planner.py"), "--sizes", "200", "--repeat", "1",
+         "--output", str(output), "--workdir", str(tmp_path / "work")],
+        capture_output=True, text=True, check=True
+    )
+    with open(output) as f:
+        results = json.load(f)
+    assert results["meta"]["seed"] == bench_planner.DEFAULT_SEED
+    operations = {row["operation"]: row for row in results["results"]}
+    assert set(operations) == {
+        "load_tasks", "load_tasks_one_year", "load_archived_year", "validate_tasks_data", "lookup_tasks", "save_tasks",
+        "load_tasks_binary", "save_tasks_binary", "parse_json_load_validate", "parse_read_tasks_json",
+        "highlight_dates", "highlight_dates_one_date", "show_tasks_html", "show_tasks_html_after_edit",
+        "expand_recurrences", "range_add_clear_single", "range_add_clear_batch", "cli_add", "count_tasks_rebuild", "count_tasks_between",
+        "export_csv", "import_csv", "export_ics", "import_ics", "tasks_json_bytes", "tasks_binary_bytes",
+    }
+    assert all(row["tasks"] == 200 for row in results["results"])
+    assert operations["tasks_json_bytes"]["bytes"] > 0
+    assert operations["load_tasks"]["seconds"] >= 0
@@ -0,0 +1,108 @@
+"""The headless command-line interface."""
+import json
+import os
+import subprocess
+import sys
+from datetime import date
+
+import pytest
+
+import task_cli
+from task_store import ShardedStorage, TaskStore
+
+@pytest.fixture
+def cli(data_dir, monkeypatch, capsys):
+    """Run a CLI command against a planner in data_dir; returns (exit status, stdout, stderr)."""
+    def make_store():
+        return TaskStore(ShardedStorage(str(data_dir / "tasks"), str(data_dir / "tasks.json"),
+                                        archive_dir=str(data_dir / "archive")))
+    monkeypatch.setattr(task_cli, "TaskStore", make_store)
+
+    def run(*argv):
+        status = task_cli.main(list(argv))
+        out, err = capsys.readouterr()
+        return status, out, err
+    return run
+
+def test_add_list_delete_and_clear(cli):
+    assert cli("add", "2026-03-01", "one")[1] == "Added task 1 to 2026-03-01.\n"
+    cli("add", "2026-03-01", "two")
+    cli("add", "2026-03-02", "other")
+    assert cli("list", "2026-03-01")[1] == "[ 1 ] one\n[ 2 ] two\n"
+    assert cli("delete", "2026-03-01", "1")[1] == "Deleted task 'one' from 2026-03-01.\n"
+    status, out, _ = cli("list", "--json")
+    assert status == 0
+    assert json.loads(out) == {"2026-03-01": ["two"], "2026-03-02": ["other"]}
+    assert cli("clear", "2026-03-01", "--to", "2026-03-31")[1] == "Deleted 2 task(s) from 2026-03-01 to 2026-03-31.\n"
+    assert cli("list", "2026-03-01")[1] == "No tasks for this date.\n"
+
+def test_recurring_tasks(cli):
+    out = cli("add", "2026-03-02", "gym", "--repeat", "weekly")[1]
+    assert out.startswith("Added recurring task R1 (")
+    status, out, _ = cli("list", "2026-03-09", "--json")
+    listed = json.loads(out)
+    assert listed["tasks"] == []
+    assert [rule["task"] for rule in listed["recurring"]] == ["gym"]
+    assert cli("delete", "2026-03-09", "R1")[1] == "Deleted recurring task 'gym'.\n"
+    assert cli("list", "2026-03-09")[1] == "No tasks for this date.\n"
+
+def test_errors_exit_with_status_1(cli):
+    assert cli("add", "2026-03-01", "   ")[0] == 1
+    status, _, err = cli("delete", "2026-03-01", "3")
+    assert status == 1 and err.startswith("Error: ")
+    assert cli("list", "2026-03-01", "--from", "2026-01-01")[0] == 1
+    with pytest.raises(SystemExit):
+        cli("add", "2026-13-01", "bad date")
+
+def test_stats_and_export(cli, tmp_path):
+    cli("add", "2025-12-31", "old")
+    cli("add", "2026-01-01", "a")
+    cli("add", "2026-01-01", "b")
+    stats = json.loads(cli("stats", "--json")[1])
+    assert stats["tasks"] == 3 and stats["dates"] == 2
+    assert stats["busiest_date"] == {"date": "2026-01-01", "tasks": 2}
+    assert stats["years"] == {"2025": {"dates": 1, "tasks": 1}, "2026": {"dates": 1, "tasks": 2}}
+    assert cli("export", str(tmp_path / "out.csv"))[1].startswith("Exported 3 task(s)")
+
+def test_archive(cli, data_dir):
+    old = date.today().year - 3
+    cli("add", f"{old}-06-01", "old")
+    assert not (data_dir / "archive").exists()
+    assert cli("archive", "--keep-years", "5")[1] == "No years to archive.\n"
+    assert cli("archive")[1] == f"Archived {old}.\n"
+    assert os.listdir(data_dir / "archive") == [f"{old}.json.xz"]
+    assert json.loads(cli("list", "--json")[1]) == {f"{old}-06-01": ["old"]}
+
+@pytest.mark.parametrize("argv, command", [
+    (["list", "--json"], True),
+    ([], False),
+    (["--log-level", "DEBUG", "stats"], True),
+    (["--log", "DEBUG", "stats"], True),
+    (["--log-level=DEBUG", "stats"], True),
+    (["--metrics", "--log-level", "INFO", "add", "2026-03-01", "x"], True),
+    # An option value is not a command, nor is a command-like task text after one
+    (["--metrics", "stats"], False),
+    (["--log-level", "add"], False),
+    (["notes", "add"], False),
+])
+def test_is_cli_command(argv, command):
+    assert task_cli.is_cli_command(argv) == command
+
+def test_errors_while_closing_are_reported(cli, monkeypatch):
+    def fail():
+        raise OSError("lock timeout")
+    monkeypatch.setattr(TaskStore, "close", lambda self: fail())
+    status, out, err = cli("add", "2026-03-01", "one")
+    assert status == 1
+    assert out == "Added task 1 to 2026-03-01.\n"
+    assert err == "Error: could not close the tasks: lock timeout\n"
+
+def test_the_cli_does_not_load_the_gui(tmp_path):
+    root = os.path.dirname(task_cli.__file__)
+    code = ("import runpy, sys; sys.argv = ['year_planner.py', 'add', '2026-03-01', 'scripted']\n"
+            "try:\n    runpy.run_path('year_planner.py', run_name='__main__')\n"
+            "except SystemExit:\n    pass\n"
+            "print(sorted(m for m in ('tkinter', 'tkcalendar', 'PIL') if m in sys.modules))")
+    env = dict(os.environ, HOME=str(tmp_path), USERPROFILE=str(tmp_path))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=root, env=env)
+    assert result.stdout.splitlines() == ["Added task 1 to 2026-03-01.", "[]"]
@@ -0,0 +1,106 @@
+"""TaskCounts and its Fenwick trees against counts taken date by date, and the heat levels."""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from task_counts import HEAT_THRESHOLDS, TaskCounts, heat_level, week_start
+from task_store import JsonStorage, TaskStore
+from task_table import ORDINAL_MAX, ORDINAL_MIN, TaskTable, month_bounds
+
+FIRST, LAST = date(2023, 12, 1).toordinal(), date(2025, 1, 31).toordinal()  # 2024 is a leap year
+
+def random_table(rng, dates=300):
+    return TaskTable({rng.randint(FIRST, LAST): ["t"] * rng.randint(1, 9) for _ in range(dates)})
+
+def count_between(table, first, last):
+    return sum(len(tasks) for ordinal, tasks in table.items() if first <= ordinal <= last)
+
+def assert_counts_match(counts, table):
+    for year in (2023, 2024, 2025):
+        assert counts.year(year) == count_between(table, date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal())
+        for month in range(1, 13):
+            first, last = month_bounds(year, month)
+            assert counts.month(year, month) == count_between(table, first, last)
+            assert counts.month_days(year, month) == {
+                ordinal - first + 1: len(tasks) for ordinal, tasks in table.range(first, last)
+            }
+    for ordinal in range(FIRST, LAST + 1, 3):
+        monday = week_start(ordinal)
+        assert counts.week(ordinal) == count_between(table, monday, monday + 6)
+        assert counts.day(ordinal) == len(table.get(ordinal))
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rebuild_matches_counting_date_by_date(seed):
+    rng = random.Random(seed)
+    table = random_table(rng)
+    counts = TaskCounts()
+    counts.rebuild(table)
+    assert_counts_match(counts, table)
+    for _ in range(200):
+        first = rng.randint(FIRST - 10, LAST + 10)
+        last = first + rng.randint(0, 500)
+        assert counts.between(first, last) == count_between(table, first, last)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_updates_after_edits_match_a_rebuild(seed):
+    rng = random.Random(seed)
+    table = random_table(rng)
+    counts = TaskCounts()
+    counts.rebuild(table)
+    for _ in range(300):
+        ordinal = rng.randint(FIRST, LAST)
+        table.set_day(ordinal, ["t"] * rng.choice([0, 0, 1, 2, 5, 12]))
+        counts.update([ordinal])
+    rebuilt = TaskCounts()
+    rebuilt.rebuild(table)
+    assert_counts_match(counts, table)
+    assert counts.weeks == rebuilt.weeks
+    for year, year_counts in rebuilt.years.items():
+        assert counts.years[year].tree == year_counts.tree
+        assert counts.years[year].months == year_counts.months
+
+def test_week_across_new_year_counts_both_years():
+    table = TaskTable({date(2024, 12, 30).toordinal(): ["a"], date(2025, 1, 5).toordinal(): ["b", "c"]})
+    counts = TaskCounts()
+    counts.rebuild(table)
+    assert week_start(date(2025, 1, 1).toordinal()) == date(2024, 12, 30).toordinal()
+    assert counts.week(date(2025, 1, 1).toordinal()) == 3
+    assert counts.between(date(2024, 12, 31).toordinal(), date(2025, 1, 5).toordinal()) == 2
+
+def test_counts_at_the_ends_of_the_calendar():
+    table = TaskTable({ORDINAL_MIN: ["first"], ORDINAL_MAX: ["last", "really"]})
+    counts = TaskCounts()
+    counts.rebuild(table)
+    assert counts.between(ORDINAL_MIN, ORDINAL_MAX) == 3
+    assert counts.year(9999) == 2 and counts.month(1, 1) == 1
+
+def test_week_start_is_the_monday():
+    day = date(2026, 10, 15)
+    for offset in range(14):
+        monday = date.fromordinal(week_start((day + timedelta(days=offset)).toordinal()))
+        assert monday.weekday() == 0 and 0 <= (day + timedelta(days=offset) - monday).days < 7
+
+def test_heat_levels():
+    assert [heat_level(count) for count in range(10)] == [0, 1, 2, 2, 3, 3, 3, 3, 4, 4]
+    assert heat_level(1000) == len(HEAT_THRESHOLDS)
+
+def test_store_keeps_its_counts_in_step_with_edits(data_dir):
+    store = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    store.load()
+    day = date(2026, 3, 4)
+    for text in ("a", "b", "c"):
+        store.add(day, text)
+    store.add(date(2026, 3, 9), "next week")
+    counts = store.counts()
+    assert store.week_count(day) == 3 and store.month_count(2026, 3) == 4
+    store.delete(day, 1)
+    store.clear(date(2026, 3, 9))
+    store.add_to_dates([date(2026, 3, 5), date(2026, 4, 1)], "batch")
+    assert store.counts() is counts  # Updated, not counted again
+    assert store.day_counts(2026, 3) == {4: 2, 5: 1}
+    assert store.count_between(date(2026, 3, 1), date(2026, 4, 1)) == 4
+    rebuilt = TaskCounts()
+    rebuilt.rebuild(store.tasks)
+    assert counts.weeks == rebuilt.weeks
+    store.close()
@@ -0,0 +1,131 @@
+"""Incremental calendar highlighting, checked against stand-in calendar widgets."""
+from datetime import date
+
+import pytest
+
+import year_planner
+from task_table import TaskTable
+
+class FakeCalendar:
+    """Records the calevent calls the planner makes on a tkcalendar Calendar."""
+
+    def __init__(self):
+        self.events = {}
+        self.tags = {}
+        self.next_id = 0
+        self.created = 0
+        self.removed = 0
+        self.tag_configs = 0
+        self.refreshes = 0
+
+    def tag_config(self, tag, **options):
+        self.tag_configs += 1
+
+    def calevent_create(self, date_obj, text, tag):
+        self.next_id += 1
+        self.created += 1
+        self.events[self.next_id] = date_obj
+        self.tags[date_obj] = tag
+        return self.next_id
+
+    def calevent_remove(self, ev_id):
+        self.removed += 1
+        del self.events[ev_id]
+
+    def config(self, **options):
+        pass
+
+    def update_idletasks(self):
+        self.refreshes += 1
+
+class FakeGui:
+    def __init__(self):
+        self.idle = []
+
+    def after_idle(self, callback):
+        self.idle.append(callback)
+
+    def run_idle(self):
+        idle, self.idle = self.idle, []
+        for callback in idle:
+            callback()
+
+@pytest.fixture
+def tabs(monkeypatch):
+    tabs = {month: {'year': 2026, 'month': month, 'widget': FakeCalendar()} for month in range(1, 13)}
+    gui = FakeGui()
+    monkeypatch.setattr(year_planner, "calendar_tabs", tabs, raising=False)
+    monkeypatch.setattr(year_planner, "gui", gui, raising=False)
+    monkeypatch.setattr(year_planner, "highlight_manager", year_planner.HighlightManager())
+    monkeypatch.setattr(year_planner.store, "tasks", TaskTable.from_nested({"2026": {"1": {"5": ["a"]}, "3": {"7": ["b"], "8": ["c"]}}}))
+    return tabs, gui
+
+def set_day(date_obj, tasks):
+    """Edit the tasks of a date the way the store does, so its counts follow."""
+    year_planner.store.tasks.set_day(date_obj.toordinal(), tasks)
+    year_planner.store.changed_dates([date_obj.toordinal()])
+
+def highlighted(tabs):
+    return sorted(d for cal in tabs.values() for d in cal['widget'].events.values())
+
+def test_full_sync_highlights_dates_with_tasks(tabs):
+    tabs, gui = tabs
+    year_planner.highlight_dates()
+    assert highlighted(tabs) == [date(2026, 1, 5), date(2026, 3, 7), date(2026, 3, 8)]
+    assert all(cal['widget'].tag_configs == len(year_planner.HEAT_COLORS) for cal in tabs.values())
+    # A second full sync finds nothing to change
+    year_planner.highlight_dates()
+    assert sum(cal['widget'].created for cal in tabs.values()) == 3
+    assert all(cal['widget'].tag_configs == len(year_planner.HEAT_COLORS) for cal in tabs.values())
+
+def test_an_edit_touches_only_its_date(tabs):
+    tabs, gui = tabs
+    year_planner.highlight_dates()
+    set_day(date(2026, 3, 9), ["d"])
+    set_day(date(2026, 3, 7), [])
+    year_planner.highlight_dates([date(2026, 3, 9), date(2026, 3, 7)])
+    march = tabs[3]['widget']
+    assert sorted(march.events.values()) == [date(2026, 3, 8), date(2026, 3, 9)]
+    assert (march.created, march.removed) == (3, 1)
+    # The unchanged sibling date kept its event
+    assert tabs[1]['widget'].created == 1
+
+def test_refreshes_are_batched_into_one_idle_callback(tabs):
+    tabs, gui = tabs
+    year_planner.highlight_dates()
+    assert len(gui.idle) == 1
+    gui.run_idle()
+    assert tabs[1]['widget'].refreshes == tabs[3]['widget'].refreshes == 1
+    assert tabs[2]['widget'].refreshes == 0
+    # Nothing changed, so nothing gets refreshed
+    year_planner.highlight_dates([date(2026, 1, 5)])
+    assert gui.idle == []
+
+def test_year_change_drops_the_old_years_events(tabs):
+    tabs, gui = tabs
+    year_planner.highlight_dates()
+    set_day(date(2027, 2, 1), ["x"])
+    for cal in tabs.values():
+        cal['year'] = 2027
+    year_planner.highlight_dates()
+    assert highlighted(tabs) == [date(2027, 2, 1)]
+
+def test_dates_of_another_year_are_ignored(tabs):
+    tabs, gui = tabs
+    set_day(date(2027, 1, 5), ["x"])
+    year_planner.highlight_dates([date(2027, 1, 5)])
+    assert highlighted(tabs) == []
+
+def test_busier_dates_get_a_darker_shade(tabs):
+    tabs, gui = tabs
+    year_planner.highlight_dates()
+    march = tabs[3]['widget']
+    assert march.tags[date(2026, 3, 7)] == "task1"
+    set_day(date(2026, 3, 7), ["b"] * 5)
+    year_planner.highlight_dates([date(2026, 3, 7)])
+    assert march.tags[date(2026, 3, 7)] == "task3"
+    assert (march.created, march.removed) == (3, 1)
+    # Same shade, so the event is kept
+    set_day(date(2026, 3, 7), ["b"] * 6)
+    year_planner.highlight_dates([date(2026, 3, 7)])
+    assert (march.created, march.removed) == (3, 1)
@@ -0,0 +1,94 @@
+"""The tasks overview page is rendered in chunks and can be split into one page per year."""
+import os
+from datetime import date
+
+import pytest
+
+import task_html
+from task_html import MonthFragmentCache, TaskOverview, iter_tasks_html, write_tasks_html_split
+from task_store import JsonStorage, TaskStore
+from task_table import TaskTable
+
+DATA = {
+    "2026": {"2": {"10": ["<b>bold</b> & co"], "1": ["first"]}, "12": {"31": ["last"]}},
+    "2025": {"1": {"2": ["early"]}},
+}
+TABLE = TaskTable.from_nested(DATA)
+
+def test_page_is_yielded_in_chunks():
+    chunks = iter_tasks_html(TABLE)
+    assert next(chunks) == task_html.HTML_HEAD % "Tasks Overview"
+    page = "".join(chunks)
+    assert page.endswith(task_html.HTML_TAIL)
+    assert page.index('setYear(2025)') < page.index('setYear(2026)')
+    assert page.index("February 01, 2026") < page.index("February 10, 2026") < page.index("December 31, 2026")
+
+def test_task_text_is_escaped():
+    page = "".join(iter_tasks_html(TABLE))
+    assert "&lt;b&gt;bold&lt;/b&gt; &amp; co" in page
+    assert "<b>bold</b>" not in page
+
+def test_an_empty_table_has_no_year_sections():
+    page = "".join(iter_tasks_html(TaskTable()))
+    assert '<div class="year-section' not in page
+    assert 'onclick="setYear(' not in page
+
+def test_split_pages(tmp_path):
+    index_path = write_tasks_html_split(str(tmp_path), TABLE)
+    assert sorted(os.listdir(tmp_path)) == ["index.html", "tasks-2025.html", "tasks-2026.html"]
+    with open(index_path, encoding="utf-8") as f:
+        index = f.read()
+    assert '<a href="tasks-2025.html"><button>2025 (1)</button></a>' in index
+    assert '<a href="tasks-2026.html"><button>2026 (3)</button></a>' in index
+    with open(tmp_path / "tasks-2025.html", encoding="utf-8") as f:
+        page = f.read()
+    assert "early" in page and "first" not in page
+    assert 'href="index.html"' in page
+
+def test_month_cache_renders_a_month_once_per_version():
+    cache = MonthFragmentCache(size=2)
+    renders = []
+
+    def render(text):
+        return lambda: renders.append(text) or text
+
+    assert cache.fragment(2026, 1, 1, render("jan")) == "jan"
+    assert cache.fragment(2026, 1, 1, render("not again")) == "jan"
+    assert cache.fragment(2026, 1, 2, render("jan v2")) == "jan v2"
+    cache.fragment(2026, 2, 1, render("feb"))
+    cache.fragment(2026, 3, 1, render("mar"))  # Evicts January, the least recently used
+    cache.fragment(2026, 1, 2, render("jan again"))
+    assert renders == ["jan", "jan v2", "feb", "mar", "jan again"]
+    assert (cache.hits, cache.misses) == (1, 5)
+
+@pytest.fixture
+def store(data_dir):
+    store = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    store.load()
+    store.add(date(2026, 1, 5), "january")
+    store.add(date(2026, 2, 5), "february")
+    yield store
+    store.close()
+
+def test_cached_pages_match_uncached_pages(store):
+    overview = TaskOverview(store)
+    expected = "".join(iter_tasks_html(store.tasks))
+    assert "".join(overview.iter_page()) == expected
+    assert "".join(overview.iter_page()) == expected
+    assert overview.cache.hits == overview.cache.misses == 12
+
+def test_an_edit_renders_only_its_month_again(store):
+    overview = TaskOverview(store)
+    "".join(overview.iter_page())
+    misses = overview.cache.misses
+    store.add(date(2026, 2, 6), "more february")
+    page = "".join(overview.iter_page())
+    assert overview.cache.misses == misses + 1
+    assert page == "".join(iter_tasks_html(store.tasks))
+
+def test_recurring_tasks_refresh_every_month(store):
+    overview = TaskOverview(store)
+    "".join(overview.iter_page())
+    store.add_recurring(date(2026, 1, 1), "monthly review", "monthly")
+    page = "".join(overview.iter_page())
+    assert page.count("monthly review") == 12
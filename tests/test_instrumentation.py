@@ -0,0 +1,68 @@
+"""Metrics collected by the instrumentation module."""
+import json
+import os
+import subprocess
+import sys
+from datetime import date
+
+import pytest
+
+import instrumentation
+from task_store import JsonStorage, TaskStore
+
+@pytest.fixture
+def metrics(monkeypatch):
+    """Collect metrics into fresh tables for the duration of a test."""
+    monkeypatch.setattr(instrumentation, "metrics_enabled", True)
+    monkeypatch.setattr(instrumentation, "counters", {})
+    monkeypatch.setattr(instrumentation, "durations", {})
+    return instrumentation
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(instrumentation, "metrics_enabled", False)
+    monkeypatch.setattr(instrumentation, "counters", {})
+    monkeypatch.setattr(instrumentation, "durations", {})
+    instrumentation.count("edits")
+    with instrumentation.span("work"):
+        pass
+    assert instrumentation.snapshot_metrics() == {"counters": {}, "durations": {}}
+
+def test_spans_and_counters(metrics):
+    metrics.count("edits")
+    metrics.count("bytes_written", 10)
+    metrics.count("bytes_written", 5)
+    for _ in range(3):
+        with metrics.span("work"):
+            pass
+    with pytest.raises(RuntimeError):
+        with metrics.span("failing"):
+            raise RuntimeError
+    snapshot = metrics.snapshot_metrics()
+    assert snapshot["counters"] == {"edits": 1, "bytes_written": 15}
+    assert snapshot["durations"]["work"]["calls"] == 3
+    assert snapshot["durations"]["work"]["max_ms"] <= snapshot["durations"]["work"]["total_ms"]
+    # A block that raised is still timed
+    assert snapshot["durations"]["failing"]["calls"] == 1
+
+def test_store_operations_are_measured(metrics, data_dir):
+    store = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    store.load()
+    store.add(date(2026, 1, 1), "a")
+    store.add(date(2026, 1, 1), "b")
+    store.delete(date(2026, 1, 1), 1)
+    store.search("b")
+    store.close()
+    snapshot = metrics.snapshot_metrics()
+    assert snapshot["counters"]["tasks.add"] == 2
+    assert snapshot["counters"]["tasks.delete"] == 1
+    assert snapshot["counters"]["bytes_written"] > 0
+    assert {"load", "save.journal", "search.query"} <= set(snapshot["durations"])
+
+def test_environment_variable_dumps_metrics_at_exit(tmp_path):
+    target = tmp_path / "metrics.json"
+    code = "import instrumentation; instrumentation.count('runs')"
+    env = dict(os.environ, YEAR_PLANNER_METRICS=str(target))
+    subprocess.run([sys.executable, "-c", code], check=True, env=env,
+                   cwd=os.path.dirname(instrumentation.__file__))
+    with open(target) as f:
+        assert json.load(f) == {"counters": {"runs": 1}, "durations": {}}
@@ -0,0 +1,121 @@
+"""Journal records, their replay onto a snapshot and compaction."""
+import json
+import os
+from datetime import date
+
+import pytest
+
+import task_store
+from task_store import JsonStorage, TaskChange, apply_journal_record, replay_journal
+from task_table import TaskTable
+
+@pytest.fixture
+def storage(data_dir):
+    """A JsonStorage in a temporary folder."""
+    storage = JsonStorage(str(data_dir / "tasks.json"))
+    yield storage
+    storage.close()
+
+def record(day, tasks):
+    return {"date": day, "tasks": tasks}
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+def change(year, month, day, tasks):
+    """The change the store queues after setting the tasks of a date."""
+    return TaskChange("set", date(year, month, day).toordinal(), None, tuple(tasks), ())
+
+def test_apply_record_replaces_the_date():
+    data = {"2026": {"3": {"1": ["old"]}}}
+    apply_journal_record(data, record("2026-3-1", ["new", "newer"]))
+    apply_journal_record(data, record("2026-3-2", ["other"]))
+    assert data == {"2026": {"3": {"1": ["new", "newer"], "2": ["other"]}}}
+
+def test_apply_record_with_no_tasks_deletes_the_date():
+    data = {"2026": {"3": {"1": ["old"]}}}
+    apply_journal_record(data, record("2026-3-1", []))
+    apply_journal_record(data, record("2026-4-1", []))  # Nothing stored there
+    assert data == {"2026": {"3": {}}}
+
+@pytest.mark.parametrize("bad", [
+    ["not", "an", "object"],
+    {"date": "2026-03-xx", "tasks": []},
+    {"date": "2026-3-1", "tasks": "a task"},
+    {"date": "2026-3-1", "tasks": [1]},
+    {"date": "2026-3-1"},
+])
+def test_apply_record_rejects_malformed_records(bad):
+    with pytest.raises((ValueError, KeyError)):
+        apply_journal_record({}, bad)
+
+def test_replay_skips_unreadable_records(tmp_path):
+    path = tmp_path / "tasks.json.journal"
+    path.write_text(
+        json.dumps(record("2026-1-1", ["a"])) + "\n"
+        + "\n"
+        + json.dumps({"date": "2026-1-2"}) + "\n"
+        + json.dumps(record("2026-1-3", ["c"])) + "\n"
+        + '{"date": "2026-1-4", "tas',  # Torn last write
+        encoding="utf-8",
+    )
+    data = {}
+    assert replay_journal(data, str(path)) == 2
+    assert data == {"2026": {"1": {"1": ["a"], "3": ["c"]}}}
+
+def test_replay_twice_gives_the_same_data(tmp_path):
+    path = tmp_path / "tasks.json.journal"
+    path.write_text("".join(
+        json.dumps(line) + "\n" for line in [record("2026-1-1", ["a"]), record("2026-1-1", ["a", "b"]), record("2026-1-2", [])]
+    ), encoding="utf-8")
+    once = {"2026": {"1": {"2": ["gone"]}}}
+    replay_journal(once, str(path))
+    twice = json.loads(json.dumps(once))
+    replay_journal(twice, str(path))
+    assert once == twice == {"2026": {"1": {"1": ["a", "b"]}}}
+
+def test_replay_of_a_missing_journal_applies_nothing(tmp_path):
+    assert replay_journal({}, str(tmp_path / "missing.journal")) == 0
+
+def test_edits_are_journaled_and_replayed_on_load(storage):
+    storage.load()
+    storage.write_changes([change(2026, 5, 1, ["a"]), change(2026, 5, 2, ["b"])])
+    storage.write_changes([change(2026, 5, 1, [])])
+    assert not os.path.exists(storage.tasks_file)
+    with open(storage.journal_file, encoding="utf-8") as f:
+        assert len(f.readlines()) == 3
+
+    reloaded = JsonStorage(storage.tasks_file)
+    assert reloaded.load().to_nested() == {"2026": {"5": {"2": ["b"]}}}
+    reloaded.compaction_thread.join()
+    # The replayed records were folded into a fresh snapshot
+    assert not os.path.exists(reloaded.journal_file)
+    assert not os.path.exists(reloaded.compacting_file)
+    assert read_json(reloaded.tasks_file) == {"2026": {"5": {"2": ["b"]}}}
+
+def test_edits_made_during_a_compaction_go_to_a_new_journal(storage):
+    storage.load()
+    storage.write_changes([change(2026, 1, 1, ["first"])])
+    storage.compact()
+    storage.write_changes([change(2026, 1, 2, ["second"])])
+    storage.compaction_thread.join()
+    assert read_json(storage.tasks_file) == {"2026": {"1": {"1": ["first"]}}}
+    assert os.path.exists(storage.journal_file)
+    assert JsonStorage(storage.tasks_file).load().to_nested() == {"2026": {"1": {"1": ["first"], "2": ["second"]}}}
+
+def test_compaction_threshold_starts_a_compaction(storage, monkeypatch):
+    monkeypatch.setattr(task_store, "JOURNAL_COMPACT_THRESHOLD", 3)
+    storage.load()
+    storage.write_changes([change(2026, 1, day, [str(day)]) for day in (1, 2, 3)])
+    assert storage.compaction_thread is not None
+    storage.compaction_thread.join()
+    assert storage.journal_records == 0
+    assert read_json(storage.tasks_file) == {"2026": {"1": {"1": ["1"], "2": ["2"], "3": ["3"]}}}
+
+def test_save_writes_a_snapshot_and_clears_the_journal(storage):
+    storage.load()
+    storage.write_changes([change(2026, 2, 2, ["a"])])
+    storage.save(TaskTable.from_nested({"2026": {"2": {"2": ["a"]}}}))
+    assert read_json(storage.tasks_file) == {"2026": {"2": {"2": ["a"]}}}
+    assert not os.path.exists(storage.journal_file)
@@ -0,0 +1,113 @@
+"""Month calendars are built the first time their tab is shown."""
+import types
+from datetime import date
+
+import pytest
+
+import year_planner
+from task_table import TaskTable
+
+class FakeWidget:
+    def __init__(self, *args, **options):
+        self.options = options
+        self.bindings = {}
+
+    def pack(self, **options):
+        pass
+
+    def bind(self, sequence, callback):
+        self.bindings[sequence] = callback
+
+    def config(self, **options):
+        self.options.update(options)
+
+class FakeCalendar(FakeWidget):
+    built = []
+
+    def __init__(self, parent, **options):
+        super().__init__(**options)
+        FakeCalendar.built.append(options['month'])
+        self.events = {}
+
+    def tag_config(self, tag, **options):
+        pass
+
+    def calevent_create(self, date_obj, text, tag):
+        self.events[len(self.events) + 1] = date_obj
+        return len(self.events)
+
+    def calevent_remove(self, ev_id):
+        del self.events[ev_id]
+
+class FakeNotebook(FakeWidget):
+    def __init__(self):
+        super().__init__()
+        self.tabs = []
+        self.selected = 0
+
+    def add(self, tab, text):
+        self.tabs.append(text)
+
+    def select(self):
+        return self.selected
+
+    def index(self, tab):
+        return tab
+
+class FakeGui:
+    def after_idle(self, callback):
+        pass
+
+@pytest.fixture
+def notebook(monkeypatch):
+    FakeCalendar.built = []
+    notebook = FakeNotebook()
+    for name, value in {
+        "Calendar": FakeCalendar,
+        "ttk": types.SimpleNamespace(Frame=FakeWidget),
+        "notebook": notebook,
+        "gui": FakeGui(),
+        "calendar_tabs": {},
+        "current_year": 2026,
+        "start_year": 2026,
+        "default_selected_date": date(2026, 5, 10),
+        "selected_date_var": None,
+        "highlight_manager": year_planner.HighlightManager(),
+    }.items():
+        monkeypatch.setattr(year_planner, name, value, raising=False)
+    monkeypatch.setattr(year_planner.store, "tasks", TaskTable.from_nested({"2026": {"5": {"10": ["a"]}, "7": {"1": ["b"]}}}))
+    return notebook
+
+def test_only_the_default_month_is_built_at_startup(notebook):
+    year_planner.setup_calendar_tabs()
+    assert len(notebook.tabs) == 12
+    assert FakeCalendar.built == [5]
+    tabs = year_planner.calendar_tabs
+    assert tabs[5]['widget'].options['day'] == 10
+    assert list(tabs[5]['widget'].events.values()) == [date(2026, 5, 10)]
+    assert all(tabs[month]['widget'] is None for month in tabs if month != 5)
+
+def test_a_tab_is_built_and_highlighted_when_first_shown(notebook):
+    year_planner.setup_calendar_tabs()
+    notebook.selected = 6
+    notebook.bindings["<<NotebookTabChanged>>"](None)
+    notebook.bindings["<<NotebookTabChanged>>"](None)
+    assert FakeCalendar.built == [5, 7]
+    july = year_planner.calendar_tabs[7]['widget']
+    assert july.options['day'] == 1
+    assert list(july.events.values()) == [date(2026, 7, 1)]
+
+def test_highlighting_skips_unbuilt_tabs(notebook):
+    year_planner.setup_calendar_tabs()
+    year_planner.store.tasks.set_day(date(2026, 8, 3).toordinal(), ["c"])
+    year_planner.highlight_dates()
+    year_planner.highlight_dates([date(2026, 8, 3)])
+    assert FakeCalendar.built == [5]
+
+def test_tabs_built_after_a_year_change_use_the_new_year(notebook, monkeypatch):
+    monkeypatch.setattr(year_planner, "selected_date_var", types.SimpleNamespace(get=lambda: "2027-01-01", set=lambda value: None))
+    year_planner.setup_calendar_tabs()
+    year_planner.update_calendar_year(2027)
+    assert year_planner.calendar_tabs[5]['widget'].options['year'] == 2027
+    year_planner.build_calendar_tab(2)
+    assert year_planner.calendar_tabs[2]['widget'].options['year'] == 2027
@@ -0,0 +1,164 @@
+"""Expansion of recurrence rules into the days of a month, and the month cache of RecurrenceSet."""
+import calendar
+from datetime import date, timedelta
+
+import pytest
+
+from task_recurrence import RecurrenceRule, RecurrenceSet, occurrence_days, rule_from_dict, rule_to_dict
+from task_store import JsonStorage, SqliteStorage, TaskNumberError, TaskStore, TaskStoreError
+
+def rule(freq, start, interval=1, weekdays=(), until=None, rule_id=1, text="task"):
+    return RecurrenceRule(rule_id, text, freq, start, until, interval, tuple(weekdays))
+
+def occurs_on(rule, day):
+    """Whether rule occurs on day, worked out one date at a time."""
+    if day < rule.start or rule.until and day > rule.until:
+        return False
+    if rule.freq == "daily":
+        return (day - rule.start).days % rule.interval == 0
+    if rule.freq == "weekly":
+        first_monday = rule.start - timedelta(days=rule.start.weekday())
+        weeks = (day - first_monday).days // 7
+        return day.weekday() in rule.weekdays and weeks % rule.interval == 0
+    if rule.freq == "monthly":
+        months = (day.year - rule.start.year) * 12 + day.month - rule.start.month
+        return day.day == rule.start.day and months % rule.interval == 0
+    return (day.month, day.day) == (rule.start.month, rule.start.day) and (day.year - rule.start.year) % rule.interval == 0
+
+def days_by_brute_force(rule, year, month):
+    return [day for day in range(1, calendar.monthrange(year, month)[1] + 1) if occurs_on(rule, date(year, month, day))]
+
+RULES = [
+    rule("daily", date(2024, 1, 30)),
+    rule("daily", date(2024, 2, 27), interval=3, until=date(2024, 11, 5)),
+    rule("weekly", date(2024, 1, 3), weekdays=[2]),
+    rule("weekly", date(2024, 1, 3), interval=2, weekdays=[0, 2, 6]),
+    rule("weekly", date(2024, 3, 31), interval=3, weekdays=[5, 6], until=date(2025, 2, 1)),
+    rule("monthly", date(2024, 1, 31)),
+    rule("monthly", date(2024, 3, 15), interval=5),
+    rule("yearly", date(2024, 2, 29)),
+    rule("yearly", date(2023, 7, 4), interval=2, until=date(2027, 7, 3)),
+]
+
+@pytest.mark.parametrize("recurrence", RULES, ids=lambda recurrence: f"{recurrence.freq}-{recurrence.start}-{recurrence.interval}")
+def test_expansion_matches_a_date_by_date_check(recurrence):
+    for year in range(2023, 2029):
+        for month in range(1, 13):
+            assert occurrence_days(recurrence, year, month) == days_by_brute_force(recurrence, year, month), (year, month)
+
+def test_monthly_rule_skips_months_without_its_day():
+    monthly = rule("monthly", date(2025, 1, 31))
+    assert [month for month in range(1, 13) if occurrence_days(monthly, 2025, month)] == [1, 3, 5, 7, 8, 10, 12]
+
+def test_yearly_rule_on_february_29_only_occurs_in_leap_years():
+    leap_day = rule("yearly", date(2024, 2, 29))
+    assert [year for year in range(2024, 2033) if occurrence_days(leap_day, year, 2)] == [2024, 2028, 2032]
+
+def test_nothing_occurs_before_start_or_after_until():
+    daily = rule("daily", date(2026, 5, 10), until=date(2026, 5, 12))
+    assert occurrence_days(daily, 2026, 4) == []
+    assert occurrence_days(daily, 2026, 5) == [10, 11, 12]
+    assert occurrence_days(daily, 2026, 6) == []
+
+def test_far_future_months_expand_without_walking_from_start():
+    daily = rule("daily", date(1, 1, 1), interval=7)
+    assert occurrence_days(daily, 9999, 12) == days_by_brute_force(daily, 9999, 12)
+
+def test_rule_round_trips_through_its_dict():
+    weekly = rule("weekly", date(2026, 1, 5), interval=2, weekdays=[0, 4], until=date(2026, 12, 31))
+    assert rule_from_dict(rule_to_dict(weekly)) == weekly
+
+def test_weekly_rule_without_weekdays_repeats_on_the_start_weekday():
+    record = rule_to_dict(rule("weekly", date(2026, 10, 15)))  # A Thursday
+    assert rule_from_dict(record).weekdays == (3,)
+
+@pytest.mark.parametrize("change", [
+    {"freq": "hourly"},
+    {"interval": 0},
+    {"weekdays": [7]},
+    {"text": " "},
+    {"start": "2026-02-30"},
+])
+def test_invalid_rules_are_rejected(change):
+    record = dict(rule_to_dict(rule("daily", date(2026, 1, 1))), **change)
+    with pytest.raises(ValueError):
+        rule_from_dict(record)
+
+def test_set_groups_rules_by_day_and_drops_its_cache_on_changes():
+    rules = RecurrenceSet([rule("monthly", date(2026, 1, 5), rule_id=1, text="rent")])
+    assert [r.text for r in rules.occurrences_on(date(2026, 3, 5))] == ["rent"]
+    rules.add(rule("weekly", date(2026, 3, 2), weekdays=[3], rule_id=rules.next_id(), text="gym"))
+    march = rules.occurrences(2026, 3)
+    assert sorted(march) == [5, 12, 19, 26]
+    assert [r.text for r in march[5]] == ["rent", "gym"]
+    assert rules.remove(1).text == "rent"
+    assert [r.text for r in rules.occurrences_on(date(2026, 3, 5))] == ["gym"]
+
+@pytest.fixture
+def store(data_dir):
+    store = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    store.load()
+    yield store
+    store.close()
+
+def test_store_merges_recurring_tasks_into_days(store):
+    store.add(date(2026, 3, 2), "dentist")
+    store.add_recurring(date(2026, 3, 2), "standup", "weekly", weekdays=[0, 2])
+    assert store.days_with_tasks(2026, 3) == [2, 4, 9, 11, 16, 18, 23, 25, 30]
+    assert store.has_tasks(date(2026, 3, 4))
+    assert not store.has_tasks(date(2026, 3, 5))
+    merged = store.tasks_with_occurrences([2026])
+    assert merged.get(date(2026, 3, 2).toordinal()) == ["dentist", "standup"]
+    assert merged.get(date(2026, 3, 4).toordinal()) == ["standup"]
+    # The stored tasks are left alone
+    assert store.tasks.to_nested() == {"2026": {"3": {"2": ["dentist"]}}}
+
+@pytest.mark.parametrize("bad", [
+    dict(text=" "),
+    dict(freq="hourly"),
+    dict(interval=0),
+    dict(until=date(2026, 1, 1)),
+])
+def test_store_rejects_invalid_recurring_tasks(store, bad):
+    arguments = dict(start=date(2026, 3, 2), text="standup", freq="daily")
+    arguments.update(bad)
+    with pytest.raises(TaskStoreError):
+        store.add_recurring(**arguments)
+
+def test_removing_a_rule_drops_every_occurrence(store):
+    rule = store.add_recurring(date(2026, 3, 2), "standup", "daily")
+    assert store.remove_recurring(rule.rule_id) == rule
+    assert store.days_with_tasks(2026, 3) == []
+    with pytest.raises(TaskNumberError):
+        store.remove_recurring(rule.rule_id)
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_rules_survive_a_reload(data_dir, backend):
+    def open_store():
+        if backend == "json":
+            storage = JsonStorage(str(data_dir / "tasks.json"))
+        else:
+            storage = SqliteStorage(str(data_dir / "tasks.db"), str(data_dir / "tasks.json"))
+        store = TaskStore(storage)
+        store.load()
+        return store
+    store = open_store()
+    rule = store.add_recurring(date(2026, 1, 31), "rent", "monthly", until=date(2026, 12, 31))
+    store.close()
+    store = open_store()
+    assert list(store.recurrences.rules.values()) == [rule]
+    assert store.days_with_tasks(2026, 2) == []
+    assert store.days_with_tasks(2026, 3) == [31]
+    store.close()
+
+def test_json_rules_are_migrated_to_sqlite(data_dir):
+    store = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    store.load()
+    store.add(date(2026, 1, 1), "one-off")
+    rule = store.add_recurring(date(2026, 1, 5), "gym", "weekly")
+    store.close()
+    store = TaskStore(SqliteStorage(str(data_dir / "tasks.db"), str(data_dir / "tasks.json")))
+    store.load()
+    assert store.tasks.to_nested() == {"2026": {"1": {"1": ["one-off"]}}}
+    assert list(store.recurrences.rules.values()) == [rule]
+    store.close()
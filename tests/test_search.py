@@ -0,0 +1,85 @@
+"""Full-text search through TaskIndex, kept in step with the store."""
+from datetime import date
+
+import pytest
+
+from task_search import BULK_INDEX_THRESHOLD, TaskIndex, tokenize
+from task_store import JsonStorage, TaskStore
+from task_table import TaskTable
+
+DATA = {
+    "2026": {
+        "1": {"5": ["Call the dentist", "Buy milk"], "6": ["Dentistry conference"]},
+        "2": {"1": ["Buy bread and milk"]},
+    },
+    "2025": {"12": {"24": ["Wrap presents"]}},
+}
+TABLE = TaskTable.from_nested(DATA)
+
+def found(results):
+    return [(result.date, result.task_no) for result in results]
+
+@pytest.fixture
+def index():
+    index = TaskIndex()
+    index.build(TABLE)
+    return index
+
+def test_tokenize():
+    assert tokenize("Call Bob's cell, 10AM!") == ["call", "bob", "s", "cell", "10am"]
+
+def test_exact_words_rank_above_prefixes(index):
+    results = index.search("dentist", TABLE)
+    assert found(results) == [(date(2026, 1, 5), 1), (date(2026, 1, 6), 1)]
+    assert results[0].score > results[1].score
+    assert results[0].task == "Call the dentist"
+
+def test_every_word_must_match(index):
+    assert sorted(found(index.search("buy milk", TABLE))) == [(date(2026, 1, 5), 2), (date(2026, 2, 1), 1)]
+    assert found(index.search("milk bread", TABLE)) == [(date(2026, 2, 1), 1)]
+    assert index.search("milk unicorn", TABLE) == []
+    assert index.search("  ", TABLE) == []
+
+def test_limit(index):
+    assert len(index.search("b", TABLE, limit=1)) == 1
+
+def assert_same_index(index, table):
+    rebuilt = TaskIndex()
+    rebuilt.build(table)
+    assert index.postings == rebuilt.postings
+    assert index.vocabulary == rebuilt.vocabulary
+    assert index.task_count == rebuilt.task_count
+
+def test_reindexing_a_day_matches_a_full_build(index):
+    table = TABLE.copy()
+    table.set_day(date(2026, 1, 5).toordinal(), ["Call the plumber"])
+    index.index_day(date(2026, 1, 5).toordinal(), table.get(date(2026, 1, 5).toordinal()))
+    table.set_day(date(2026, 2, 1).toordinal(), [])
+    index.index_day(date(2026, 2, 1).toordinal(), ())
+    assert_same_index(index, table)
+    assert index.task_count == 3
+    assert index.search("milk", table) == []
+
+def test_bulk_reindexing_matches_a_full_build(index):
+    table = TABLE.copy()
+    first = date(2026, 1, 1).toordinal()
+    entries = [(first + offset, [f"import{offset} batch", "Buy milk"] if offset % 3 else [])
+               for offset in range(BULK_INDEX_THRESHOLD + 10)]
+    for ordinal, tasks in entries:
+        table.set_day(ordinal, tasks)
+    index.index_days(entries)
+    assert_same_index(index, table)
+    assert found(index.search("import13", table)) == [(date(2026, 1, 14), 1)]
+
+def test_store_keeps_the_index_up_to_date(data_dir):
+    store = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    store.load()
+    store.add(date(2026, 3, 1), "Renew passport")
+    store.add(date(2026, 3, 1), "Pay rent")
+    assert found(store.search("pass")) == [(date(2026, 3, 1), 1)]
+    store.delete(date(2026, 3, 1), 1)
+    assert store.search("passport") == []
+    assert found(store.search("rent")) == [(date(2026, 3, 1), 1)]
+    store.clear(date(2026, 3, 1))
+    assert store.search("rent") == []
+    store.close()
@@ -0,0 +1,158 @@
+"""TaskServer: the tasks overview and JSON API over local HTTP, with ETag revalidation."""
+import json
+import threading
+import urllib.error
+import urllib.request
+from datetime import date
+
+import pytest
+
+from task_server import TaskServer
+from task_store import JsonStorage, TaskStore
+
+@pytest.fixture
+def store(data_dir):
+    store = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    store.load()
+    store.add(date(2026, 3, 1), "Pay <rent>")
+    for task_no in range(1, 6):
+        store.add(date(2026, 4, task_no), f"April {task_no}")
+    store.add(date(2025, 1, 1), "Last year")
+    yield store
+    store.close()
+
+@pytest.fixture
+def server(store):
+    server = TaskServer(store)
+    server.start()
+    yield server
+    server.stop()
+
+def get(server, path, etag=None):
+    request = urllib.request.Request(server.url + path.lstrip("/"))
+    if etag:
+        request.add_header("If-None-Match", etag)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+def test_server_listens_on_localhost_only(server):
+    assert server.url.startswith("http://127.0.0.1:")
+
+def test_overview_page(server):
+    status, headers, body = get(server, "/")
+    assert status == 200
+    assert headers["Content-Type"] == "text/html; charset=utf-8"
+    assert "Pay &lt;rent&gt;" in body.decode("utf-8")
+    status, _, body = get(server, "/tasks-2025.html")
+    assert status == 200 and b"Last year" in body and b"April" not in body
+
+def test_unchanged_pages_are_revalidated_without_rendering(server, store):
+    _, headers, _ = get(server, "/")
+    etag = headers["ETag"]
+    status, headers, body = get(server, "/", etag)
+    assert (status, body) == (304, b"")
+    assert headers["ETag"] == etag
+    store.add(date(2026, 3, 2), "New")
+    status, headers, body = get(server, "/", etag)
+    assert status == 200 and headers["ETag"] != etag and b"New" in body
+
+def test_rendered_responses_are_reused_until_the_tasks_change(server, store):
+    server.response("/api/years")
+    first = server.response("/api/years")
+    assert server.response("/api/years") is first
+    store.add(date(2026, 3, 2), "New")
+    assert server.response("/api/years") is not first
+
+def test_api_years(server):
+    status, headers, body = get(server, "/api/years")
+    assert headers["Content-Type"] == "application/json"
+    assert json.loads(body) == [{"year": 2025, "tasks": 1}, {"year": 2026, "tasks": 6}]
+
+def test_api_tasks_pages(server):
+    _, _, body = get(server, "/api/tasks/2026/4?page=2&per_page=2")
+    page = json.loads(body)
+    assert (page["total"], page["pages"]) == (5, 3)
+    assert page["tasks"] == [
+        {"date": "2026-04-03", "task_no": 1, "task": "April 3"},
+        {"date": "2026-04-04", "task_no": 1, "task": "April 4"},
+    ]
+    _, _, body = get(server, "/api/tasks/2026")
+    assert [item["task"] for item in json.loads(body)["tasks"]][:2] == ["Pay <rent>", "April 1"]
+
+@pytest.mark.parametrize("path, status", [
+    ("/missing", 404),
+    ("/api/tasks/2026/13", 404),
+    ("/api/tasks/2026?page=0", 400),
+    ("/api/tasks/2026?per_page=x", 400),
+    ("/?year=0", 400),
+])
+def test_bad_requests(server, path, status):
+    assert get(server, path)[0] == status
+
+def test_unknown_paths_are_not_revalidated(server):
+    _, headers, _ = get(server, "/")
+    assert get(server, "/missing", headers["ETag"])[0] == 404
+
+def test_pages_rendered_during_edits_match_their_generation(server, store):
+    done = threading.Event()
+
+    def edit():
+        for day in range(1, 29):
+            for _ in range(5):
+                store.add(date(2026, 5, day), "May")
+        done.set()
+
+    editor = threading.Thread(target=edit)
+    editor.start()
+    seen = {}
+    while not done.is_set():
+        generation, _, body = server.response("/api/years")
+        seen[generation] = json.loads(body)[-1]["tasks"]
+    editor.join()
+    generation, _, body = server.response("/api/years")
+    seen[generation] = json.loads(body)[-1]["tasks"]
+    assert seen[store.generation] == 6 + 28 * 5
+    # Each add bumps the generation once, so a page's task count follows from its generation
+    first = min(seen)
+    assert all(tasks - seen[first] == generation - first for generation, tasks in seen.items())
+
+def test_pages_are_rendered_without_the_store_lock(server, store):
+    rendering = threading.Event()
+    release = threading.Event()
+    year_page = server.overview.iter_year_page
+
+    def slow_year_page(year, source=None):
+        rendering.set()
+        release.wait(10)
+        return year_page(year, source)
+
+    server.overview.iter_year_page = slow_year_page
+    request = threading.Thread(target=get, args=(server, "/tasks-2026.html"))
+    request.start()
+    assert rendering.wait(10)
+    # An edit goes through while the page is being rendered
+    edited = threading.Thread(target=store.add, args=(date(2026, 3, 2), "Edited"))
+    edited.start()
+    edited.join(5)
+    assert not edited.is_alive()
+    release.set()
+    request.join(10)
+
+def test_snapshots_are_copies_reused_until_a_change(store):
+    snapshot = store.snapshot()
+    assert store.snapshot() is snapshot
+    store.add(date(2026, 3, 1), "Later")
+    assert snapshot.tasks.get(date(2026, 3, 1).toordinal()) == ("Pay <rent>",)
+    assert store.snapshot() is not snapshot
+    assert store.snapshot().tasks.get(date(2026, 3, 1).toordinal()) == ("Pay <rent>", "Later")
+
+def test_every_change_bumps_the_generation(store):
+    generation = store.generation
+    store.delete(date(2026, 3, 1), 1)
+    assert store.generation > generation
+    generation = store.generation
+    store.add_recurring(date(2026, 1, 1), "daily", "daily")
+    assert store.generation > generation
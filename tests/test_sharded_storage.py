@@ -0,0 +1,140 @@
+"""ShardedStorage: one tasks file per year, read only when a year is needed."""
+import json
+import os
+import threading
+from datetime import date
+
+import pytest
+
+from task_store import JsonStorage, ShardedStorage, SqliteStorage, TaskChange, TaskStore
+from task_table import TaskTable
+
+DATA = {
+    "2024": {"12": {"31": ["old"]}},
+    "2025": {"6": {"1": ["middle"]}},
+    "2026": {"1": {"1": ["new", "year"]}},
+}
+
+@pytest.fixture
+def paths(data_dir):
+    return str(data_dir / "tasks"), str(data_dir / "tasks.json")
+
+def sharded_store(paths, years=None):
+    store = TaskStore(ShardedStorage(*paths, archive_keep_years=-1))  # Past years stay in year files
+    store.load(years)
+    return store
+
+def seed(paths):
+    store = sharded_store(paths)
+    store.storage.save(TaskTable.from_nested(DATA))
+    store.close()
+
+def test_single_file_is_split_into_years(paths):
+    shard_dir, legacy_file = paths
+    legacy = JsonStorage(legacy_file)
+    legacy.save(TaskTable.from_nested({"2024": DATA["2024"], "2025": DATA["2025"]}))
+    legacy.save_rules([{"id": 1, "text": "gym", "freq": "daily", "start": "2026-01-01"}])
+    with open(legacy_file + ".journal", "w") as f:
+        f.write(json.dumps({"date": "2026-1-1", "tasks": ["new", "year"]}) + "\n")
+    store = sharded_store(paths)
+    assert store.tasks.to_nested() == DATA
+    files = sorted(name for name in os.listdir(shard_dir) if not name.endswith(".lock"))
+    assert files == ["2024.json", "2025.json", "2026.json", "manifest.json", "recurring.json"]
+    assert [rule.text for rule in store.recurrences.rules.values()] == ["gym"]
+    store.close()
+
+def test_only_the_requested_year_is_read(paths):
+    seed(paths)
+    store = sharded_store(paths, [2026])
+    assert store.tasks.to_nested() == {"2026": DATA["2026"]}
+    assert store.unloaded_years == {2024, 2025}
+    # Touching a date reads its year
+    assert store.tasks_for(date(2025, 6, 1)) == ["middle"]
+    assert store.unloaded_years == {2024}
+    store.load_all()
+    assert store.tasks.to_nested() == DATA
+    store.close()
+
+def test_an_edit_only_writes_its_year(paths):
+    shard_dir, _ = paths
+    seed(paths)
+    before = {name: os.stat(os.path.join(shard_dir, name)).st_mtime_ns for name in ("2024.json", "2025.json")}
+    store = sharded_store(paths, [2026])
+    store.add(date(2026, 1, 2), "written")
+    store.add(date(2027, 3, 3), "a new year")
+    store.close()
+    after = {name: os.stat(os.path.join(shard_dir, name)).st_mtime_ns for name in ("2024.json", "2025.json")}
+    assert after == before
+    assert not any(name.endswith(".journal") for name in os.listdir(shard_dir))
+    with open(os.path.join(shard_dir, "manifest.json")) as f:
+        assert json.load(f)["years"] == [2024, 2025, 2026, 2027]
+    reloaded = sharded_store(paths)
+    assert reloaded.tasks_for(date(2026, 1, 2)) == ["written"]
+    assert reloaded.tasks_for(date(2027, 3, 3)) == ["a new year"]
+    reloaded.close()
+
+def test_a_year_read_on_two_threads_is_put_in_place_once(paths):
+    seed(paths)
+    store = sharded_store(paths, [2026])
+    readers = [threading.Thread(target=store.load_years, args=({2024, 2025},)) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    assert store.unloaded_years == set()
+    assert store.tasks.to_nested() == DATA
+    store.close()
+
+@pytest.mark.parametrize("manifest", [None, "not json"])
+def test_a_lost_manifest_is_rebuilt_from_the_year_files(paths, manifest):
+    shard_dir, _ = paths
+    seed(paths)
+    manifest_file = os.path.join(shard_dir, "manifest.json")
+    if manifest is None:
+        os.remove(manifest_file)
+    else:
+        with open(manifest_file, "w") as f:
+            f.write(manifest)
+    store = sharded_store(paths)
+    assert store.tasks.to_nested() == DATA
+    store.close()
+
+def test_sqlite_migrates_from_the_year_files(paths, data_dir):
+    seed(paths)
+    storage = SqliteStorage(str(data_dir / "tasks.db"), paths[1], paths[0])
+    assert storage.load().to_nested() == DATA
+    storage.close()
+
+def test_year_sets_can_be_read_while_a_writer_adds_years(paths, data_dir):
+    archive_dir = str(data_dir / "archive")
+    storage = ShardedStorage(*paths, archive_dir=archive_dir, archive_keep_years=-1)
+    storage.load([])
+    errors = []
+    done = threading.Event()
+
+    def write():
+        try:
+            for year in range(1900, 2000):
+                ordinal = date(year, 1, 1).toordinal()
+                storage.write_changes([TaskChange("add", ordinal, "t", ("t",), ())])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    while not done.is_set():
+        try:
+            storage.unloaded_years()
+            storage.changed_on_disk()
+            storage.read_current()
+        except Exception as e:
+            errors.append(e)
+            break
+    writer.join()
+    assert errors == []
+    storage.close()
+    reloaded = ShardedStorage(*paths, archive_dir=archive_dir, archive_keep_years=-1)
+    assert reloaded.load().years() == list(range(1900, 2000))
+    reloaded.close()
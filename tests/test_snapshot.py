@@ -0,0 +1,108 @@
+"""The binary snapshot codec: round trips, the CRC and the structural checks behind it."""
+import os
+from datetime import date
+
+import pytest
+
+from task_snapshot import (HEADER, SnapshotError, decode_snapshot, encode_snapshot, read_snapshot_file,
+                           snapshot_header, snapshot_sections, u32_array, u32_bytes, write_snapshot_file)
+from task_store import JsonStorage
+
+DATA = {
+    "2025": {"12": {"31": ["party", "clean up"]}},
+    "2026": {
+        "1": {"1": ["party", "clean up", "party"], "2": ["caf\u00e9 \u2615"]},
+        "2": {"28": ["line\nbreak", "nul\0inside", ""]},
+    },
+}
+
+def resealed(sections, counts):
+    """A snapshot of the given sections with a header (and CRC) that matches them."""
+    return snapshot_header(counts, sections) + b"".join(sections)
+
+@pytest.mark.parametrize("data", [
+    DATA,
+    {},
+    {"2026": {"3": {"1": ["no text repeats"], "2": ["at all"]}}},
+    {"1": {"1": {"1": ["first day"]}}, "9999": {"12": {"31": ["last day"]}}},
+    {"2026": {"3": {"1": ["lone \ud800 surrogate"]}}},
+])
+def test_round_trip(data):
+    assert decode_snapshot(encode_snapshot(data)) == data
+
+def test_empty_dates_and_impossible_dates_are_left_out():
+    data = {"2026": {"2": {"30": ["never"], "1": [], "2": ["kept"]}}}
+    assert decode_snapshot(encode_snapshot(data)) == {"2026": {"2": {"2": ["kept"]}}}
+
+def test_repeated_texts_are_stored_once():
+    once = encode_snapshot({"2026": {"1": {"1": ["a long repeated task text"]}}})
+    many = encode_snapshot({"2026": {"1": {str(day): ["a long repeated task text"] for day in range(1, 29)}}})
+    # Per extra date: its ordinal, its task count and one string number
+    assert len(many) - len(once) == 27 * 12
+
+def test_every_flipped_payload_byte_fails_the_checksum():
+    snapshot = encode_snapshot(DATA)
+    for position in range(HEADER.size, len(snapshot)):
+        damaged = bytearray(snapshot)
+        damaged[position] ^= 0x40
+        with pytest.raises(SnapshotError, match="checksum"):
+            decode_snapshot(damaged)
+
+@pytest.mark.parametrize("damage, message", [
+    (lambda snapshot: snapshot[:HEADER.size - 1], "truncated"),
+    (lambda snapshot: snapshot[:-1], "truncated"),
+    (lambda snapshot: snapshot + b"x", "truncated"),
+    (lambda snapshot: b"XXSNAP" + snapshot[6:], "not a Year Planner snapshot"),
+    (lambda snapshot: snapshot[:6] + b"\x63\x00" + snapshot[8:], "unsupported snapshot version 99"),
+])
+def test_damaged_headers_are_rejected(damage, message):
+    with pytest.raises(SnapshotError, match=message):
+        decode_snapshot(damage(encode_snapshot(DATA)))
+
+def test_dates_out_of_order_are_rejected_even_with_a_valid_checksum():
+    counts, sections = snapshot_sections({"2026": {"1": {"1": ["a"], "2": ["b"]}}})
+    ordinals = [date(2026, 1, 2).toordinal(), date(2026, 1, 1).toordinal()]
+    sections[1] = u32_bytes(u32_array(ordinals))
+    with pytest.raises(SnapshotError, match="not in order"):
+        decode_snapshot(resealed(sections, counts))
+
+def test_records_of_missing_strings_are_rejected_even_with_a_valid_checksum():
+    counts, sections = snapshot_sections({"2026": {"1": {"1": ["a", "a"], "2": ["b"]}}})
+    sections[3] = u32_bytes(u32_array([0, 0, 7]))
+    with pytest.raises(SnapshotError, match="missing strings"):
+        decode_snapshot(resealed(sections, counts))
+
+def test_string_lengths_must_match_the_strings():
+    counts, sections = snapshot_sections({"2026": {"1": {"1": ["abc"]}}})
+    sections[0] = u32_bytes(u32_array([2]))
+    with pytest.raises(SnapshotError, match="string lengths"):
+        decode_snapshot(resealed(sections, counts))
+
+def test_files_are_written_and_memory_mapped_back(tmp_path):
+    path = str(tmp_path / "tasks.snap")
+    with open(path, "wb") as f:
+        written = write_snapshot_file(f, DATA)
+    assert written == os.path.getsize(path)
+    assert read_snapshot_file(path) == DATA
+    open(path, "wb").close()
+    with pytest.raises(SnapshotError, match="empty"):
+        read_snapshot_file(path)
+
+def test_binary_storage_converts_and_backs_up_a_corrupted_snapshot(data_dir):
+    tasks_file = str(data_dir / "tasks.json")
+    json_storage = JsonStorage(tasks_file)
+    json_storage.write_snapshot(DATA)
+
+    binary = JsonStorage(tasks_file, snapshot_format="binary")
+    tasks = binary.load()
+    assert tasks.to_nested() == DATA
+    binary.save(tasks)
+    assert os.path.exists(binary.binary_file) and not os.path.exists(tasks_file)
+
+    with open(binary.binary_file, "r+b") as f:
+        f.seek(HEADER.size + 3)
+        f.write(b"\xff")
+    damaged = JsonStorage(tasks_file, snapshot_format="binary")
+    assert len(damaged.load()) == 0
+    assert damaged.backup_path == binary.binary_file + ".backup"
+    assert os.path.exists(damaged.backup_path)
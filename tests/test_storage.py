@@ -0,0 +1,130 @@
+"""The storage backends behind load and save: SQLite rows, and the choice of backend."""
+import json
+import sqlite3
+from datetime import date
+
+import pytest
+
+from task_store import JsonStorage, ShardedStorage, SqliteStorage, TaskChange, create_storage
+from task_table import TaskTable
+
+@pytest.fixture
+def paths(data_dir):
+    return str(data_dir / "tasks.db"), str(data_dir / "tasks.json")
+
+@pytest.fixture
+def sqlite_storage(paths):
+    storage = SqliteStorage(*paths)
+    yield storage
+    storage.close()
+
+DATA = {"2025": {"12": {"31": ["party"]}}, "2026": {"1": {"1": ["a", "b"], "15": ["c"]}, "2": {"3": ["d"]}}}
+
+def rows(storage):
+    return storage.connect().execute("SELECT year, month, day, position, task FROM tasks ORDER BY 1, 2, 3, 4").fetchall()
+
+def test_save_and_load_round_trip(sqlite_storage):
+    sqlite_storage.load()
+    sqlite_storage.save(TaskTable.from_nested(DATA))
+    assert sqlite_storage.load().to_nested() == DATA
+    reopened = SqliteStorage(sqlite_storage.db_file, sqlite_storage.json_file)
+    assert reopened.load().to_nested() == DATA
+    reopened.close()
+
+def test_edits_touch_only_the_rows_of_their_date(sqlite_storage):
+    sqlite_storage.load()
+    sqlite_storage.save(TaskTable.from_nested(DATA))
+    sqlite_storage.write_changes([
+        TaskChange("add", date(2026, 1, 1).toordinal(), "e", ("a", "b", "e"), ("a", "b")),
+        TaskChange("delete", date(2026, 1, 1).toordinal(), 0, ("b", "e"), ("a", "b", "e")),
+        TaskChange("clear", date(2026, 2, 3).toordinal(), None, (), ("d",)),
+    ])
+    assert rows(sqlite_storage) == [
+        (2025, 12, 31, 0, "party"),
+        (2026, 1, 1, 0, "b"),
+        (2026, 1, 1, 1, "e"),
+        (2026, 1, 15, 0, "c"),
+    ]
+
+def test_a_failing_batch_is_rolled_back(sqlite_storage):
+    sqlite_storage.load()
+    sqlite_storage.save(TaskTable.from_nested(DATA))
+    with pytest.raises(ValueError):
+        sqlite_storage.write_changes([
+            TaskChange("clear", date(2026, 1, 1).toordinal(), None, (), ("a", "b")),
+            TaskChange("bogus", date(2026, 1, 1).toordinal(), None, (), ()),
+        ])
+    assert sqlite_storage.load().to_nested() == DATA
+
+def test_indexed_lookups(sqlite_storage):
+    sqlite_storage.load()
+    sqlite_storage.save(TaskTable.from_nested(DATA))
+    assert sqlite_storage.tasks_for_day(2026, 1, 1) == ["a", "b"]
+    for query, args in [
+        ("SELECT task FROM tasks WHERE year = ? AND month = ? AND day = ? ORDER BY position", (2026, 1, 1)),
+        ("SELECT year, month, day, task FROM tasks WHERE year = ? ORDER BY month, day, position", (2026,)),
+    ]:
+        plan = " ".join(str(step) for step in sqlite_storage.connect().execute("EXPLAIN QUERY PLAN " + query, args))
+        assert "idx_tasks_date" in plan
+        assert "TEMP B-TREE" not in plan
+
+def test_years_are_read_when_asked_for(sqlite_storage):
+    sqlite_storage.load()
+    sqlite_storage.save(TaskTable.from_nested(DATA))
+    assert sqlite_storage.stored_years() == {2025, 2026}
+    assert sqlite_storage.load({2026}).to_nested() == {"2026": DATA["2026"]}
+    assert sqlite_storage.unloaded_years() == {2025}
+    assert sqlite_storage.load_years({2025, 2026}).to_nested() == {"2025": DATA["2025"]}
+    assert sqlite_storage.unloaded_years() == set()
+    assert sqlite_storage.read_current().to_nested() == DATA
+
+def test_saving_some_years_keeps_the_others(sqlite_storage):
+    sqlite_storage.load()
+    sqlite_storage.save(TaskTable.from_nested(DATA))
+    sqlite_storage.load({2026})
+    sqlite_storage.save(TaskTable.from_nested({"2026": {"3": {"1": ["new"]}}}))
+    assert rows(sqlite_storage) == [(2025, 12, 31, 0, "party"), (2026, 3, 1, 0, "new")]
+
+def test_only_other_connections_count_as_changes_on_disk(sqlite_storage):
+    sqlite_storage.load({2026})
+    assert not sqlite_storage.changed_on_disk()
+    sqlite_storage.write_changes([TaskChange("add", date(2026, 4, 4).toordinal(), "ours", ("ours",), ())])
+    assert not sqlite_storage.changed_on_disk()
+    other = SqliteStorage(sqlite_storage.db_file, sqlite_storage.json_file)
+    other.load({2026})
+    other.write_changes([TaskChange("add", date(2026, 4, 5).toordinal(), "theirs", ("theirs",), ())])
+    other.close()
+    assert sqlite_storage.changed_on_disk()
+    # Our next write doesn't hide their commit: it is still there to merge
+    sqlite_storage.write_changes([TaskChange("add", date(2026, 4, 6).toordinal(), "more", ("more",), ())])
+    assert sqlite_storage.changed_on_disk()
+    assert sqlite_storage.read_current().to_nested() == {
+        "2026": {"4": {"4": ["ours"], "5": ["theirs"], "6": ["more"]}}
+    }
+    assert not sqlite_storage.changed_on_disk()
+
+def test_tasks_json_is_imported_once(paths):
+    db_file, json_file = paths
+    with open(json_file, "w") as f:
+        json.dump(DATA, f)
+    storage = SqliteStorage(db_file, json_file)
+    assert storage.load().to_nested() == DATA
+    storage.save(TaskTable())
+    storage.close()
+    # tasks.json is still there, but it isn't imported again
+    storage = SqliteStorage(db_file, json_file)
+    assert len(storage.load()) == 0
+    storage.close()
+
+def test_edits_are_committed_right_away(sqlite_storage):
+    sqlite_storage.load()
+    sqlite_storage.write_changes([TaskChange("add", date(2026, 4, 4).toordinal(), "now", ("now",), ())])
+    other = sqlite3.connect(sqlite_storage.db_file)
+    assert other.execute("SELECT task FROM tasks").fetchall() == [("now",)]
+    other.close()
+
+@pytest.mark.parametrize("name, kind", [
+    ("sharded", ShardedStorage), ("json", JsonStorage), ("sqlite", SqliteStorage), ("unknown", ShardedStorage),
+])
+def test_create_storage(name, kind):
+    assert type(create_storage(name)) is kind
@@ -0,0 +1,150 @@
+"""Three-way merge of a date's tasks, and two instances sharing the same files."""
+import threading
+import types
+from datetime import date
+
+import pytest
+
+import year_planner
+from task_store import JsonStorage, SqliteStorage, TaskChange, TaskStore
+from task_sync import FileLock, merge_task_lists
+
+@pytest.mark.parametrize("base, ours, theirs, merged", [
+    # One side unchanged: the other side wins
+    (("a",), ("a", "b"), ("a",), ("a", "b")),
+    (("a",), ("a",), ("a", "c"), ("a", "c")),
+    (("a", "b"), ("b", "a"), ("a", "b"), ("b", "a")),
+    # Both sides made the same edit
+    (("a",), ("a", "b"), ("a", "b"), ("a", "b")),
+    # Additions on both sides: ours first, then theirs
+    (("a",), ("a", "b"), ("a", "c"), ("a", "b", "c")),
+    ((), ("b",), ("c",), ("b", "c")),
+    # The same task added on both sides is kept once
+    (("a",), ("a", "b", "x"), ("a", "x", "c"), ("a", "b", "x", "c")),
+    # A removal on either side is kept
+    (("a", "b", "c"), ("a", "c"), ("a", "b", "c", "d"), ("a", "c", "d")),
+    (("a", "b"), ("a", "b", "c"), ("b",), ("b", "c")),
+    (("a", "b"), ("a",), ("b",), ()),
+    # Duplicate texts are counted, not collapsed
+    (("a", "a"), ("a",), ("a", "a", "b"), ("a", "b")),
+    (("a",), ("a", "a"), ("a", "b"), ("a", "a", "b")),
+])
+def test_merge_task_lists(base, ours, theirs, merged):
+    assert merge_task_lists(base, ours, theirs) == merged
+
+def test_merge_is_symmetric_up_to_the_order_of_additions():
+    base, ours, theirs = ("a", "b", "c"), ("a", "c", "d"), ("b", "c", "e")
+    assert sorted(merge_task_lists(base, ours, theirs)) == sorted(merge_task_lists(base, theirs, ours)) == ["c", "d", "e"]
+
+def add_change(date_obj, base, tasks):
+    return TaskChange("add", date_obj.toordinal(), tasks[-1], tuple(tasks), tuple(base))
+
+def test_a_write_is_merged_onto_the_other_instances_edit(data_dir):
+    day = date(2026, 6, 1)
+    first, second = JsonStorage(str(data_dir / "tasks.json")), JsonStorage(str(data_dir / "tasks.json"))
+    first.load()
+    second.load()
+    first.write_changes([add_change(day, [], ["from first"])])
+    assert second.changed_on_disk()
+    second.write_changes([add_change(day, [], ["from second"])])
+    assert JsonStorage(str(data_dir / "tasks.json")).load().get(day.toordinal()) == ["from second", "from first"]
+
+def test_sqlite_writes_are_merged_onto_the_other_instances_edit(data_dir):
+    day = date(2026, 6, 1)
+    paths = str(data_dir / "tasks.db"), str(data_dir / "tasks.json")
+    first, second = SqliteStorage(*paths), SqliteStorage(*paths)
+    first.load()
+    second.load()
+    assert not second.changed_on_disk()
+    first.write_changes([add_change(day, [], ["from first"])])
+    assert second.changed_on_disk()
+    second.write_changes([add_change(day, [], ["from second"])])
+    assert first.read_current().get(day.toordinal()) == ["from second", "from first"]
+    first.close()
+    second.close()
+
+def test_sync_external_merges_the_other_instances_edits(data_dir):
+    day, other_day = date(2026, 6, 1), date(2026, 6, 2)
+    first = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    second = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    first.load()
+    first.add(day, "shared")
+    second.load()
+    first.add(day, "first")
+    second.delete(day, 1)
+    second.add(other_day, "second")
+
+    assert first.sync_external() == {day, other_day}
+    assert second.sync_external() == {day}
+    for store in (first, second):
+        assert store.tasks.get(day.toordinal()) == ["first"]
+        assert store.tasks.get(other_day.toordinal()) == ["second"]
+        assert [result.date for result in store.search("second")] == [other_day]
+    assert first.sync_external() == set()
+    first.close()
+    second.close()
+
+def test_an_edit_made_between_the_read_and_the_merge_is_kept(data_dir):
+    day = date(2026, 6, 1)
+    first = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    second = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    first.load()
+    first.add(day, "shared")
+    second.load()
+    second.add(day, "theirs")
+    external = first.read_external()
+    assert first.tasks_for(day) == ["shared"]  # Read, not merged yet
+    first.add(day, "mine")
+    assert first.merge_external(external) == {day}
+    assert first.tasks_for(day) == ["shared", "mine", "theirs"]
+    first.close()
+    second.close()
+    reloaded = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    assert reloaded.load().get(day.toordinal()) == ["shared", "mine", "theirs"]
+    reloaded.close()
+
+class ThreadRecordingStorage(JsonStorage):
+    def __init__(self, path):
+        super().__init__(path)
+        self.read_on = []
+
+    def read_current(self):
+        self.read_on.append(threading.current_thread().name)
+        return super().read_current()
+
+def test_the_planner_reads_external_changes_on_a_worker(data_dir, monkeypatch):
+    day = date(2026, 6, 1)
+    store = TaskStore(ThreadRecordingStorage(str(data_dir / "tasks.json")))
+    store.load()
+    other = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    other.load()
+    other.add(day, "theirs")
+    scheduled = []
+    highlighted = []
+    monkeypatch.setattr(year_planner, "store", store)
+    monkeypatch.setattr(year_planner, "external_reader", None)
+    monkeypatch.setattr(year_planner, "gui", types.SimpleNamespace(after=lambda ms, f, *args: scheduled.append((f, args))),
+                        raising=False)
+    monkeypatch.setattr(year_planner, "highlight_dates", highlighted.append)
+    monkeypatch.setattr(year_planner, "selected_date_var", types.SimpleNamespace(get=lambda: ""), raising=False)
+    year_planner.poll_external_changes()
+    [(merge, (reader,))] = scheduled
+    reader.join(5)
+    merge(reader)
+    assert store.storage.read_on == ["external-changes"]
+    assert highlighted == [{day}] and store.tasks_for(day) == ["theirs"]
+    assert scheduled[-1] == (year_planner.poll_external_changes, ())
+    assert year_planner.external_reader is None
+    store.close()
+    other.close()
+
+def test_file_lock_excludes_another_holder(tmp_path):
+    path = str(tmp_path / "tasks.json.lock")
+    holder, waiter = FileLock(path), FileLock(path, timeout=0.1)
+    with holder:
+        with pytest.raises(TimeoutError):
+            waiter.acquire()
+    with waiter:
+        pass
+    holder.close()
+    waiter.close()
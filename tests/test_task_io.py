@@ -0,0 +1,107 @@
+"""CSV, iCalendar and JSON import and export."""
+import io
+from datetime import date
+
+import pytest
+
+from task_io import (
+    export_csv, export_file, export_ics, fold_ics_line, import_file, import_rows, read_csv, read_ics, read_json,
+    unfold_ics_lines,
+)
+from task_json import TaskFileError
+from task_store import JsonStorage, TaskStore, TaskStoreError
+from task_table import TaskTable
+
+DATA = {
+    "2026": {
+        "1": {"2": ["Pay rent", 'Quote "this", then; that\\'], "10": ["Multi\nline"]},
+        "12": {"31": ["Party \U0001f389"]},
+    },
+    "2025": {"3": {"4": ["Early"]}},
+}
+TABLE = TaskTable.from_nested(DATA)
+
+@pytest.fixture
+def store(data_dir):
+    store = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    store.load()
+    yield store
+    store.close()
+
+def test_csv_round_trip():
+    f = io.StringIO(newline="")
+    assert export_csv(TABLE, f) == 5
+    lines = f.getvalue().splitlines()
+    assert lines[:2] == ["date,task", "2025-03-04,Early"]
+    f.seek(0)
+    assert list(read_csv(f))[0] == ("2025-03-04", "Early")
+
+def test_ics_round_trip():
+    f = io.StringIO(newline="")
+    assert export_ics(TABLE, f) == 5
+    text = f.getvalue()
+    assert text.startswith("BEGIN:VCALENDAR\r\n") and text.endswith("END:VCALENDAR\r\n")
+    assert "UID:20260102-2@year-planner" in text
+    f.seek(0)
+    assert list(read_ics(f)) == [
+        ("2025-03-04", "Early"),
+        ("2026-01-02", "Pay rent"),
+        ("2026-01-02", 'Quote "this", then; that\\'),
+        ("2026-01-10", "Multi\nline"),
+        ("2026-12-31", "Party \U0001f389"),
+    ]
+
+def test_long_lines_are_folded_without_splitting_characters():
+    line = "SUMMARY:" + "\u00e9" * 100
+    folded = fold_ics_line(line)
+    assert all(len(part.encode("utf-8")) <= 75 for part in folded.split("\r\n"))
+    assert list(unfold_ics_lines(io.StringIO(folded))) == [line]
+
+@pytest.mark.parametrize("name", ["tasks.csv", "tasks.ics", "tasks.json"])
+def test_files_round_trip_through_a_store(store, tmp_path, name):
+    path = str(tmp_path / name)
+    assert export_file(TABLE, path) == 5
+    imported, skipped, changed = import_file(store, path)
+    assert (imported, skipped) == (5, 0)
+    assert changed == {date(2025, 3, 4), date(2026, 1, 2), date(2026, 1, 10), date(2026, 12, 31)}
+    assert store.tasks.to_nested() == DATA
+    assert [result.date for result in store.search("rent")] == [date(2026, 1, 2)]
+
+def test_bad_rows_are_skipped(store):
+    rows = [("2026-01-01", "ok"), ("2026-02-30", "bad date"), ("soon", "no date"), ("2026-01-01", "  "),
+            ("2026-01-01", "again")]
+    imported, skipped, changed = import_rows(store, rows, chunk_size=2)
+    assert (imported, skipped) == (2, 3)
+    assert store.tasks_for(date(2026, 1, 1)) == ["ok", "again"]
+
+def test_imports_merge_with_existing_tasks_and_are_persisted(store):
+    store.add(date(2026, 1, 1), "existing")
+    import_rows(store, [("2026-01-01", "imported")])
+    store.close()
+    reloaded = TaskStore(JsonStorage(store.storage.tasks_file))
+    assert reloaded.load().to_nested() == {"2026": {"1": {"1": ["existing", "imported"]}}}
+    reloaded.close()
+
+def test_rows_read_before_a_failure_are_kept(store):
+    def rows():
+        yield "2026-05-05", "read"
+        raise OSError("connection lost")
+    with pytest.raises(OSError):
+        import_rows(store, rows(), chunk_size=1)
+    assert store.tasks_for(date(2026, 5, 5)) == ["read"]
+
+def test_json_rows_are_streamed_month_by_month(store):
+    text = '{"2026": {"1": {"2": ["a", "b"]}, "2": {"3": ["c"], "4": "not a list"}}}'
+    rows = read_json(io.StringIO(text))
+    assert next(rows) == ("2026-01-02", "a")  # Before the malformed month was parsed
+    with pytest.raises(TaskFileError):
+        import_rows(store, rows, chunk_size=1)
+    assert store.tasks_for(date(2026, 1, 2)) == ["b"]
+
+def test_add_many_rejects_an_invalid_structure(store):
+    with pytest.raises(TaskStoreError):
+        store.add_many({date(2026, 1, 1).toordinal(): "not a list"})
+
+def test_unknown_file_types_are_rejected(store, tmp_path):
+    with pytest.raises(ValueError):
+        export_file(TABLE, str(tmp_path / "tasks.txt"))
@@ -0,0 +1,132 @@
+"""TaskListView shows the tasks of a date a page at a time, checked against a stand-in Text widget."""
+from datetime import date
+
+import pytest
+
+import year_planner
+from task_recurrence import RecurrenceRule
+from year_planner import TaskListView
+
+class FakeText:
+    """
+    Just enough of a tkinter Text: text with per-character tags, and marks
+    with right gravity (text inserted at a mark goes before it).
+    """
+
+    def __init__(self):
+        self.chars = []  # (character, tags)
+        self.marks = {}
+        self.options = {}
+        self.inserts = 0
+
+    def config(self, **options):
+        self.options.update(options)
+
+    def index(self, index):
+        if index == "1.0":
+            return 0
+        if index == "end":
+            return len(self.chars)
+        if index in self.marks:
+            return self.marks[index]
+        tag, _, end = index.rpartition(".")
+        positions = [i for i, (_, tags) in enumerate(self.chars) if tag in tags]
+        return positions[0] if end == "first" else positions[-1] + 1
+
+    def insert(self, index, text, tags=()):
+        position = self.index(index)
+        tags = (tags,) if isinstance(tags, str) else tuple(tags)
+        self.chars[position:position] = [(char, tags) for char in text]
+        for name, mark in self.marks.items():
+            if mark >= position:
+                self.marks[name] = mark + len(text)
+        self.inserts += 1
+
+    def delete(self, first, last):
+        start, stop = self.index(first), self.index(last)
+        del self.chars[start:stop]
+        for name, mark in self.marks.items():
+            if mark > start:
+                self.marks[name] = max(start, mark - (stop - start))
+
+    def mark_set(self, name, index):
+        self.marks[name] = self.index(index)
+
+    def tag_ranges(self, tag):
+        return tuple(i for i, (_, tags) in enumerate(self.chars) if tag in tags)
+
+    def lines(self):
+        return "".join(char for char, _ in self.chars).splitlines()
+
+class FakeScrollbar:
+    def __init__(self):
+        self.position = None
+
+    def set(self, first, last):
+        self.position = (first, last)
+
+class FakeGui:
+    def __init__(self):
+        self.idle = []
+
+    def after_idle(self, callback):
+        self.idle.append(callback)
+
+    def run_idle(self):
+        idle, self.idle = self.idle, []
+        for callback in idle:
+            callback()
+
+@pytest.fixture
+def view(monkeypatch):
+    gui = FakeGui()
+    monkeypatch.setattr(year_planner, "gui", gui, raising=False)
+    monkeypatch.setattr(year_planner, "TASK_LIST_PAGE_SIZE", 3)
+    view = TaskListView(FakeText(), FakeScrollbar())
+    return view, gui
+
+TASKS = [f"task {n}" for n in range(1, 8)]
+
+def test_the_first_page_is_one_insert(view):
+    view, gui = view
+    view.show(TASKS, [])
+    assert view.text.lines() == ["[ 1 ] task 1", "[ 2 ] task 2", "[ 3 ] task 3",
+                                 "... 4 more tasks, scroll down to show them"]
+    # One insert for the page and one for the note
+    assert view.text.inserts == 2
+
+def test_scrolling_near_the_end_adds_a_page(view):
+    view, gui = view
+    view.show(TASKS, [])
+    view.on_scroll("0.0", "0.5")
+    assert gui.idle == []
+    view.on_scroll("0.2", "0.9")
+    view.on_scroll("0.2", "0.95")  # Already scheduled
+    assert len(gui.idle) == 1
+    assert view.scrollbar.position == ("0.2", "0.95")
+    gui.run_idle()
+    assert view.text.lines()[3:] == ["[ 4 ] task 4", "[ 5 ] task 5", "[ 6 ] task 6",
+                                     "... 1 more tasks, scroll down to show them"]
+    view.on_scroll("0.5", "1.0")
+    gui.run_idle()
+    assert view.text.lines()[-1] == "[ 7 ] task 7"
+    assert view.text.tag_ranges(TaskListView.MORE_TAG) == ()
+    # Everything is shown, so scrolling schedules nothing
+    view.on_scroll("0.5", "1.0")
+    assert gui.idle == []
+
+def test_recurring_tasks_come_first(view):
+    view, gui = view
+    rule = RecurrenceRule(2, "gym", "daily", date(2026, 1, 1), None, 1, ())
+    view.show(["one"], [rule])
+    lines = view.text.lines()
+    assert lines[0].startswith("[ R2 ] gym (")
+    assert lines[1:] == ["[ 1 ] one"]
+
+def test_a_date_without_tasks(view):
+    view, gui = view
+    view.show(TASKS, [])
+    view.show((), [])
+    assert view.text.lines() == ["No tasks for this date."]
+    view.on_scroll("0.0", "1.0")
+    assert gui.idle == []
@@ -0,0 +1,60 @@
+"""TaskStore, the GUI-free data layer."""
+import os
+import subprocess
+import sys
+from datetime import date
+
+import pytest
+
+import task_store
+from task_store import JsonStorage, NoTasksError, TaskNumberError, TaskStore, TaskStoreError
+
+@pytest.fixture
+def store(data_dir):
+    store = TaskStore(JsonStorage(str(data_dir / "tasks.json")))
+    store.load()
+    yield store
+    store.close()
+
+DAY = date(2026, 3, 1)
+
+def test_add_delete_and_clear(store):
+    assert store.add(DAY, "  one ") == "one"
+    store.add(DAY, "two")
+    store.add(DAY, "three")
+    assert store.tasks_for(DAY) == ["one", "two", "three"]
+    assert store.days_with_tasks(2026, 3) == [1]
+    assert store.delete(DAY, 2) == "two"
+    assert store.clear(DAY) == 2
+    assert store.tasks_for(DAY) == ()
+    assert len(store.tasks) == 0
+
+def test_edits_survive_a_reload(store):
+    store.add(DAY, "kept")
+    store.add(date(2026, 3, 2), "gone")
+    store.clear(date(2026, 3, 2))
+    reloaded = TaskStore(JsonStorage(store.storage.tasks_file))
+    assert reloaded.load().to_nested() == {"2026": {"3": {"1": ["kept"]}}}
+    reloaded.close()
+
+@pytest.mark.parametrize("edit, error", [
+    (lambda store: store.add(DAY, "   "), TaskStoreError),
+    (lambda store: store.delete(DAY, 1), NoTasksError),
+    (lambda store: store.clear(DAY), NoTasksError),
+])
+def test_invalid_edits_raise(store, edit, error):
+    with pytest.raises(error):
+        edit(store)
+
+@pytest.mark.parametrize("task_no", [0, 2])
+def test_delete_checks_the_task_number(store, task_no):
+    store.add(DAY, "only")
+    with pytest.raises(TaskNumberError):
+        store.delete(DAY, task_no)
+    assert store.tasks_for(DAY) == ["only"]
+
+def test_importing_the_store_does_not_load_the_gui():
+    code = "import sys, task_store; print(sorted(m for m in ('tkinter', 'tkcalendar', 'PIL') if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(task_store.__file__))
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,103 @@
+"""TaskTable: the sorted ordinal list kept in step with the days dict, and the nested JSON layout."""
+import random
+from datetime import date
+
+import pytest
+
+from task_table import (ORDINAL_MAX, ORDINAL_MIN, RESORT_THRESHOLD, TaskTable, date_string, month_bounds,
+                        validate_days, year_bounds)
+
+def ordinal(year, month, day):
+    return date(year, month, day).toordinal()
+
+def assert_consistent(table):
+    assert table.ordinals == sorted(table.days)
+    assert all(table.days.values())
+
+def test_nested_layout_round_trips():
+    nested = {"2025": {"12": {"31": ["a"]}}, "2026": {"1": {"1": ["b", "c"]}, "2": {"28": ["d"]}}}
+    table = TaskTable.from_nested(nested)
+    assert table.ordinals == [ordinal(2025, 12, 31), ordinal(2026, 1, 1), ordinal(2026, 2, 28)]
+    assert table.to_nested() == nested
+
+def test_from_nested_skips_empty_and_impossible_dates():
+    table = TaskTable.from_nested({"2026": {"2": {"30": ["never"], "1": [], "2": ["kept"]}}})
+    assert dict(table.items()) == {ordinal(2026, 2, 2): ["kept"]}
+
+def test_edits_keep_the_ordinals_sorted():
+    table = TaskTable()
+    table.append(ordinal(2026, 3, 2), "b")
+    table.append(ordinal(2026, 3, 1), "a")
+    table.append(ordinal(2026, 3, 2), "c")
+    table.set_day(ordinal(2026, 1, 1), ["new year"])
+    table.set_day(ordinal(2026, 3, 1), [])
+    table.remove_day(ordinal(2030, 1, 1))  # Not there
+    assert_consistent(table)
+    assert dict(table.items()) == {ordinal(2026, 1, 1): ["new year"], ordinal(2026, 3, 2): ["b", "c"]}
+    assert len(table) == 2
+    assert table.get(ordinal(2026, 3, 1)) == ()
+
+@pytest.mark.parametrize("count", [3, RESORT_THRESHOLD + 1])
+def test_bulk_updates_match_single_updates(count):
+    rng = random.Random(count)
+    start = TaskTable({ordinal(2026, 1, day): [str(day)] for day in range(1, 29, 2)})
+    changes = {ordinal(2026, 1, 1) + rng.randrange(400): rng.choice([[], ["x"], ["x", "y"]]) for _ in range(count)}
+    bulk, single = start.copy(), start.copy()
+    bulk.set_days(changes)
+    for day, tasks in changes.items():
+        single.set_day(day, tasks)
+    assert_consistent(bulk)
+    assert bulk.days == single.days and bulk.ordinals == single.ordinals
+
+@pytest.mark.parametrize("count", [3, RESORT_THRESHOLD + 1])
+def test_extend_days_appends_to_existing_dates(count):
+    table = TaskTable({ordinal(2026, 1, 1): ["a"]})
+    new_days = {ordinal(2026, 1, 1) + offset: [f"t{offset}"] for offset in range(count)}
+    new_days[ordinal(2027, 1, 1)] = []
+    table.extend_days(new_days)
+    assert_consistent(table)
+    assert table.get(ordinal(2026, 1, 1)) == ["a", "t0"]
+    assert len(table) == count
+
+def test_copy_has_its_own_index_but_shares_task_lists():
+    table = TaskTable({ordinal(2026, 1, 1): ["a"]})
+    copy = table.copy()
+    copy.set_day(ordinal(2026, 1, 2), ["b"])
+    assert len(table) == 1 and len(copy) == 2
+    assert copy.get(ordinal(2026, 1, 1)) is table.get(ordinal(2026, 1, 1))
+
+def test_range_queries():
+    table = TaskTable({
+        ordinal(2024, 12, 31): ["a"],
+        ordinal(2025, 2, 1): ["b", "c"],
+        ordinal(2025, 2, 28): ["d"],
+        ordinal(2025, 3, 1): ["e"],
+        ordinal(2027, 6, 1): ["f"],
+    })
+    assert table.days_in_month(2025, 2) == [1, 28]
+    assert table.days_in_month(2025, 4) == []
+    assert [day for day, _ in table.range(*month_bounds(2025, 2))] == [ordinal(2025, 2, 1), ordinal(2025, 2, 28)]
+    assert table.years() == [2024, 2025, 2027]
+    assert table.task_count() == 6
+    assert table.task_count(*year_bounds(2025)) == 4
+
+def test_years_at_the_ends_of_the_calendar():
+    table = TaskTable({ORDINAL_MIN: ["first"], ORDINAL_MAX: ["last"]})
+    assert table.years() == [1, 9999]
+
+def test_bounds_and_date_strings():
+    assert month_bounds(2024, 2) == (ordinal(2024, 2, 1), ordinal(2024, 2, 29))
+    assert year_bounds(2026) == (ordinal(2026, 1, 1), ordinal(2026, 12, 31))
+    assert date_string(ordinal(2026, 3, 7)) == "2026-3-7"
+
+@pytest.mark.parametrize("days, valid", [
+    ({ordinal(2026, 1, 1): ["a"]}, True),
+    ({}, True),
+    ([], False),
+    ({"738000": ["a"]}, False),
+    ({ORDINAL_MAX + 1: ["a"]}, False),
+    ({ordinal(2026, 1, 1): "a"}, False),
+    ({ordinal(2026, 1, 1): [1]}, False),
+])
+def test_validate_days(days, valid):
+    assert validate_days(days) is valid
@@ -0,0 +1,111 @@
+"""The streaming tasks.json reader and the quarantine of malformed entries."""
+import io
+import json
+import os
+
+import pytest
+
+from task_json import TaskFileError, TasksJsonReader, describe_entry, read_tasks_json
+from task_store import JsonStorage
+
+CHUNK_SIZES = [1, 3, 7, 1 << 20]  # Small ones cut every token somewhere
+
+def read(text, chunk_size):
+    quarantine = []
+    data = TasksJsonReader(io.StringIO(text), quarantine, chunk_size).read()
+    return data, [describe_entry(entry) for entry in quarantine]
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_clean_file_reads_like_json_load(chunk_size):
+    data = {
+        "2025": {"12": {"31": ["party"]}},
+        "2026": {str(month): {str(day): [f"task {month}/{day}", "\u00e9 \U0001f600 \"quoted\""] for day in range(1, 29)}
+                 for month in range(1, 13)},
+    }
+    for text in (json.dumps(data), json.dumps(data, indent=4)):
+        assert read(text, chunk_size) == (data, [])
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_recovery_stays_inside_the_month(chunk_size):
+    # The "}" closes the month early; the next month must not be read as one of its days
+    text = '{"2026": {"3": {"1": ["a"], "2": [1, 2 }, "4": {"5": ["ok"]}}}'
+    assert read(text, chunk_size) == ({"2026": {"3": {"1": ["a"]}, "4": {"5": ["ok"]}}}, ["2026/3/2: not valid JSON"])
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_only_the_broken_days_of_a_month_are_left_out(chunk_size):
+    text = '{"2026": {"3": {"1": ["a"], "2": ["b" "c"], "3": ["d"], "4": "e"}, "4": {"1": ["f"] "2": ["g"]}}}'
+    assert read(text, chunk_size) == ({"2026": {"3": {"1": ["a"], "3": ["d"]}, "4": {"1": ["f"]}}}, [
+        "2026/3/2: not valid JSON",
+        "2026/3/4: not a list of task texts",
+        "2026/4: an entry is not valid JSON",
+    ])
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_malformed_days_are_left_out(chunk_size):
+    text = '{"2026": {"3": {"1": ["a"], "2": "b", "x": ["c"], "3": [["d"]], "4": [5]}}}'
+    assert read(text, chunk_size) == ({"2026": {"3": {"1": ["a"]}}}, [
+        "2026/3/2: not a list of task texts",
+        "2026/3/x: day is not a number",
+        "2026/3/3: not a list of task texts",
+        "2026/3/4: not a list of task texts",
+    ])
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_malformed_years_and_months_are_left_out(chunk_size):
+    text = '{"2026": {"x": {"1": ["a"]}, "4": [], "5": {"1": ["b"]}}, "y": {}, "2027": 5}'
+    assert read(text, chunk_size) == ({"2026": {"5": {"1": ["b"]}}}, [
+        "2026/x: month is not a number",
+        "2026/4: not an object of days",
+        "y: year is not a number",
+        "2027: not an object of months",
+    ])
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_text_that_is_not_json_is_skipped(chunk_size):
+    text = '{"2026": {"3": {"1": ["a"]}, oops, "4": {"2": ["b"]}}}'
+    assert read(text, chunk_size) == (
+        {"2026": {"3": {"1": ["a"]}, "4": {"2": ["b"]}}},
+        ["2026: an entry is not valid JSON"],
+    )
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_a_cut_off_file_keeps_everything_before_the_cut(chunk_size):
+    data, problems = read('{"2026": {"3": {"1": ["a"], "2": ["b", "c', chunk_size)
+    assert data == {"2026": {"3": {"1": ["a"]}}}
+    assert problems == ["2026/3/2: the file ends in the middle of this entry"]
+    data, problems = read('{"2026": {"3": {"1": ["a"]}, "4": {"1": ["b"]}, "5": {"1"', chunk_size)
+    assert (data["2026"]["3"], data["2026"]["4"]) == ({"1": ["a"]}, {"1": ["b"]})
+    assert problems == ["2026/5: the file ends in the middle of this entry"]
+
+@pytest.mark.parametrize("text, problem", [
+    ("", "(top level): the file is empty"),
+    ("  \n", "(top level): the file is empty"),
+    ("[1, 2]", "(top level): not an object of years"),
+    ('{"2026": {"3": {"1": ["a"]}}} trailing', "(top level): text after the end of the tasks"),
+])
+def test_problems_with_the_whole_file(text, problem):
+    assert read(text, 1 << 20)[1] == [problem]
+
+def test_without_a_quarantine_the_first_problem_raises():
+    with pytest.raises(TaskFileError, match="2026/3/2: not a list of task texts"):
+        read_tasks_json(io.StringIO('{"2026": {"3": {"1": ["a"], "2": "b"}}}'))
+    assert read_tasks_json(io.StringIO('{"2026": {"3": {"1": ["a"]}}}')) == {"2026": {"3": {"1": ["a"]}}}
+
+def test_storage_backs_up_and_rewrites_a_file_with_malformed_entries(data_dir):
+    tasks_file = data_dir / "tasks.json"
+    original = '{"2026": {"3": {"1": ["a"], "2": "b"}, "4": {"5": ["ok"]}}}'
+    tasks_file.write_text(original)
+    storage = JsonStorage(str(tasks_file))
+    tasks = storage.load()
+    assert tasks.to_nested() == {"2026": {"3": {"1": ["a"]}, "4": {"5": ["ok"]}}}
+    assert [describe_entry(entry) for entry in storage.quarantined] == ["2026/3/2: not a list of task texts"]
+    assert storage.backup_path == str(tasks_file) + ".backup"
+    with open(storage.backup_path) as f:
+        assert f.read() == original
+    with open(tasks_file) as f:
+        assert json.load(f) == {"2026": {"3": {"1": ["a"]}, "4": {"5": ["ok"]}}}
+    # The rewritten file is clean, so the next load has nothing to quarantine
+    again = JsonStorage(str(tasks_file))
+    again.load()
+    assert again.quarantined == [] and again.backup_path is None
+    assert os.path.exists(storage.backup_path)
@@ -1,35 +1,57 @@
+import sys
+
+if __name__ == "__main__":
+    # Command-line mode (add, list, delete, ...) never loads tkinter, tkcalendar or PIL
+    import task_cli
+    if task_cli.is_cli_command(sys.argv[1:]):
+        sys.exit(task_cli.main(sys.argv[1:]))
+
 import tkinter as tk
-from tkinter import messagebox, ttk
+from tkinter import filedialog, messagebox, ttk
 from tkcalendar import Calendar
-import json
+import argparse
+import calendar
+import functools
+import logging
 import os
-from PIL import Image
-from datetime import datetime, date
-import webbrowser
-import tempfile
+from datetime import datetime, date, timedelta
+import time
+import queue
+from task_store import (TaskStore, TaskStoreError, NoTasksError, TaskNumberError, BackgroundLoader,
+                        ArchiveSearch, ExternalChangeReader, build_index, dates_in_range)
+from task_io import import_file, export_file
+from task_json import describe_entry
+from task_recurrence import WEEKDAY_NAMES, describe_rule
+from task_table import TaskTable
+from task_counts import heat_level
+from task_html import TaskOverview
+from task_server import TaskServer
+from instrumentation import configure_logging, enable_metrics, span, LOG_LEVEL
 
 # Constants
-APP_NAME = "Year_Planner"  # Name of your application
-APP_DATA_DIR = os.path.join(os.path.expanduser("~"), "Documents", APP_NAME)
-TASKS_FILE = os.path.join(APP_DATA_DIR, "tasks.json")
 ICON_PATH = os.path.join(os.path.expanduser("~"), "Desktop", "blank.ico")  # Update this path if necessary
+EXTERNAL_CHANGE_POLL_MS = 2000  # How often to check for edits made by another running instance
+TASK_LIST_PAGE_SIZE = 200  # Task lines shown at a time; more are added when scrolling down
+TASK_LIST_PREFETCH = 0.8  # Add the next page once the bottom of the view passes this fraction
+QUARANTINE_REPORT_LIMIT = 10  # Malformed saved entries listed in the load warning
+HEATMAP_TAB = 12  # Notebook index of the year heatmap tab, after the twelve month tabs
+HEAT_COLORS = ("#d6ecf7", "#a8d4ee", "#5dade2", "#1f5f8b")  # Shades of heat levels 1 to 4 (task_counts.HEAT_THRESHOLDS)
+LOAD_POLL_MS = 50  # How often to check for results of the startup load while it runs
+
+logger = logging.getLogger("year_planner")
 
 # Function to create a blank (transparent) ICO file if it doesn't exist
 def create_blank_ico(path):
+    from PIL import Image  # Only needed when the icon has to be created
     directory = os.path.dirname(path)
     if not os.path.exists(directory):
         os.makedirs(directory)
-        print(f"Created directory for icon at {directory}")
+        logger.info("Created directory for icon at %s", directory)
     if not os.path.exists(path):
         size = (16, 16)  # Size of the icon
         image = Image.new("RGBA", size, (255, 255, 255, 0))  # Transparent image
         image.save(path, format="ICO")
-        print(f"Created blank icon at {path}")
-
-create_blank_ico(ICON_PATH)
-
-# Initialize tasks data structure
-tasks_data = {}
+        logger.info("Created blank icon at %s", path)
 
 def inputError(task):
     """Validate that the task input is not empty."""
@@ -38,111 +60,416 @@ def inputError(task):
         return False
     return True
 
-def validate_tasks_data(data):
-    """Validate the structure of tasks_data."""
-    if not isinstance(data, dict):
-        return False
-    for year, months in data.items():
-        if not isinstance(year, str) or not year.isdigit():
-            return False
-        if not isinstance(months, dict):
-            return False
-        for month, days in months.items():
-            if not isinstance(month, str) or not month.isdigit():
-                return False
-            if not isinstance(days, dict):
-                return False
-            for day, tasks in days.items():
-                if not isinstance(day, str) or not day.isdigit():
-                    return False
-                if not isinstance(tasks, list):
-                    return False
-                for task in tasks:
-                    if not isinstance(task, str):
-                        return False
-    return True
+store = TaskStore()
+save_errors = queue.Queue()  # Write errors reported by the background writer thread
+startup_loader = None  # BackgroundLoader of the startup load, until its tasks are installed
+pending_actions = []  # (action, args) of user actions taken while the tasks were loading
+searched_query = ""  # Search box text the search results are listed for
+archive_search = None  # ArchiveSearch for searched_query, once Enter was pressed in the search box
+save_error_shown = False  # The status line shows a write error until every edit is written
+external_reader = None  # ExternalChangeReader checking for another instance's edits, while one runs
 
-def load_tasks():
-    """Load tasks_data from the JSON file with validation and backup."""
-    global tasks_data
-    if os.path.exists(TASKS_FILE):
+def when_loaded(action):
+    """
+    Wrap a widget callback so that while the startup load runs it is queued
+    instead of acting on a store without tasks; queued actions run in order
+    once the tasks are in.
+    """
+    @functools.wraps(action)
+    def run_or_queue(*args):
+        if startup_loader is None:
+            return action(*args)
+        pending_actions.append((action, args))
+        loading_var.set(f"Loading tasks... ({len(pending_actions)} action(s) waiting)")
+    return run_or_queue
+
+def show_save_error(e):
+    """Report a failed write of the tasks."""
+    messagebox.showerror("Save Error", f"An error occurred while saving tasks:\n{e}")
+    logger.error("Error saving tasks: %s", e)
+
+def poll_save_errors():
+    """
+    Show write errors from the background writer on the Tk thread. The last
+    one stays on the status line until the unsaved edits have been written.
+    """
+    global save_error_shown
+    try:
+        while True:
+            error = save_errors.get_nowait()
+            show_save_error(error)
+            loading_var.set(f"Edits not saved: {error}")
+            save_error_shown = True
+    except queue.Empty:
+        pass
+    if save_error_shown and not store.dirty:
+        loading_var.set("")
+        save_error_shown = False
+    gui.after(500, poll_save_errors)
+
+def poll_external_changes():
+    """
+    Check for edits another Year Planner made to the same files on a worker
+    thread, which also reads them; see merge_external_changes.
+    """
+    global external_reader
+    external_reader = ExternalChangeReader(store)
+    gui.after(LOAD_POLL_MS, merge_external_changes, external_reader)
+
+def merge_external_changes(reader):
+    """Merge in the edits a reader found once it is done, redraw the dates they touched and poll again."""
+    global external_reader
+    try:
+        kind, result = reader.results.get_nowait()
+    except queue.Empty:
+        gui.after(LOAD_POLL_MS, merge_external_changes, reader)
+        return
+    external_reader = None
+    changed_dates = set()
+    if kind == "tasks" and result is not None:
         try:
-            with open(TASKS_FILE, 'r') as f:
-                loaded_data = json.load(f)
-                print("Type of loaded_data:", type(loaded_data))  # Debugging line
-                print("Content of loaded_data:", loaded_data)     # Debugging line
-                if validate_tasks_data(loaded_data):
-                    tasks_data = loaded_data
-                    print("tasks.json loaded successfully.")
-                else:
-                    raise ValueError("tasks.json has an invalid structure.")
+            changed_dates = store.merge_external(result)
         except Exception as e:
-            # Backup the corrupted file
-            backup_path = TASKS_FILE + ".backup"
-            try:
-                os.rename(TASKS_FILE, backup_path)
-                print(f"Corrupted tasks.json backed up as {backup_path}")
-            except Exception as rename_error:
-                print(f"Failed to backup corrupted tasks.json: {rename_error}")
-            messagebox.showerror(
-                "Load Error",
-                f"tasks.json is corrupted or invalid.\nA backup has been created at {backup_path}.\nResetting tasks."
-            )
-            tasks_data = {}
-    else:
-        tasks_data = {}
-        print("tasks.json does not exist. Starting with an empty tasks_data.")
-    print("Loaded tasks_data:", json.dumps(tasks_data, indent=4))  # Debugging line
+            logger.warning("Could not merge tasks changed by another instance: %s", e)
+    if changed_dates:
+        logger.info("Merged changes to %d date(s) made by another instance.", len(changed_dates))
+        highlight_dates(changed_dates)
+        try:
+            selected_date = datetime.strptime(selected_date_var.get(), "%Y-%m-%d").date()
+        except ValueError:
+            selected_date = None
+        if selected_date in changed_dates:
+            display_tasks_for_selected_date(selected_date)
+    gui.after(EXTERNAL_CHANGE_POLL_MS, poll_external_changes)
 
-def save_tasks():
-    """Save the tasks_data to the JSON file atomically."""
+def start_loading(years=None):
+    """
+    Load the tasks (only the given years, if the backend can) on a worker
+    thread. The window is usable meanwhile; see install_loaded_tasks.
+    """
+    global startup_loader
+    startup_loader = BackgroundLoader(store, years)
+    loading_var.set("Loading tasks...")
+    task_list.show_message("Loading tasks...")
+    gui.after(LOAD_POLL_MS, poll_loader, startup_loader)
+
+def poll_loader(loader):
+    """Take the loader's results on the Tk thread: the tasks first, then the search index."""
     try:
-        # Ensure the application data directory exists
-        if not os.path.exists(APP_DATA_DIR):
-            os.makedirs(APP_DATA_DIR)
-            print(f"Created application data directory at {APP_DATA_DIR}")
-        
-        temp_file = TASKS_FILE + ".tmp"
-        with open(temp_file, 'w') as f:
-            json.dump(tasks_data, f, indent=4)
-        os.replace(temp_file, TASKS_FILE)  # Atomic operation
-        print(f"tasks.json saved successfully at {TASKS_FILE}")
-    except Exception as e:
-        messagebox.showerror("Save Error", f"An error occurred while saving tasks:\n{e}")
-        print(f"Error saving tasks.json: {e}")
+        while True:
+            kind, result = loader.results.get_nowait()
+            if kind == "tasks":
+                install_loaded_tasks(result)
+            elif kind == "index":
+                install_search_index(result)
+                return
+            else:
+                load_failed(result)
+                return
+    except queue.Empty:
+        pass
+    gui.after(LOAD_POLL_MS, poll_loader, loader)
+
+def install_loaded_tasks(loaded):
+    """Put the loaded tasks in place and show them, the visible month and the selected date first."""
+    global startup_loader
+    with span("load.install"):
+        store.install(loaded)
+    startup_loader = None
+    logger.info("Loaded tasks for %d date(s) in %.1f ms.", len(store.tasks), (time.perf_counter() - startup_started) * 1000)
+    loading_var.set("Indexing tasks for search...")
+    report_load_problems()
+    show_loaded_tasks()
+
+def install_search_index(index):
+    """Use the index the loader built and run a search typed while it was being built."""
+    store.install_index(index)
+    loading_var.set("")
+    logger.info("Search index ready in %.1f ms.", (time.perf_counter() - startup_started) * 1000)
+    if searchField.get().strip():
+        on_search()
+
+def load_failed(e):
+    """Handle a failed startup load: without tasks, start over empty; without the index, build it here."""
+    global startup_loader
+    loading_var.set("")
+    if startup_loader is None:
+        store.install_index(build_index(store.tasks))
+        return
+    startup_loader = None
+    messagebox.showerror("Load Error", f"An error occurred while loading tasks:\n{e}\nResetting tasks.")
+    store.tasks = TaskTable()
+    show_loaded_tasks()
 
-def highlight_dates():
+def show_loaded_tasks():
     """
-    Highlight dates in the calendar that have tasks.
+    Start writing and merging edits, then redraw: the visible month and the
+    selected date now, the other built months and the actions queued while
+    loading once Tk is idle.
+    """
+    store.start_writer(on_error=save_errors.put)
+    gui.after(EXTERNAL_CHANGE_POLL_MS, poll_external_changes)
+    try:
+        month = notebook.index(notebook.select()) + 1
+    except tk.TclError:
+        month = None
+    if month in calendar_tabs and calendar_tabs[month]['widget'] is not None:
+        with span("highlight"):
+            highlight_manager.sync_tab(month)
+    try:
+        selected_date = datetime.strptime(selected_date_var.get(), "%Y-%m-%d").date()
+    except ValueError:
+        selected_date = default_selected_date
+    display_tasks_for_selected_date(selected_date)
+    gui.after_idle(highlight_dates)
+    gui.after_idle(run_pending_actions)
+
+def run_pending_actions():
+    """Run the user actions queued while the tasks were loading, in the order they were taken."""
+    actions = pending_actions[:]
+    pending_actions.clear()
+    for action, args in actions:
+        action(*args)
+
+def report_load_problems():
+    """Tell about malformed entries left out, or a damaged file backed up, while loading."""
+    if store.quarantined:
+        warn_quarantined(store.quarantined)
+    elif store.backup_path:
+        messagebox.showerror(
+            "Load Error",
+            f"The saved tasks are corrupted or invalid.\nA backup has been created at {store.backup_path}.\nResetting tasks."
+        )
+
+def warn_quarantined(entries):
+    """Tell which malformed saved entries were left out while loading; the rest of the tasks loaded."""
+    listed = "\n".join(describe_entry(entry) for entry in entries[:QUARANTINE_REPORT_LIMIT])
+    if len(entries) > QUARANTINE_REPORT_LIMIT:
+        listed += f"\n... and {len(entries) - QUARANTINE_REPORT_LIMIT} more"
+    messagebox.showwarning(
+        "Load Warning",
+        f"Some saved tasks are malformed and were left out:\n{listed}\n"
+        f"The original file has been backed up at {store.backup_path}."
+    )
+
+class HighlightManager:
     """
-    for cal in calendar_tabs.values():
+    Keep track of the dates highlighted in each calendar tab.
+    Dates are shaded by their number of tasks (see HEAT_COLORS). Only dates
+    whose shade changed get their calevent replaced, and widget refreshes
+    are batched into one idle callback.
+    """
+
+    def __init__(self):
+        self.events = {}  # tab month -> {date: (calevent id, heat level)}
+        self.dirty_widgets = set()
+        self.refresh_pending = False
+
+    def sync_tab(self, month, days=None):
+        """
+        Bring the highlights of one tab in line with the task counts.
+        If days is given, only those days of the tab's month are checked.
+        """
+        cal = calendar_tabs[month]
         year = cal['year']
-        month = cal['month']
         cal_widget = cal['widget']
-        
-        # Remove existing 'task' tags to prevent duplication
-        cal_widget.calevent_remove('task', date=None)  # Remove all 'task' events
-        
-        # Collect dates with tasks
-        dates_with_tasks = []
-        if str(year) in tasks_data and str(month) in tasks_data[str(year)]:
-            dates_with_tasks = [int(day) for day in tasks_data[str(year)][str(month)]]
-        
-        # Apply tags
-        for day in dates_with_tasks:
+        if month not in self.events:
+            self.events[month] = {}
+            # One tag per heat level, darker for busier dates
+            for level, color in enumerate(HEAT_COLORS, start=1):
+                cal_widget.tag_config(f'task{level}', background=color,
+                                      foreground='white' if level == len(HEAT_COLORS) else 'black')
+        events = self.events[month]
+
+        counts = store.day_counts(year, cal['month'])
+        if days is None:
+            current = set(events)
+        else:
+            counts = {day: counts[day] for day in days if day in counts}
+            current = {d for d in events if d.year == year and d.month == cal['month'] and d.day in days}
+        wanted = {}
+        for day, task_count in counts.items():
             try:
-                date_obj = date(year, month, day)  # Ensure it's a datetime.date instance
-                cal_widget.calevent_create(date_obj, 'Task', 'task')  # Pass date_obj directly
-                print(f"Highlighting date: {date_obj}")  # Debugging line
-            except Exception as e:
-                print(f"Error highlighting date {year}-{month}-{day}: {e}")
-        
-        # Configure the 'task' tag to have a different background color
-        cal_widget.tag_config('task', background='lightblue', foreground='black')
-        
-        # Refresh the calendar to display changes
-        cal_widget.update_idletasks()
+                wanted[date(year, cal['month'], day)] = heat_level(task_count)
+            except ValueError as e:
+                logger.warning("Error highlighting date %s-%s-%s: %s", year, cal['month'], day, e)
+
+        changed = False
+        for date_obj in current:
+            if events[date_obj][1] != wanted.get(date_obj):
+                cal_widget.calevent_remove(events.pop(date_obj)[0])
+                changed = True
+        for date_obj, level in wanted.items():
+            if date_obj not in events:
+                events[date_obj] = (cal_widget.calevent_create(date_obj, 'Task', f'task{level}'), level)
+                changed = True
+        if changed:
+            self.schedule_refresh(cal_widget)
+
+    def schedule_refresh(self, cal_widget):
+        """Refresh every touched calendar once, when Tk is idle."""
+        self.dirty_widgets.add(cal_widget)
+        if not self.refresh_pending:
+            self.refresh_pending = True
+            gui.after_idle(self.refresh)
+
+    def refresh(self):
+        for cal_widget in self.dirty_widgets:
+            cal_widget.update_idletasks()
+        self.dirty_widgets.clear()
+        self.refresh_pending = False
+
+highlight_manager = HighlightManager()
+
+def highlight_dates(dates=None):
+    """
+    Highlight dates in the calendar that have tasks.
+    If dates is given, only those dates are re-checked.
+    """
+    with span("highlight"):
+        highlight_tabs(dates)
+    if year_heatmap is not None:
+        year_heatmap.schedule_draw()
+
+def highlight_tabs(dates):
+    """Sync the highlights of all built tabs, or only of the given dates."""
+    if dates is None:
+        for month, cal in calendar_tabs.items():
+            if cal['widget'] is not None:  # Unbuilt tabs are highlighted when built
+                highlight_manager.sync_tab(month)
+        return
+    for date_obj in dates:
+        cal = calendar_tabs.get(date_obj.month)
+        if cal is not None and cal['widget'] is not None and cal['year'] == date_obj.year:
+            highlight_manager.sync_tab(date_obj.month, [date_obj.day])
+
+class YearHeatmap:
+    """
+    The year-at-a-glance tab: one cell per date of the viewed year, a
+    column per week and a row per weekday, shaded like the calendars by the
+    date's number of tasks, with each month's total above its weeks.
+    Clicking a date shows its day, week, month and year totals;
+    double-clicking it shows the date. The tab is drawn when it is shown,
+    and again after a change while it is shown.
+    """
+
+    CELL = 10  # Side of a date's cell, in pixels
+    STEP = 12  # Cell plus gap
+    LEFT = 30  # Room for the weekday names
+    TOP = 18  # Room for the month totals
+    COLUMNS = 54  # Weeks a year can touch
+
+    def __init__(self, frame):
+        self.title_var = tk.StringVar()
+        tk.Label(frame, textvariable=self.title_var, bg="#f0f0f0", font=("Arial", 10)).pack(pady=(5, 0), padx=5, anchor='w')
+        self.canvas = tk.Canvas(frame, width=self.LEFT + self.COLUMNS * self.STEP, height=self.TOP + 9 * self.STEP,
+                                bg="white", highlightthickness=0)
+        self.canvas.pack(padx=5, pady=5, anchor='w')
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<Double-Button-1>", self.on_double_click)
+        self.status_var = tk.StringVar()
+        tk.Label(frame, textvariable=self.status_var, bg="#f0f0f0", font=("Arial", 10)).pack(padx=5, anchor='w')
+        self.year = None
+        self.first_monday = None  # Ordinal of the Monday of the first column
+        self.drawn = None  # (year, store generation) of the last drawing
+        self.draw_pending = False
+
+    def shown(self):
+        try:
+            return notebook.index(notebook.select()) == HEATMAP_TAB
+        except tk.TclError:
+            return False
+
+    def schedule_draw(self):
+        """Redraw once Tk is idle, if the tab is shown."""
+        if not self.draw_pending and self.shown():
+            self.draw_pending = True
+            gui.after_idle(self.draw)
+
+    def draw(self):
+        """Draw the viewed year, unless it is drawn already and nothing changed since."""
+        self.draw_pending = False
+        year = calendar_tabs[1]['year']
+        if self.drawn == (year, store.generation):
+            return
+        with span("heatmap.draw"):
+            canvas = self.canvas
+            canvas.delete("all")
+            self.year = year
+            self.first_monday = date(year, 1, 1).toordinal() - date(year, 1, 1).weekday()
+            for weekday in (0, 2, 4):
+                canvas.create_text(self.LEFT - 4, self.TOP + weekday * self.STEP + self.CELL // 2,
+                                   text=WEEKDAY_NAMES[weekday][:3], anchor='e', font=("Arial", 7))
+            year_total = 0
+            for month in range(1, 13):
+                month_first = date(year, month, 1).toordinal()
+                month_total = store.month_count(year, month)
+                year_total += month_total
+                canvas.create_text(self.LEFT + (month_first - self.first_monday) // 7 * self.STEP, self.TOP - 9,
+                                   text=f"{calendar.month_abbr[month]} {month_total}", anchor='w', font=("Arial", 7))
+                counts = store.day_counts(year, month)
+                for day in range(1, calendar.monthrange(year, month)[1] + 1):
+                    self.draw_cell(month_first + day - 1, heat_level(counts.get(day, 0)))
+            # Legend, from no tasks to the busiest shade
+            legend_top = self.TOP + 7.5 * self.STEP
+            for level in range(len(HEAT_COLORS) + 1):
+                x = self.LEFT + (self.COLUMNS - len(HEAT_COLORS) - 1 + level) * self.STEP
+                canvas.create_rectangle(x, legend_top, x + self.CELL, legend_top + self.CELL,
+                                        fill=HEAT_COLORS[level - 1] if level else "#eeeeee", outline="")
+            canvas.create_text(self.LEFT + (self.COLUMNS - len(HEAT_COLORS) - 1) * self.STEP - 4,
+                               legend_top + self.CELL // 2, text="Fewer", anchor='e', font=("Arial", 7))
+        self.title_var.set(f"{year}: {year_total} task(s)")
+        self.status_var.set("Click a date for its totals, double-click it to show it.")
+        self.drawn = (year, store.generation)
+
+    def draw_cell(self, ordinal, level):
+        column, row = divmod(ordinal - self.first_monday, 7)
+        x = self.LEFT + column * self.STEP
+        y = self.TOP + row * self.STEP
+        self.canvas.create_rectangle(x, y, x + self.CELL, y + self.CELL,
+                                     fill=HEAT_COLORS[level - 1] if level else "#eeeeee", outline="")
+
+    def date_at(self, x, y):
+        """Return the date of the cell at canvas position (x, y), or None."""
+        if self.year is None or x < self.LEFT or y < self.TOP:
+            return None
+        column = int((x - self.LEFT) // self.STEP)
+        row = int((y - self.TOP) // self.STEP)
+        if row > 6:
+            return None
+        date_obj = date.fromordinal(self.first_monday + column * 7 + row)
+        return date_obj if date_obj.year == self.year else None
+
+    def on_click(self, event):
+        date_obj = self.date_at(event.x, event.y)
+        if date_obj is None:
+            return
+        day = store.day_counts(date_obj.year, date_obj.month).get(date_obj.day, 0)
+        self.status_var.set(
+            f"{date_obj:%Y-%m-%d}: {day} task(s); week {date_obj.isocalendar()[1]}: {store.week_count(date_obj)}; "
+            f"{date_obj:%B}: {store.month_count(date_obj.year, date_obj.month)}"
+        )
 
+    def on_double_click(self, event):
+        date_obj = self.date_at(event.x, event.y)
+        if date_obj is not None:
+            go_to_date(date_obj)
+
+year_heatmap = None  # YearHeatmap of the year tab, once the window is built
+
+@when_loaded
+def count_tasks_in_range():
+    """Show the number of stored tasks between the two entered dates, from the maintained counts."""
+    first = get_entered_date(countFromField, "the first date")
+    if first is None:
+        return
+    last = get_entered_date(countToField, "the last date")
+    if last is None:
+        return
+    first, last = sorted((first, last))
+    range_count_var.set(f"{store.count_between(first, last)} task(s) from {first} to {last} (without recurring tasks)")
+
+@when_loaded
 def on_date_click(event, cal_widget, selected_date_var):
     """
     Handle date selection and display tasks.
@@ -154,23 +481,91 @@ def on_date_click(event, cal_widget, selected_date_var):
     except Exception as e:
         messagebox.showerror("Date Selection Error", f"An error occurred while selecting the date:\n{e}")
 
+class TaskListView:
+    """
+    Shows the tasks of one date in a Text widget a page at a time, so that a
+    date with thousands of tasks is shown as quickly as one with a few.
+    The next page is added when the view is scrolled near the end of the
+    shown tasks. Each task keeps its position in the date as its number, the
+    number delete_task expects; recurring tasks follow the date's own tasks.
+    """
+
+    END_MARK = "tasks_end"  # Where the next page of tasks goes
+    MORE_TAG = "more_tasks"  # The line telling how many tasks aren't shown yet
+
+    def __init__(self, text, scrollbar):
+        self.text = text
+        self.scrollbar = scrollbar
+        self.tasks = ()
+        self.shown = 0
+        self.page_pending = False
+        text.config(yscrollcommand=self.on_scroll)
+
+    def show(self, tasks, occurrences):
+        """Replace the list with tasks (the date's task list) and occurrences (recurrence rules)."""
+        text = self.text
+        self.tasks = tasks
+        self.shown = 0
+        text.config(state=tk.NORMAL)
+        text.delete("1.0", tk.END)
+        if tasks or occurrences:
+            # Recurring tasks are numbered by rule, e.g. "R2", and deleted for every date at once
+            for rule in occurrences:
+                text.insert(tk.END, f"[ R{rule.rule_id} ] {rule.text} ({describe_rule(rule)})\n", "recurring")
+            text.mark_set(self.END_MARK, tk.END)
+            self.add_page()
+        else:
+            text.insert(tk.END, "No tasks for this date.", "no_task")
+        text.config(state=tk.DISABLED)
+
+    def show_message(self, message):
+        """Replace the list with a note, e.g. while the tasks are loading."""
+        self.tasks = ()
+        self.shown = 0
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert(tk.END, message, "no_task")
+        self.text.config(state=tk.DISABLED)
+
+    def add_page(self):
+        """Insert the next TASK_LIST_PAGE_SIZE tasks at END_MARK, followed by a note on how many are left."""
+        text = self.text
+        start = self.shown
+        stop = min(start + TASK_LIST_PAGE_SIZE, len(self.tasks))
+        if text.tag_ranges(self.MORE_TAG):
+            text.delete(f"{self.MORE_TAG}.first", f"{self.MORE_TAG}.last")
+        if stop > start:
+            lines = "".join(f"[ {idx} ] {task}\n" for idx, task in enumerate(self.tasks[start:stop], start=start + 1))
+            text.insert(self.END_MARK, lines, "task")
+        self.shown = stop
+        left = len(self.tasks) - stop
+        if left:
+            # Inserted at the mark, which moves past it; put the mark back before the note
+            text.insert(self.END_MARK, f"... {left} more tasks, scroll down to show them\n", ("no_task", self.MORE_TAG))
+            text.mark_set(self.END_MARK, f"{self.MORE_TAG}.first")
+
+    def on_scroll(self, first, last):
+        """yscrollcommand of the Text: update the scrollbar and add a page when nearing the end."""
+        self.scrollbar.set(first, last)
+        if self.shown < len(self.tasks) and float(last) >= TASK_LIST_PREFETCH and not self.page_pending:
+            # Not inserted right away: the insert itself calls back here
+            self.page_pending = True
+            gui.after_idle(self.add_pending_page)
+
+    def add_pending_page(self):
+        self.page_pending = False
+        if self.shown < len(self.tasks):
+            self.text.config(state=tk.NORMAL)
+            self.add_page()
+            self.text.config(state=tk.DISABLED)
+
 def display_tasks_for_selected_date(selected_date):
     """
-    Display tasks for the selected date in the TextArea.
-    """
-    TextArea.config(state=tk.NORMAL)
-    TextArea.delete(1.0, tk.END)
-    date_str = selected_date.strftime("%Y-%m-%d")
-    year = str(selected_date.year)
-    month = str(selected_date.month)
-    day = str(selected_date.day)
-    if year in tasks_data and month in tasks_data[year] and day in tasks_data[year][month]:
-        for idx, task in enumerate(tasks_data[year][month][day], start=1):
-            TextArea.insert(tk.END, f"[ {idx} ] {task}\n", "task")
-    else:
-        TextArea.insert(tk.END, "No tasks for this date.", "no_task")
-    TextArea.config(state=tk.DISABLED)
+    Display tasks for the selected date in the TextArea (a page at a time).
+    """
+    task_list.show(store.tasks_for(selected_date), store.occurrences_for(selected_date))
 
+@when_loaded
 def add_task():
     """
     Add a task to the selected date.
@@ -184,30 +579,37 @@ def add_task():
     except ValueError:
         messagebox.showerror("Date Error", "Selected date is invalid. Please select a valid date.")
         return
-    year = str(selected_date.year)
-    month = str(selected_date.month)
-    day = str(selected_date.day)
-    
-    # Initialize nested dictionaries if necessary
-    if year not in tasks_data:
-        tasks_data[year] = {}
-    if month not in tasks_data[year]:
-        tasks_data[year][month] = {}
-    if day not in tasks_data[year][month]:
-        tasks_data[year][month][day] = []
-    
-    tasks_data[year][month][day].append(task)
-    save_tasks()
-    highlight_dates()
+
+    freq = REPEAT_CHOICES.get(repeat_var.get())
+    try:
+        if freq:
+            store.add_recurring(selected_date, task, freq)
+        else:
+            store.add(selected_date, task)
+    except TaskStoreError as e:
+        messagebox.showerror("Input Error", str(e))
+        return
+    except Exception as e:
+        show_save_error(e)
+    # A recurring task can land on any day of the visible year
+    highlight_dates(None if freq else [selected_date])
     display_tasks_for_selected_date(selected_date)
     enterTaskField.delete(0, tk.END)
-    print(f"Added task '{task}' on {selected_date}")
+    if freq:
+        repeat_var.set(REPEAT_NONE)
+        logger.info("Added %s recurring task %r from %s", freq, task, selected_date)
+    else:
+        logger.info("Added task %r on %s", task, selected_date)
 
+@when_loaded
 def delete_task():
     """
     Delete a task from the selected date based on task number.
     """
     task_no_str = taskNumberField.get("1.0", tk.END).strip()
+    if task_no_str[:1] in ("R", "r") and task_no_str[1:].isdigit():
+        delete_recurring_task(int(task_no_str[1:]))
+        return
     if not task_no_str.isdigit():
         messagebox.showerror("Invalid Input", "Please enter a valid task number.")
         return
@@ -218,26 +620,51 @@ def delete_task():
     except ValueError:
         messagebox.showerror("Date Error", "Selected date is invalid. Please select a valid date.")
         return
-    year = str(selected_date.year)
-    month = str(selected_date.month)
-    day = str(selected_date.day)
-    
-    if year in tasks_data and month in tasks_data[year] and day in tasks_data[year][month]:
-        if 1 <= task_no <= len(tasks_data[year][month][day]):
-            removed_task = tasks_data[year][month][day].pop(task_no - 1)
-            if not tasks_data[year][month][day]:
-                del tasks_data[year][month][day]
-            save_tasks()
-            highlight_dates()
-            display_tasks_for_selected_date(selected_date)
-            taskNumberField.delete("1.0", tk.END)
-            messagebox.showinfo("Task Deleted", f"Task '{removed_task}' has been deleted successfully.")
-            print(f"Deleted task '{removed_task}' from {selected_date}")
-        else:
-            messagebox.showerror("Invalid Task Number", "Please enter a valid task number.")
-    else:
-        messagebox.showerror("No Task", "There are no tasks to delete for the selected date.")
 
+    try:
+        removed_task = store.delete(selected_date, task_no)
+    except NoTasksError as e:
+        messagebox.showerror("No Task", str(e))
+        return
+    except TaskNumberError as e:
+        messagebox.showerror("Invalid Task Number", str(e))
+        return
+    except Exception as e:
+        show_save_error(e)
+        removed_task = None
+    highlight_dates([selected_date])
+    display_tasks_for_selected_date(selected_date)
+    taskNumberField.delete("1.0", tk.END)
+    if removed_task is not None:
+        messagebox.showinfo("Task Deleted", f"Task '{removed_task}' has been deleted successfully.")
+        logger.info("Deleted task %r from %s", removed_task, selected_date)
+
+def delete_recurring_task(rule_id):
+    """
+    Delete a recurring task from every date it occurs on.
+    """
+    rule = store.recurrences.rules.get(rule_id)
+    if rule is None:
+        messagebox.showerror("Invalid Task Number", "There is no recurring task with that number.")
+        return
+    if not messagebox.askyesno("Confirm Delete", f"Delete the recurring task '{rule.text}' from every date?"):
+        return
+    try:
+        store.remove_recurring(rule_id)
+    except TaskStoreError as e:
+        messagebox.showerror("Invalid Task Number", str(e))
+        return
+    except Exception as e:
+        show_save_error(e)
+    highlight_dates()
+    try:
+        display_tasks_for_selected_date(datetime.strptime(selected_date_var.get(), "%Y-%m-%d").date())
+    except ValueError:
+        pass
+    taskNumberField.delete("1.0", tk.END)
+    logger.info("Deleted recurring task %r", rule.text)
+
+@when_loaded
 def clear_all_tasks():
     """
     Clear all tasks for the selected date.
@@ -248,247 +675,345 @@ def clear_all_tasks():
     except ValueError:
         messagebox.showerror("Date Error", "Selected date is invalid. Please select a valid date.")
         return
-    year = str(selected_date.year)
-    month = str(selected_date.month)
-    day = str(selected_date.day)
-    
-    if year in tasks_data and month in tasks_data[year] and day in tasks_data[year][month]:
-        if messagebox.askyesno("Confirm Clear", "Are you sure you want to delete all tasks for this date?"):
-            del tasks_data[year][month][day]
-            save_tasks()
-            highlight_dates()
-            display_tasks_for_selected_date(selected_date)
-            messagebox.showinfo("Tasks Cleared", "All tasks for the selected date have been deleted.")
-            print(f"Cleared all tasks from {selected_date}")
-    else:
+
+    if not store.tasks_for(selected_date):
         messagebox.showinfo("No Tasks", "There are no tasks to clear for the selected date.")
+        return
+    if messagebox.askyesno("Confirm Clear", "Are you sure you want to delete all tasks for this date?"):
+        try:
+            store.clear(selected_date)
+        except TaskStoreError as e:
+            messagebox.showinfo("No Tasks", str(e))
+            return
+        except Exception as e:
+            show_save_error(e)
+        highlight_dates([selected_date])
+        display_tasks_for_selected_date(selected_date)
+        messagebox.showinfo("Tasks Cleared", "All tasks for the selected date have been deleted.")
+        logger.info("Cleared all tasks from %s", selected_date)
+
+def get_selected_date():
+    """Return the selected date, or None (after telling the user) if it is invalid."""
+    try:
+        return datetime.strptime(selected_date_var.get(), "%Y-%m-%d").date()
+    except ValueError:
+        messagebox.showerror("Date Error", "Selected date is invalid. Please select a valid date.")
+        return None
+
+def get_entered_date(field, what):
+    """Return the YYYY-MM-DD date typed into field, or None (after telling the user) if it is invalid."""
+    try:
+        return datetime.strptime(field.get().strip(), "%Y-%m-%d").date()
+    except ValueError:
+        messagebox.showerror("Date Error", f"Please enter {what} as YYYY-MM-DD.")
+        return None
+
+@when_loaded
+def add_task_to_range():
+    """
+    Add the entered task to every date from the selected date to the range end,
+    only on the checked weekdays if any are checked. All dates are saved and
+    highlighted in one batch.
+    """
+    task = enterTaskField.get().strip()
+    if not inputError(task):
+        return
+    selected_date = get_selected_date()
+    if selected_date is None:
+        return
+    end_date = get_entered_date(rangeEndField, "the last date of the range")
+    if end_date is None:
+        return
+    first, last = sorted((selected_date, end_date))
+    weekdays = {weekday for weekday, var in enumerate(weekday_vars) if var.get()}
+    dates = dates_in_range(first, last, weekdays or None)
+    try:
+        dates = store.add_to_dates(dates, task)
+    except TaskStoreError as e:
+        messagebox.showerror("Input Error", str(e))
+        return
+    except Exception as e:
+        show_save_error(e)
+    highlight_dates(dates)
+    display_tasks_for_selected_date(selected_date)
+    enterTaskField.delete(0, tk.END)
+    logger.info("Added task %r to %d date(s) from %s to %s", task, len(dates), first, last)
+
+def clear_tasks_in_range(first, last, description):
+    """Delete every task from first to last after asking, as one batch."""
+    if not messagebox.askyesno("Confirm Clear", f"Are you sure you want to delete all tasks of {description} ({first} to {last})?"):
+        return
+    try:
+        removed, dates = store.clear_range(first, last)
+    except TaskStoreError as e:
+        messagebox.showinfo("No Tasks", str(e))
+        return
+    except Exception as e:
+        show_save_error(e)
+        removed, dates = None, dates_in_range(first, last)
+    highlight_dates(dates)
+    display_tasks_for_selected_date(get_selected_date() or first)
+    if removed is not None:
+        messagebox.showinfo("Tasks Cleared", f"Deleted {removed} task(s) of {description}.")
+        logger.info("Cleared %d task(s) from %s to %s", removed, first, last)
+
+@when_loaded
+def clear_week_tasks():
+    """Delete all tasks of the week (Monday to Sunday) of the selected date."""
+    selected_date = get_selected_date()
+    if selected_date is not None:
+        monday = selected_date - timedelta(days=selected_date.weekday())
+        clear_tasks_in_range(monday, monday + timedelta(days=6), "the selected week")
+
+@when_loaded
+def clear_month_tasks():
+    """Delete all tasks of the month of the selected date."""
+    selected_date = get_selected_date()
+    if selected_date is not None:
+        first = selected_date.replace(day=1)
+        last = (first + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+        clear_tasks_in_range(first, last, "the selected month")
+
+@when_loaded
+def transfer_tasks(move):
+    """Move (or copy) all tasks of the selected date to the entered target date."""
+    selected_date = get_selected_date()
+    if selected_date is None:
+        return
+    target_date = get_entered_date(targetDateField, "the date to move or copy the tasks to")
+    if target_date is None:
+        return
+    try:
+        dates = store.copy_tasks(selected_date, target_date, move=move)
+    except TaskStoreError as e:
+        messagebox.showerror("No Tasks" if isinstance(e, NoTasksError) else "Input Error", str(e))
+        return
+    except Exception as e:
+        show_save_error(e)
+        dates = [selected_date, target_date]
+    highlight_dates(dates)
+    display_tasks_for_selected_date(selected_date)
+    verb = "Moved" if move else "Copied"
+    logger.info("%s the tasks of %s to %s", verb, selected_date, target_date)
+
+@when_loaded
+def import_tasks():
+    """
+    Import tasks from a CSV or iCalendar file in one batch.
+    """
+    path = filedialog.askopenfilename(
+        title="Import Tasks",
+        filetypes=[("CSV, iCalendar or JSON", "*.csv *.ics *.json"), ("All files", "*.*")]
+    )
+    if not path:
+        return
+    try:
+        imported, skipped, changed_dates = import_file(store, path)
+    except Exception as e:
+        messagebox.showerror("Import Error", f"An error occurred while importing tasks:\n{e}")
+        logger.error("Error importing %s: %s", path, e)
+        return
+    highlight_dates(changed_dates)
+    try:
+        display_tasks_for_selected_date(datetime.strptime(selected_date_var.get(), "%Y-%m-%d").date())
+    except ValueError:
+        pass
+    messagebox.showinfo("Import Complete", f"Imported {imported} task(s).\nSkipped {skipped} invalid row(s).")
+
+@when_loaded
+def export_tasks():
+    """
+    Export all tasks to a CSV or iCalendar file.
+    """
+    path = filedialog.asksaveasfilename(
+        title="Export Tasks",
+        defaultextension=".csv",
+        filetypes=[("CSV", "*.csv"), ("iCalendar", "*.ics"), ("JSON (tasks.json layout)", "*.json")]
+    )
+    if not path:
+        return
+    try:
+        written = export_file(store.all_tasks(), path)
+    except Exception as e:
+        messagebox.showerror("Export Error", f"An error occurred while exporting tasks:\n{e}")
+        logger.error("Error exporting %s: %s", path, e)
+        return
+    messagebox.showinfo("Export Complete", f"Exported {written} task(s) to {path}.")
+
+@when_loaded
+def archive_past_years():
+    """
+    Move past years into compressed archives (see TaskStore.archive_past_years()).
+    Closing the planner doesn't archive; this button and the archive command do.
+    """
+    try:
+        archived = store.archive_past_years()
+    except Exception as e:
+        messagebox.showerror("Archive Error", f"An error occurred while archiving past years:\n{e}")
+        logger.error("Error archiving past years: %s", e)
+        return
+    if archived:
+        messagebox.showinfo("Archive Complete", f"Archived {', '.join(map(str, archived))}.")
+    else:
+        messagebox.showinfo("Archive Complete", "No years to archive.")
 
 def exit_and_restart():
     """Exit the application."""
-    save_tasks()
+    html_server.stop()
+    if startup_loader is not None:
+        # Nothing was edited yet and the loader is still reading the storage; leave it to the exit
+        gui.quit()
+        return
+    if external_reader is not None:
+        external_reader.join()  # Its read must not overlap the close
+    try:
+        store.close()
+    except Exception as e:
+        show_save_error(e)
     gui.quit()
 
-def show_tasks_html():
-    """
-    Generate an HTML file listing all tasks with interactive buttons by year and month
-    and open it in the default web browser.
-    """
-    # Start building the HTML content
-    html_content = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Tasks Overview</title>
-        <style>
-            body { font-family: Arial, sans-serif; margin: 20px; background-color: #f9f9f9; }
-            h1 { color: #333; text-align: center; }
-            .nav-bar { text-align: center; margin-bottom: 20px; }
-            .nav-bar button {
-                background-color: #4CAF50; /* Green */
-                border: none;
-                color: white;
-                padding: 10px 20px;
-                margin: 5px;
-                text-align: center;
-                text-decoration: none;
-                display: inline-block;
-                font-size: 14px;
-                cursor: pointer;
-                border-radius: 4px;
-                transition: background-color 0.3s;
-            }
-            .nav-bar button:hover {
-                background-color: #45a049;
-            }
-            .date-section { margin-bottom: 20px; display: none; }
-            .date-title { font-size: 1.2em; color: #555; margin-bottom: 10px; }
-            ul { list-style-type: disc; margin-left: 20px; }
-            li { margin-bottom: 5px; }
-            #allTasksBtn { background-color: #008CBA; } /* Blue */
-            #allTasksBtn:hover { background-color: #007bb5; }
-            /* Year Buttons */
-            .year-section { margin-bottom: 30px; }
-            .year-title { font-size: 1.5em; color: #333; margin-top: 20px; }
-            .month-buttons { text-align: center; margin-bottom: 10px; }
-        </style>
-        <script>
-            var selectedYear = null;
-
-            function showAllTasks() {
-                // Hide all date sections
-                var sections = document.getElementsByClassName('date-section');
-                for (var i = 0; i < sections.length; i++) {
-                    sections[i].style.display = 'none';
-                }
-                // Show all tasks
-                var allSections = document.getElementsByClassName('date-section-all');
-                for (var i = 0; i < allSections.length; i++) {
-                    allSections[i].style.display = 'block';
-                }
-                // Reset selectedYear
-                selectedYear = null;
-            }
-
-            function setYear(year) {
-                selectedYear = year;
-                // Hide all date sections
-                var sections = document.getElementsByClassName('date-section');
-                for (var i = 0; i < sections.length; i++) {
-                    sections[i].style.display = 'none';
-                }
-                // Show date sections for the selected year
-                var yearSections = document.getElementsByClassName('year-' + year);
-                for (var i = 0; i < yearSections.length; i++) {
-                    yearSections[i].style.display = 'block';
-                }
-            }
-
-            function toggleMonth(year, month) {
-                // Show or hide tasks for a specific month in a specific year
-                var sectionId = 'section-' + year + '-' + month;
-                var section = document.getElementById(sectionId);
-                if (section.style.display === 'block') {
-                    section.style.display = 'none';
-                } else {
-                    // Hide other sections for the same year
-                    var yearSections = document.getElementsByClassName('month-section-' + year);
-                    for (var i = 0; i < yearSections.length; i++) {
-                        if (yearSections[i].id !== sectionId) {
-                            yearSections[i].style.display = 'none';
-                        }
-                    }
-                    section.style.display = 'block';
-                }
-            }
-        </script>
-    </head>
-    <body>
-        <h1>All Tasks</h1>
-        <div class="nav-bar">
-            <button id="allTasksBtn" onclick="showAllTasks()">All Tasks</button>
-    """
-
-    # Extract all unique years from tasks_data
-    unique_years = sorted([int(year) for year in tasks_data.keys()])
-
-    # Add buttons for each unique year
-    for year in unique_years:
-        html_content += f'            <button onclick="setYear({year})">{year}</button>\n'
-
-    html_content += """
-        </div>
-    """
-
-    # Iterate through tasks_data to populate the HTML
-    for year in sorted(tasks_data.keys()):
-        html_content += f'        <div class="year-section year-{year}">\n'
-        html_content += f'            <div class="year-title">{year}</div>\n'
-        # Create month buttons for the year
-        months_in_year = sorted([int(month) for month in tasks_data[year].keys()])
-        month_names = [
-            "January", "February", "March", "April", "May", "June",
-            "July", "August", "September", "October", "November", "December"
-        ]
-        html_content += '            <div class="month-buttons">\n'
-        for month in months_in_year:
-            month_name = month_names[month - 1]
-            html_content += f'                <button onclick="toggleMonth({year}, {month})">{month_name}</button>\n'
-        html_content += '            </div>\n'
-
-        # Add task sections for each month
-        for month in sorted(tasks_data[year].keys(), key=lambda x: int(x)):
-            month_name = month_names[int(month) - 1]
-            section_id = f'section-{year}-{month}'
-            html_content += f'            <div class="date-section month-section-{year}" id="{section_id}">\n'
-            for day in sorted(tasks_data[year][month].keys(), key=lambda x: int(x)):
-                tasks = tasks_data[year][month][day]
-                date_str = f"{year}-{int(month):02d}-{int(day):02d}"
-                try:
-                    date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-                    formatted_date = date_obj.strftime("%B %d, %Y")
-                except ValueError:
-                    formatted_date = date_str  # Fallback if date parsing fails
-
-                html_content += f'                <div class="date-title">{formatted_date}</div>\n'
-                html_content += '                <ul>\n'
-                for task in tasks:
-                    html_content += f'                    <li>{task}</li>\n'
-                html_content += '                </ul>\n'
-            html_content += '            </div>\n'
-        html_content += '        </div>\n'
-
-    # Close the HTML tags
-    html_content += """
-    </body>
-    </html>
-    """
-
-    # Create a temporary HTML file
+REPEAT_NONE = "Does not repeat"
+REPEAT_CHOICES = {REPEAT_NONE: None, "Daily": "daily", "Weekly": "weekly", "Monthly": "monthly", "Yearly": "yearly"}
+
+HTML_SPLIT_BY_YEAR = False  # Write one HTML page per year plus an index page
+HTML_SERVE_LOCALLY = True  # Serve the overview from a local HTTP server instead of writing temporary files
+
+overview = TaskOverview(store)  # Overview pages, with each month's section cached until the month changes
+html_server = TaskServer(store, overview)  # Started the first time the overview is opened
+
+@when_loaded
+def show_tasks_html(split_by_year=HTML_SPLIT_BY_YEAR):
+    """
+    Open the tasks overview, with interactive buttons by year and month,
+    in the default web browser.
+    It is served by html_server, which only renders again after the tasks
+    changed. If the server can't be started, the page is streamed to a
+    temporary HTML file instead; with split_by_year, each year gets its own
+    page and an index page links them.
+    """
+    import tempfile
+    import webbrowser  # Only needed when the overview is opened
+    viewed_year = calendar_tabs[1]['year']
+    if HTML_SERVE_LOCALLY:
+        try:
+            store.load_all()
+            page = "index.html" if split_by_year else ""
+            url = f"{html_server.start()}{page}?year={viewed_year}"
+        except OSError as e:
+            logger.warning("Could not start the local HTML server (%s); writing a file instead.", e)
+        else:
+            try:
+                webbrowser.open(url)
+                logger.info("Opened %s in the default web browser.", url)
+            except Exception as e:
+                messagebox.showerror("Browser Error", f"An error occurred while opening the tasks HTML in the browser:\n{e}")
+                logger.error("Error opening browser: %s", e)
+            return
     try:
-        with tempfile.NamedTemporaryFile('w', delete=False, suffix='.html') as tmp_file:
-            tmp_file.write(html_content)
-            tmp_file_path = tmp_file.name
-        print(f"Generated tasks HTML at {tmp_file_path}")
+        with span("html.render"):
+            store.load_all()
+            # Recurring tasks are expanded for the years that are listed anyway and the viewed year
+            if split_by_year:
+                tmp_file_path = overview.write_split(tempfile.mkdtemp(prefix="year_planner_"), viewed_year)
+            else:
+                with tempfile.NamedTemporaryFile('w', delete=False, suffix='.html', encoding='utf-8') as tmp_file:
+                    for chunk in overview.iter_page(viewed_year):
+                        tmp_file.write(chunk)
+                    tmp_file_path = tmp_file.name
+        logger.info("Generated tasks HTML at %s (month cache: %d hits, %d misses)",
+                    tmp_file_path, overview.cache.hits, overview.cache.misses)
     except Exception as e:
         messagebox.showerror("HTML Generation Error", f"An error occurred while generating the tasks HTML:\n{e}")
-        print(f"Error generating tasks HTML: {e}")
+        logger.error("Error generating tasks HTML: %s", e)
         return
 
     # Open the HTML file in the default web browser
     try:
         webbrowser.open(f'file://{tmp_file_path}')
-        print("Opened tasks HTML in the default web browser.")
+        logger.info("Opened tasks HTML in the default web browser.")
     except Exception as e:
         messagebox.showerror("Browser Error", f"An error occurred while opening the tasks HTML in the browser:\n{e}")
-        print(f"Error opening browser: {e}")
+        logger.error("Error opening browser: %s", e)
 
 def setup_calendar_tabs():
     """
-    Create a tab for each month and add a Calendar widget.
+    Create a placeholder tab for each month.
+    The Calendar widget of a tab is built the first time the tab is shown;
+    only the tab of the default selected date is built right away.
     """
     for month in range(1, 13):
         month_name = datetime(current_year, month, 1).strftime('%B')
         tab = ttk.Frame(notebook)
         notebook.add(tab, text=month_name)
-        
-        # Determine the day to select
-        if month == default_selected_date.month and current_year == default_selected_date.year:
-            day = default_selected_date.day
-        else:
-            day = 1
-        
-        # Create a Calendar widget for the month with the appropriate day selected
-        cal = Calendar(
-            tab, 
-            selectmode='day', 
-            year=start_year, 
-            month=month, 
-            day=day,
-            date_pattern='y-mm-dd'
-        )
-        cal.pack(padx=5, pady=5, fill='both', expand=True)
-        
-        # Bind the date click event using default arguments to capture current cal
-        cal.bind("<<CalendarSelected>>", lambda event, cal=cal: on_date_click(event, cal, selected_date_var))
-        
-        # Store calendar info for highlighting
+
+        # Store calendar info for highlighting; 'widget' is filled in by build_calendar_tab
         calendar_tabs[month] = {
             'year': start_year,  # Starting from current year
             'month': month,
-            'widget': cal
+            'frame': tab,
+            'widget': None
         }
 
+    if default_selected_date.year == start_year:
+        build_calendar_tab(default_selected_date.month)
+    notebook.bind("<<NotebookTabChanged>>", on_tab_changed)
+
+def build_calendar_tab(month):
+    """
+    Build the Calendar widget of a month tab and highlight its dates.
+    """
+    cal_info = calendar_tabs[month]
+    if cal_info['widget'] is not None:
+        return
+
+    # Determine the day to select
+    if month == default_selected_date.month and cal_info['year'] == default_selected_date.year:
+        day = default_selected_date.day
+    else:
+        day = 1
+
+    # Create a Calendar widget for the month with the appropriate day selected
+    cal = Calendar(
+        cal_info['frame'],
+        selectmode='day',
+        year=cal_info['year'],
+        month=month,
+        day=day,
+        date_pattern='y-mm-dd'
+    )
+    cal.pack(padx=5, pady=5, fill='both', expand=True)
+
+    # Bind the date click event using default arguments to capture current cal
+    cal.bind("<<CalendarSelected>>", lambda event, cal=cal: on_date_click(event, cal, selected_date_var))
+
+    cal_info['widget'] = cal
+    highlight_manager.sync_tab(month)
+    logger.debug("Built calendar for month %d.", month)
+
+def on_tab_changed(event):
+    """
+    Build the calendar of the newly selected tab if it hasn't been built yet,
+    or draw the year heatmap.
+    """
+    try:
+        index = notebook.index(notebook.select())
+    except tk.TclError:
+        return
+    if index == HEATMAP_TAB:
+        year_heatmap.draw()
+    else:
+        build_calendar_tab(index + 1)
+
 def update_calendar_year(new_year):
     """
     Update all calendar widgets to the selected year.
     Also, reset the selected_date_var to a default date in the new year.
     """
     for month, cal_info in calendar_tabs.items():
-        cal_widget = cal_info['widget']
-        cal_widget.calevent_remove('task', date=None)  # Clear existing events
-        cal_widget.config(year=new_year)
         cal_info['year'] = new_year  # Update the year in the dictionary
-    highlight_dates()
+        if cal_info['widget'] is not None:  # Unbuilt tabs pick up the year when built
+            cal_info['widget'].config(year=new_year)
+    highlight_dates()  # Drops the old year's events and adds the new year's
     
     # Reset selected_date_var to January 1st of the new year if it was outside the new year
     try:
@@ -497,28 +1022,124 @@ def update_calendar_year(new_year):
             default_date = date(new_year, 1, 1)
             selected_date_var.set(default_date.strftime("%Y-%m-%d"))
             display_tasks_for_selected_date(default_date)
-            print(f"Selected date reset to {default_date} due to year change.")
+            logger.info("Selected date reset to %s due to year change.", default_date)
     except ValueError:
         # If the current selected_date_var is invalid, reset to January 1st
         default_date = date(new_year, 1, 1)
         selected_date_var.set(default_date.strftime("%Y-%m-%d"))
         display_tasks_for_selected_date(default_date)
-        print(f"Selected date reset to {default_date} due to invalid date format.")
+        logger.warning("Selected date reset to %s due to invalid date format.", default_date)
+
+def search_result_line(result):
+    """The line of a SearchResult in the search results list."""
+    return f"{result.date:%Y-%m-%d}  [ {result.task_no} ] {result.task}"
 
+def on_search(event=None):
+    """
+    List the tasks matching the search box, best match first. Archived years
+    are only searched when Enter is pressed; see on_search_archived.
+    """
+    global searched_query, archive_search
+    query = searchField.get()
+    if startup_loader is not None or not store.index_ready:
+        query = ""  # Searched again once the index is in
+    elif event is not None and query == searched_query:
+        return  # A key that didn't change the text, e.g. Enter or an arrow key
+    searched_query = query
+    archive_search = None
+    search_results[:] = store.search(query) if query.strip() else []
+    searchResultsList.delete(0, tk.END)
+    for result in search_results:
+        searchResultsList.insert(tk.END, search_result_line(result))
+    if query.strip() and store.archived_years():
+        searchResultsList.insert(tk.END, "Press Enter to search the archived years too.")
+
+def on_search_archived(event=None):
+    """
+    Search the archived years for the search box's text on a worker thread,
+    as they'd take too long to decompress here; see poll_archive_search.
+    """
+    global archive_search
+    query = searchField.get()
+    if archive_search is not None or query != searched_query or not query.strip() or not store.archived_years():
+        return
+    archive_search = ArchiveSearch(store, query)
+    searchResultsList.delete(len(search_results), tk.END)
+    searchResultsList.insert(tk.END, "Searching the archived years...")
+    gui.after(LOAD_POLL_MS, poll_archive_search, archive_search)
+
+def poll_archive_search(search):
+    """List the results of an archive search after the others, unless the search box changed since."""
+    if search is not archive_search:
+        return
+    try:
+        kind, result = search.results.get_nowait()
+    except queue.Empty:
+        gui.after(LOAD_POLL_MS, poll_archive_search, search)
+        return
+    searchResultsList.delete(len(search_results), tk.END)
+    if kind == "error":
+        searchResultsList.insert(tk.END, f"Could not search the archived years: {result}")
+    elif not result:
+        searchResultsList.insert(tk.END, "No matches in the archived years.")
+    else:
+        search_results.extend(result)
+        for found in result:
+            searchResultsList.insert(tk.END, search_result_line(found))
+
+def on_search_result_selected(event):
+    """
+    Jump to the date of the clicked search result.
+    """
+    selection = searchResultsList.curselection()
+    if selection and selection[0] < len(search_results):  # Not the line about the archived years
+        go_to_date(search_results[selection[0]].date)
+
+def go_to_date(target_date):
+    """
+    Show target_date in the notebook and calendar and list its tasks.
+    """
+    if calendar_tabs[target_date.month]['year'] != target_date.year:
+        year_var.set(str(target_date.year))
+        update_calendar_year(target_date.year)
+    notebook.select(target_date.month - 1)
+    build_calendar_tab(target_date.month)
+    calendar_tabs[target_date.month]['widget'].selection_set(target_date)
+    selected_date_var.set(target_date.strftime("%Y-%m-%d"))
+    display_tasks_for_selected_date(target_date)
+
+@when_loaded
 def on_year_change(event):
     """
     Handle year change and update calendars accordingly.
     """
     try:
         selected_year = int(year_var.get())
+        reported = len(store.quarantined)
+        store.load_years([selected_year])
+        if len(store.quarantined) > reported:
+            warn_quarantined(store.quarantined[reported:])
         update_calendar_year(selected_year)
-        print(f"Year changed to {selected_year}. Calendars updated.")
+        logger.info("Year changed to %d. Calendars updated.", selected_year)
     except ValueError:
         messagebox.showerror("Input Error", "Please select a valid year.")
-        print("Invalid year selection attempted.")
+        logger.warning("Invalid year selection attempted.")
 
 # Initialize the main GUI
 if __name__ == "__main__":
+    startup_started = time.perf_counter()
+    parser = argparse.ArgumentParser(description="Year Planner",
+                                     epilog="Without a display: year_planner.py {add,list,delete,clear,export,stats} ... "
+                                            "(see year_planner.py add --help)")
+    parser.add_argument("--log-level", default=LOG_LEVEL, help="DEBUG, INFO, WARNING or ERROR (default: %(default)s)")
+    parser.add_argument("--metrics", nargs="?", const="", metavar="PATH",
+                        help="collect timing and counter metrics and dump them as JSON at exit (to PATH or stderr)")
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+    if args.metrics is not None:
+        enable_metrics(args.metrics or None)
+
+    create_blank_ico(ICON_PATH)
     gui = tk.Tk()
     gui.title("Year Planner")
     gui.geometry("720x720")  # Adjust as needed
@@ -545,8 +1166,8 @@ if __name__ == "__main__":
     # Define widget styles to avoid conflict with ttk.Style
     widget_style = {"background": "#f0f0f0", "foreground": "#333333", "font": ("Arial", 10)}  # Adjust as needed
 
-    # Load tasks from file
-    load_tasks()
+    # Edits are written on a background thread once the tasks are loaded
+    poll_save_errors()
 
     # Create a Scrollable Canvas
     main_canvas = tk.Canvas(gui, bg="#f0f0f0")
@@ -581,10 +1202,28 @@ if __name__ == "__main__":
     # Setup calendar tabs for the starting year
     setup_calendar_tabs()
 
+    # Year at a glance, after the month tabs, with the task count of a range of dates
+    heatmap_frame = tk.Frame(notebook, bg="#f0f0f0")
+    notebook.add(heatmap_frame, text="Year")
+    year_heatmap = YearHeatmap(heatmap_frame)
+
+    range_count_frame = tk.Frame(heatmap_frame, bg="#f0f0f0")
+    range_count_frame.pack(pady=5, padx=5, fill='x')
+    tk.Label(range_count_frame, text="Count tasks from (YYYY-MM-DD):", **widget_style).pack(side=tk.LEFT)
+    countFromField = tk.Entry(range_count_frame, width=12, font=("Arial", 10))
+    countFromField.pack(side=tk.LEFT, padx=(5, 5))
+    tk.Label(range_count_frame, text="to", **widget_style).pack(side=tk.LEFT)
+    countToField = tk.Entry(range_count_frame, width=12, font=("Arial", 10))
+    countToField.pack(side=tk.LEFT, padx=(5, 5))
+    countButton = ttk.Button(range_count_frame, text="Count", style="Custom.TButton", command=count_tasks_in_range)
+    countButton.pack(side=tk.LEFT)
+    range_count_var = tk.StringVar()
+    tk.Label(heatmap_frame, textvariable=range_count_var, **widget_style).pack(padx=5, anchor='w')
+
     # Set the notebook to the current month tab
     current_month = datetime.now().month
     notebook.select(current_month - 1)
-    print(f"Calendar set to current month: {current_month}.")
+    logger.info("Calendar set to current month: %d.", current_month)
 
     # Year selection
     control_frame = tk.Frame(scrollable_frame, bg="#f0f0f0")
@@ -605,7 +1244,12 @@ if __name__ == "__main__":
         year_dropdown.current(current_year - start_year)
     year_dropdown.pack(side=tk.LEFT, padx=(0,10))
     year_dropdown.bind("<<ComboboxSelected>>", on_year_change)
-    print(f"Year dropdown initialized to {year_var.get()}.")
+
+    # Tells that the tasks or the search index are still loading
+    loading_var = tk.StringVar()
+    loading_label = tk.Label(control_frame, textvariable=loading_var, bg="#f0f0f0", fg="gray", font=("Arial", 10))
+    loading_label.pack(side=tk.LEFT)
+    logger.debug("Year dropdown initialized to %s.", year_var.get())
 
     # Initialize selected_date_var to today's date
     selected_date_var = tk.StringVar()
@@ -628,6 +1272,12 @@ if __name__ == "__main__":
     enterTaskField = tk.Entry(task_entry_frame, width=60, font=("Arial", 10))  # Adjust as needed
     enterTaskField.pack(side=tk.LEFT, fill='x', expand=True)
 
+    # Repeat the new task daily, weekly (on the selected weekday), monthly or yearly
+    repeat_var = tk.StringVar(value=REPEAT_NONE)
+    repeat_dropdown = ttk.Combobox(task_entry_frame, values=list(REPEAT_CHOICES), state="readonly", width=15,
+                                   textvariable=repeat_var, font=("Arial", 10))
+    repeat_dropdown.pack(side=tk.LEFT, padx=(5, 0))
+
     submitButton = ttk.Button(scrollable_frame, text="Add Task", style="Custom.TButton", command=add_task)
     submitButton.pack(pady=2, padx=5, anchor='w')  # Adjust as needed
 
@@ -643,17 +1293,18 @@ if __name__ == "__main__":
     text_scrollbar = ttk.Scrollbar(task_display_frame, orient='vertical', command=TextArea.yview)
     text_scrollbar.pack(side=tk.RIGHT, fill='y')
 
-    # Configure TextArea to use the scrollbar
-    TextArea.config(yscrollcommand=text_scrollbar.set)
+    # Show the tasks in TextArea a page at a time; it also drives the scrollbar
+    task_list = TaskListView(TextArea, text_scrollbar)
 
     TextArea.config(state=tk.DISABLED)
 
     # Configure tags for styling text in TextArea
     TextArea.tag_configure("task", font=("Calibri", 10), foreground="black")  # Adjust as needed
     TextArea.tag_configure("no_task", font=("Calibri", 10), foreground="gray")  # Adjust as needed
+    TextArea.tag_configure("recurring", font=("Calibri", 10), foreground="#1f5f8b")  # Adjust as needed
 
     # Delete Task Number
-    taskNumberLabel = tk.Label(scrollable_frame, text="Delete Task Number:", **widget_style)
+    taskNumberLabel = tk.Label(scrollable_frame, text="Delete Task Number (R1, R2... for recurring tasks):", **widget_style)
     taskNumberLabel.pack(pady=(5, 2), padx=5, anchor='w')
 
     # Create a Frame for Delete Task Number
@@ -670,45 +1321,113 @@ if __name__ == "__main__":
     clearAllButton = ttk.Button(scrollable_frame, text="Clear All Tasks for Selected Date", style="Custom.TButton", command=clear_all_tasks)
     clearAllButton.pack(pady=2, padx=5, anchor='w')  # Adjust as needed
 
+    # Batch operations, each saved and highlighted as one batch
+    rangeLabel = tk.Label(scrollable_frame, text="Add the task above from the selected date to (YYYY-MM-DD), on the checked weekdays (none = every day):", **widget_style)
+    rangeLabel.pack(pady=(5, 2), padx=5, anchor='w')
+
+    range_frame = tk.Frame(scrollable_frame, bg="#f0f0f0")
+    range_frame.pack(pady=2, padx=5, fill='x')
+
+    rangeEndField = tk.Entry(range_frame, width=12, font=("Arial", 10))
+    rangeEndField.pack(side=tk.LEFT, padx=(0, 5))
+    weekday_vars = []
+    for weekday_name in WEEKDAY_NAMES:
+        weekday_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(range_frame, text=weekday_name[:3], variable=weekday_var, bg="#f0f0f0").pack(side=tk.LEFT)
+        weekday_vars.append(weekday_var)
+    addRangeButton = ttk.Button(range_frame, text="Add to Range", style="Custom.TButton", command=add_task_to_range)
+    addRangeButton.pack(side=tk.LEFT, padx=(5, 0))
+
+    clear_range_frame = tk.Frame(scrollable_frame, bg="#f0f0f0")
+    clear_range_frame.pack(pady=2, padx=5, fill='x')
+    clearWeekButton = ttk.Button(clear_range_frame, text="Clear Week", style="Custom.TButton", command=clear_week_tasks)
+    clearWeekButton.pack(side=tk.LEFT, padx=(0, 5))
+    clearMonthButton = ttk.Button(clear_range_frame, text="Clear Month", style="Custom.TButton", command=clear_month_tasks)
+    clearMonthButton.pack(side=tk.LEFT)
+
+    targetDateLabel = tk.Label(scrollable_frame, text="Move or copy all tasks of the selected date to (YYYY-MM-DD):", **widget_style)
+    targetDateLabel.pack(pady=(5, 2), padx=5, anchor='w')
+
+    transfer_frame = tk.Frame(scrollable_frame, bg="#f0f0f0")
+    transfer_frame.pack(pady=2, padx=5, fill='x')
+    targetDateField = tk.Entry(transfer_frame, width=12, font=("Arial", 10))
+    targetDateField.pack(side=tk.LEFT, padx=(0, 5))
+    moveButton = ttk.Button(transfer_frame, text="Move Tasks", style="Custom.TButton", command=lambda: transfer_tasks(True))
+    moveButton.pack(side=tk.LEFT, padx=(0, 5))
+    copyButton = ttk.Button(transfer_frame, text="Copy Tasks", style="Custom.TButton", command=lambda: transfer_tasks(False))
+    copyButton.pack(side=tk.LEFT)
+
+    # Search across all tasks
+    searchLabel = tk.Label(scrollable_frame, text="Search Tasks:", **widget_style)
+    searchLabel.pack(pady=(5, 2), padx=5, anchor='w')
+
+    searchField = tk.Entry(scrollable_frame, width=60, font=("Arial", 10))  # Adjust as needed
+    searchField.pack(pady=2, padx=5, fill='x')
+    searchField.bind("<KeyRelease>", on_search)
+    searchField.bind("<Return>", on_search_archived)
+
+    search_results_frame = tk.Frame(scrollable_frame, bg="#f0f0f0")
+    search_results_frame.pack(pady=2, padx=5, fill='both', expand=True)
+
+    searchResultsList = tk.Listbox(search_results_frame, height=5, bg="white", fg="black", font=("Arial", 10))  # Adjust as needed
+    searchResultsList.pack(side=tk.LEFT, fill='both', expand=True)
+    searchResultsList.bind("<<ListboxSelect>>", on_search_result_selected)
+
+    search_scrollbar = ttk.Scrollbar(search_results_frame, orient='vertical', command=searchResultsList.yview)
+    search_scrollbar.pack(side=tk.RIGHT, fill='y')
+    searchResultsList.config(yscrollcommand=search_scrollbar.set)
+
+    # Results currently listed in searchResultsList
+    search_results = []
+
     # Frame for bottom buttons
     button_frame = tk.Frame(scrollable_frame, bg="#f0f0f0")
     button_frame.pack(pady=5, padx=5, fill='x')  # Adjust as needed
 
-    # Configure button frame to expand (using two columns now)
-    button_frame.grid_columnconfigure(0, weight=1)
-    button_frame.grid_columnconfigure(1, weight=1)
+    # Configure button frame to expand (using five columns now)
+    for column in range(5):
+        button_frame.grid_columnconfigure(column, weight=1)
 
     # Exit button
     exitButton = ttk.Button(button_frame, text="Exit", style="Custom.TButton", command=exit_and_restart)
     exitButton.grid(row=0, column=0, padx=2, sticky=tk.EW)
+    gui.protocol("WM_DELETE_WINDOW", exit_and_restart)  # Closing the window also flushes queued edits
 
     # Tasks button
     tasksButton = ttk.Button(button_frame, text="Tasks", style="Custom.TButton", command=show_tasks_html)
     tasksButton.grid(row=0, column=1, padx=2, sticky=tk.EW)
 
+    # Import / Export buttons
+    importButton = ttk.Button(button_frame, text="Import", style="Custom.TButton", command=import_tasks)
+    importButton.grid(row=0, column=2, padx=2, sticky=tk.EW)
+
+    exportButton = ttk.Button(button_frame, text="Export", style="Custom.TButton", command=export_tasks)
+    exportButton.grid(row=0, column=3, padx=2, sticky=tk.EW)
+
+    # Archive button
+    archiveButton = ttk.Button(button_frame, text="Archive", style="Custom.TButton", command=archive_past_years)
+    archiveButton.grid(row=0, column=4, padx=2, sticky=tk.EW)
+
     # Set the blank icon to the Tkinter window
     try:
         gui.iconbitmap(ICON_PATH)
-        print(f"Icon set successfully from {ICON_PATH}.")
+        logger.debug("Icon set successfully from %s.", ICON_PATH)
     except Exception as e:
-        print(f"Error setting icon: {e}")
+        logger.warning("Error setting icon: %s", e)
 
-    # Update tasks display based on the initially selected date
-    try:
-        selected_date = datetime.strptime(selected_date_var.get(), "%Y-%m-%d").date()
-    except:
-        selected_date = default_selected_date
-    display_tasks_for_selected_date(selected_date)
+    # Load the tasks of the year shown in the year dropdown while the window is drawn;
+    # the selected date and the highlights are shown once they arrive
+    start_loading([datetime.now().year])
 
-    # Highlight dates with tasks
-    highlight_dates()
+    # Report time-to-first-paint once the window has been drawn
+    gui.after_idle(lambda: logger.info("Startup completed in %.1f ms.", (time.perf_counter() - startup_started) * 1000))
 
     # Start the GUI main loop
     try:
         gui.mainloop()
     except KeyboardInterrupt:
-        print("Application closed by user.")
+        logger.info("Application closed by user.")
     finally:
         # Ensure the application closes properly
         gui.destroy()
-        print("Application closed.")
+        logger.info("Application closed.")